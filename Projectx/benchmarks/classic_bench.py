@@ -0,0 +1,189 @@
+"""
+Классический детектор (шаблон рамки + серии цвета, classic_detector.py) против YOLO:
+скорость detect_and_analyze и совпадение результата (status, hp_percent, window_box, hp_box).
+
+Примеры (из папки Projectx):
+    python benchmarks/classic_bench.py
+    python benchmarks/classic_bench.py --frames session.frames --weights best.pt --out classic.json
+    python benchmarks/classic_bench.py --frames session.frames --weights best.pt --template target.npz
+
+На записи эталон — YOLO: шаблон (если не задан --template) калибруется по детекциям YOLO
+на первых --calib кадрах, точность считается на остальных. На синтетике эталон — истинные
+боксы и процент HP; с --weights добавляется и сравнение с YOLO.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+
+import numpy as np
+
+from common import BenchResults, quiet, time_calls
+import synthetic
+
+from frame_recorder import FrameReader
+
+
+def _iou(a, b):
+    if a is None or b is None:
+        return 0.0
+    ix = max(0.0, min(a[2], b[2]) - max(a[0], b[0]))
+    iy = max(0.0, min(a[3], b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _synthetic_samples(n, seed=0):
+    """Кадры с окном цели в разных местах и разным HP; эталон — истинный результат."""
+    rng = np.random.default_rng(seed)
+    samples = []
+    for i in range(n):
+        hp = 0.0 if i % 10 == 9 else float(rng.uniform(0.05, 1.0))
+        pos = (int(rng.integers(0, 420)), int(rng.integers(0, 400)))
+        img, window_box, hp_box = synthetic.make_hp_frame(hp, seed=i, window_pos=pos)
+        status = "Цель мертва" if hp * 100 < 1.5 else "Цель жива"
+        samples.append((img, (status, hp * 100.0, window_box, hp_box)))
+    return samples
+
+
+def _analyzer(detector):
+    from hp_analyzer import HpAnalyzerThread
+
+    return HpAnalyzerThread(
+        (0, 0, 1, 1),
+        lambda *a: None,
+        detector=detector,
+        change_gate=False,
+        roi_lock=False,
+        crop_detect=False,
+    )
+
+
+def _accuracy(name, results, reference):
+    """Совпадение результатов с эталоном; печатает сводку и возвращает её."""
+    status_ok = [r[0] == ref[0] for r, ref in zip(results, reference)]
+    both = [(r, ref) for r, ref in zip(results, reference) if ref[2] is not None]
+    window_iou = [_iou(r[2], ref[2]) for r, ref in both]
+    hp_iou = [_iou(r[3], ref[3]) for r, ref in both]
+    hp_err = [abs(r[1] - ref[1]) for r, ref in both if r[3] is not None]
+    summary = {
+        "frames": len(results),
+        "status_agree": float(np.mean(status_ok)) if status_ok else 0.0,
+        "window_iou_mean": float(np.mean(window_iou)) if window_iou else 0.0,
+        "hp_iou_mean": float(np.mean(hp_iou)) if hp_iou else 0.0,
+        "hp_err_mean": float(np.mean(hp_err)) if hp_err else 0.0,
+        "hp_err_max": float(np.max(hp_err)) if hp_err else 0.0,
+        "missed": sum(1 for r, _ in both if r[2] is None),
+    }
+    print(
+        f"{name:<40} статус {summary['status_agree'] * 100:5.1f}%, "
+        f"IoU окна {summary['window_iou_mean']:.3f}, IoU HP bar {summary['hp_iou_mean']:.3f}, "
+        f"ошибка HP mean={summary['hp_err_mean']:.2f} max={summary['hp_err_max']:.2f}, "
+        f"пропусков {summary['missed']}"
+    )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Классический детектор против YOLO")
+    parser.add_argument("--frames", help="запись frame_recorder (по умолчанию синтетика)")
+    parser.add_argument("--samples", type=int, default=200, help="синтетических кадров")
+    parser.add_argument("--template", help="готовый шаблон .npz (иначе калибровка)")
+    parser.add_argument("--calib", type=int, default=20, help="кадров на калибровку")
+    parser.add_argument("--weights", help="веса YOLO для сравнения")
+    parser.add_argument("--backend", default="ultralytics")
+    parser.add_argument("--imgsz", type=int, default=640)
+    parser.add_argument("--threads", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    from classic_detector import ClassicDetector, calibrate, save_template
+    from detectors import create_detector
+
+    results = BenchResults("classic_bench")
+    accuracy = {}
+
+    yolo = None
+    if args.weights:
+        try:
+            with quiet():
+                yolo = _analyzer(
+                    create_detector(args.backend, args.weights, args.imgsz, args.threads)
+                )
+        except Exception as e:
+            results.skip("yolo.*", f"детектор не загружен: {e}")
+    else:
+        results.skip("yolo.*", "не задан --weights")
+
+    reader = None
+    if args.frames:
+        if yolo is None:
+            parser.error("для --frames нужен рабочий --weights (эталон — YOLO)")
+        reader = FrameReader(args.frames)
+        frames = [reader.frame(i)[0] for i in range(len(reader))]
+        with quiet():
+            reference = [yolo.detect_and_analyze(f) for f in frames]
+        calib = [(f, r[2], r[3]) for f, r in zip(frames, reference) if r[2] is not None]
+        calib = calib[: args.calib]
+        held_out = 0 if args.template else args.calib
+        eval_frames, eval_reference = frames[held_out:], reference[held_out:]
+        truth = None
+    else:
+        samples = _synthetic_samples(args.samples + args.calib)
+        calib = [(img, ref[2], ref[3]) for img, ref in samples[: args.calib] if ref[1] > 0]
+        eval_frames = [img for img, _ in samples[args.calib :]]
+        truth = [ref for _, ref in samples[args.calib :]]
+        eval_reference = None
+        if yolo is not None:
+            with quiet():
+                eval_reference = [yolo.detect_and_analyze(f) for f in eval_frames]
+
+    template_path = args.template
+    tmp_dir = None
+    if template_path is None:
+        tmp_dir = tempfile.mkdtemp(prefix="classic_bench_")
+        template_path = os.path.join(tmp_dir, "template.npz")
+        save_template(template_path, calibrate(calib))
+
+    with quiet():
+        classic_detector = ClassicDetector(template_path)
+        classic = _analyzer(classic_detector)
+    results.add("classic.load", [classic_detector.load_time])
+    results.add("classic.warmup", [classic_detector.warmup_time])
+
+    with quiet():
+        classic_out = [classic.detect_and_analyze(f) for f in eval_frames]
+    if truth is not None:
+        accuracy["classic_vs_truth"] = _accuracy("classic против истины", classic_out, truth)
+    if eval_reference is not None:
+        accuracy["classic_vs_yolo"] = _accuracy("classic против YOLO", classic_out, eval_reference)
+        if truth is not None:
+            accuracy["yolo_vs_truth"] = _accuracy("YOLO против истины", eval_reference, truth)
+
+    classic_t = time_calls(classic.detect_and_analyze, eval_frames, args.repeat)
+    results.add("classic.detect_and_analyze", classic_t)
+    if yolo is not None:
+        yolo_t = time_calls(yolo.detect_and_analyze, eval_frames, args.repeat)
+        results.add("yolo.detect_and_analyze", yolo_t)
+        speedup = np.median(yolo_t) / np.median(classic_t)
+        print(f"ускорение classic против YOLO (p50): x{speedup:.1f}")
+
+    if args.out:
+        data = results.to_dict()
+        data["accuracy"] = accuracy
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.out}")
+    if tmp_dir is not None:
+        os.remove(template_path)
+        os.rmdir(tmp_dir)
+    if reader is not None:
+        del frames, eval_frames, calib
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
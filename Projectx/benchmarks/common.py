@@ -0,0 +1,123 @@
+"""
+Общие утилиты бенчмарков: замер стадий, перцентили, сохранение в JSON и сравнение версий.
+Скрипты бенчмарков запускаются из папки Projectx: `python benchmarks/<script>.py ...`.
+"""
+
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+
+
+@contextlib.contextmanager
+def quiet():
+    """Глушит print() модулей приложения на время замера (логи иначе доминируют)."""
+    with open(os.devnull, "w", encoding="utf-8") as devnull:
+        with contextlib.redirect_stdout(devnull):
+            yield
+
+
+def summarize(samples_sec):
+    """Перцентили латентности в миллисекундах."""
+    arr = np.asarray(samples_sec, dtype=np.float64) * 1000.0
+    if arr.size == 0:
+        return {"n": 0}
+    return {
+        "n": int(arr.size),
+        "mean_ms": float(arr.mean()),
+        "p50_ms": float(np.percentile(arr, 50)),
+        "p90_ms": float(np.percentile(arr, 90)),
+        "p99_ms": float(np.percentile(arr, 99)),
+        "max_ms": float(arr.max()),
+    }
+
+
+def time_calls(fn, inputs, repeat=1, warmup=3, silent=True):
+    """Вызывает fn(x) для каждого x из inputs repeat раз, возвращает список длительностей (сек)."""
+    inputs = list(inputs)
+    samples = []
+    ctx = quiet() if silent else contextlib.nullcontext()
+    with ctx:
+        for x in inputs[:warmup]:
+            fn(x)
+        for _ in range(repeat):
+            for x in inputs:
+                t0 = time.perf_counter()
+                fn(x)
+                samples.append(time.perf_counter() - t0)
+    return samples
+
+
+class BenchResults:
+    """Накопитель результатов: стадия -> статистика, плюс пропущенные стадии с причиной."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self.skipped = {}
+
+    def add(self, stage, samples_sec):
+        self.stages[stage] = summarize(samples_sec)
+        s = self.stages[stage]
+        if s["n"]:
+            print(
+                f"{stage:<40} n={s['n']:<5} p50={s['p50_ms']:8.3f}ms "
+                f"p90={s['p90_ms']:8.3f}ms p99={s['p99_ms']:8.3f}ms"
+            )
+
+    def skip(self, stage, reason):
+        self.skipped[stage] = str(reason)
+        print(f"{stage:<40} пропущено: {reason}")
+
+    def to_dict(self):
+        return {
+            "name": self.name,
+            "meta": {
+                "time": time.strftime("%Y-%m-%d %H:%M:%S"),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpu_count": os.cpu_count(),
+            },
+            "stages": self.stages,
+            "skipped": self.skipped,
+        }
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {path}")
+
+
+def compare(base_path, new_path, metric="p50_ms", threshold_pct=10.0):
+    """
+    Сравнивает два JSON с результатами. Возвращает список регрессий
+    (стадии, где metric вырос больше чем на threshold_pct процентов).
+    """
+    with open(base_path, "r", encoding="utf-8") as f:
+        base = json.load(f)["stages"]
+    with open(new_path, "r", encoding="utf-8") as f:
+        new = json.load(f)["stages"]
+
+    regressions = []
+    print(f"{'стадия':<40} {'было':>10} {'стало':>10} {'изм.':>8}   ({metric})")
+    for stage in sorted(set(base) | set(new)):
+        b = base.get(stage, {}).get(metric)
+        n = new.get(stage, {}).get(metric)
+        if b is None or n is None:
+            print(f"{stage:<40} {'-' if b is None else f'{b:.3f}':>10} {'-' if n is None else f'{n:.3f}':>10}")
+            continue
+        delta = (n - b) / b * 100.0 if b > 0 else 0.0
+        mark = ""
+        if delta > threshold_pct:
+            mark = "  <-- РЕГРЕССИЯ"
+            regressions.append((stage, b, n, delta))
+        print(f"{stage:<40} {b:10.3f} {n:10.3f} {delta:+7.1f}%{mark}")
+    return regressions
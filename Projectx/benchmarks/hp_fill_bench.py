@@ -0,0 +1,124 @@
+"""
+Микро-бенчмарк заливки HP bar: прежняя HSV + inRange против LUT-классификации (hp_fill).
+
+Примеры (из папки Projectx):
+    python benchmarks/hp_fill_bench.py
+    python benchmarks/hp_fill_bench.py --frames session.frames --hp-box 230,48,410,58 --out fill.json
+
+На синтетических кадрах край заливки рисуется с дробной шириной (смешанный пограничный
+столбец), поэтому кроме скорости видна и точность: ошибка против истинного процента.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from common import BenchResults, quiet, time_calls
+import synthetic
+
+import hp_fill
+from frame_recorder import FrameReader
+
+
+def _subpixel_frames(n, seed=0):
+    """Кадры с HP bar, у которого край заливки попадает между пикселями."""
+    rng = np.random.default_rng(seed)
+    samples = []
+    for i in range(n):
+        hp = float(rng.uniform(0.0, 1.0))
+        img, _, hp_box = synthetic.make_hp_frame(hp, seed=i)
+        x1, y1, x2, y2 = hp_box
+        exact = (x2 - x1) * hp
+        full = int(exact)
+        frac = exact - full
+        # фон бара уже нарисован; дозаливаем целые столбцы и смешиваем пограничный
+        img[y1:y2, x1 : x1 + full] = (20, 20, 200, 255)
+        if frac > 0 and x1 + full < x2:
+            bg = img[y1:y2, x1 + full].astype(np.float32)
+            fg = np.array([20, 20, 200, 255], dtype=np.float32)
+            img[y1:y2, x1 + full] = np.round(bg * (1 - frac) + fg * frac).astype(np.uint8)
+        samples.append((img, hp_box, exact / (x2 - x1) * 100.0))
+    return samples
+
+
+def _hsv_percent(img, hp_box):
+    filled = hp_fill.hsv_fill_columns(img, hp_box)
+    if filled is None:
+        return 0.0
+    return np.count_nonzero(filled) / filled.size * 100
+
+
+def _parse_box(text):
+    x1, y1, x2, y2 = (int(v) for v in text.split(","))
+    return x1, y1, x2, y2
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HSV/inRange против LUT для заливки HP bar")
+    parser.add_argument("--samples", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--frames", help="запись frame_recorder вместо синтетики")
+    parser.add_argument("--hp-box", type=_parse_box, help="x1,y1,x2,y2 HP bar в кадрах записи")
+    parser.add_argument("--out", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    results = BenchResults("hp_fill_bench")
+
+    t0 = time.perf_counter()
+    with quiet():
+        hp_fill.get_lut()
+        hp_fill.get_chroma_lut()
+    print(f"построение таблиц: {(time.perf_counter() - t0) * 1000:.0f}ms")
+
+    reader = None
+    if args.frames:
+        if not args.hp_box:
+            parser.error("для --frames нужен --hp-box")
+        reader = FrameReader(args.frames)
+        samples = [(reader.frame(i)[0], args.hp_box, None) for i in range(len(reader))]
+    else:
+        samples = _subpixel_frames(args.samples)
+    pairs = [(img, box) for img, box, _ in samples]
+
+    # сверка классификации: столбцы должны совпадать с прежними масками
+    mismatched = sum(
+        not np.array_equal(hp_fill.hsv_fill_columns(img, box), hp_fill.fill_columns(img, box))
+        for img, box in pairs
+    )
+    print(f"расхождений по столбцам: {mismatched} из {len(pairs)}")
+
+    hsv = time_calls(lambda p: _hsv_percent(p[0], p[1]), pairs, args.repeat)
+    lut = time_calls(lambda p: hp_fill.hp_fill(p[0], p[1]), pairs, args.repeat)
+    results.add("hp_fill.hsv_inrange", hsv)
+    results.add("hp_fill.lut", lut)
+    # только классификация и проекция столбцов, без уточнения края
+    results.add(
+        "hp_fill.hsv_columns",
+        time_calls(lambda p: hp_fill.hsv_fill_columns(p[0], p[1]), pairs, args.repeat),
+    )
+    results.add(
+        "hp_fill.lut_columns",
+        time_calls(lambda p: hp_fill.fill_columns(p[0], p[1]), pairs, args.repeat),
+    )
+    speedup = np.median(hsv) / np.median(lut)
+    print(f"ускорение (p50): x{speedup:.2f}")
+
+    if samples[0][2] is not None:
+        truth = np.array([t for _, _, t in samples])
+        err_hsv = np.abs([_hsv_percent(img, box) for img, box in pairs] - truth)
+        err_lut = np.abs([hp_fill.hp_fill(img, box)[1] for img, box in pairs] - truth)
+        print(
+            f"ошибка HP, %: hsv mean={err_hsv.mean():.3f} max={err_hsv.max():.3f}; "
+            f"lut mean={err_lut.mean():.3f} max={err_lut.max():.3f}"
+        )
+
+    if args.out:
+        results.save(args.out)
+    if reader is not None:
+        del samples, pairs
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Проверка «урона нет» (stall) у HpFilter на синтетических профилях HP: медленный
+линейный урон, ступенчатый урон, цель без урона. Плюс стоимость update().
+
+Примеры (из папки Projectx):
+    python benchmarks/hp_filter_bench.py
+    python benchmarks/hp_filter_bench.py --noise 0.3 --quant 0.67 --stable-sec 2.0
+
+Для каждого профиля печатается, через сколько секунд после появления цели урон
+впервые доказан и самый длинный stall после этого. Код возврата 1, если цель под
+уроном простояла в stall дольше --stable-sec (контроллер отправил бы far-команды)
+или цель без урона так и не дошла до stall.
+"""
+
+import argparse
+import sys
+
+import numpy as np
+
+from common import BenchResults, time_calls
+
+from hp_filter import HpFilter
+
+PROFILES = {
+    "flat": lambda t: 80.0,
+    "linear_0.5": lambda t: 90.0 - 0.5 * t,
+    "linear_1": lambda t: 90.0 - 1.0 * t,
+    "linear_2": lambda t: 90.0 - 2.0 * t,
+    "steps_0.67_per_1s": lambda t: 90.0 - 0.67 * np.floor(t),
+    "steps_2_per_1.5s": lambda t: 90.0 - 2.0 * np.floor(t / 1.5),
+}
+
+
+def simulate(profile, duration, dt, noise, quant, seed):
+    """
+    (время первого доказанного урона или None, самый длинный stall после него,
+    stall на последнем измерении).
+    """
+    rng = np.random.default_rng(seed)
+    f = HpFilter()
+    first_damage = None
+    worst_stall = 0.0
+    for i in range(int(duration / dt)):
+        t = i * dt
+        hp = profile(t) + rng.normal(0.0, noise)
+        if quant:
+            hp = np.round(hp / quant) * quant
+        estimate = f.update("alive_target", float(hp), t)
+        if estimate.stall_since is None and first_damage is None:
+            first_damage = t
+        if first_damage is not None:
+            worst_stall = max(worst_stall, estimate.stalled_for)
+    return first_damage, worst_stall, estimate.stalled_for
+
+
+def main():
+    parser = argparse.ArgumentParser(description="stall у HpFilter на синтетических профилях HP")
+    parser.add_argument("--duration", type=float, default=60.0)
+    parser.add_argument("--dt", type=float, default=0.1, help="шаг измерений (hp_min_interval_sec)")
+    parser.add_argument("--noise", type=float, default=0.5, help="СКО измерения HP, %%")
+    parser.add_argument("--quant", type=float, default=0.0, help="ширина столбца HP bar, %%")
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--stable-sec", type=float, default=2.0, help="hp_stable_threshold_sec")
+    args = parser.parse_args()
+
+    failed = []
+    for name, profile in PROFILES.items():
+        runs = [
+            simulate(profile, args.duration, args.dt, args.noise, args.quant, seed)
+            for seed in range(args.seeds)
+        ]
+        firsts = [r[0] for r in runs]
+        worst = max(r[1] for r in runs)
+        first_txt = ", ".join("-" if v is None else f"{v:.1f}" for v in firsts)
+        print(f"{name:<20} урон доказан через [{first_txt}]s, самый длинный stall {worst:.1f}s")
+        if name == "flat":
+            # цель без урона должна дойти до stall, даже если шум раз доказал «урон»
+            if min(r[2] for r in runs) < args.stable_sec:
+                failed.append(name)
+        elif any(v is None for v in firsts) or worst >= args.stable_sec:
+            failed.append(name)
+
+    results = BenchResults("hp_filter_bench")
+    f = HpFilter()
+    rng = np.random.default_rng(0)
+    samples = [(i * args.dt, float(v)) for i, v in enumerate(80 + rng.normal(0, args.noise, 600))]
+    results.add("hp_filter.update", time_calls(lambda s: f.update("alive_target", s[1], s[0]), samples))
+
+    if failed:
+        print(f"ПРОВАЛ: {', '.join(failed)}")
+        return 1
+    print("все профили в норме")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
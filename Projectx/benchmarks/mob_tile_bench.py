@@ -0,0 +1,96 @@
+"""
+Поиск мобов по полосам кадра в пуле потоков (MobSearcher(workers=N)): как ускорение
+растёт с числом потоков и совпадает ли результат с поиском одним потоком.
+
+Примеры (из папки Projectx):
+    python benchmarks/mob_tile_bench.py
+    python benchmarks/mob_tile_bench.py --workers 1 2 4 8 --width 3840 --height 2160
+    python benchmarks/mob_tile_bench.py --frames session.frames --out tiles.json
+
+OpenCV отпускает GIL, но и сам может распараллеливать функции (cv2.setNumThreads);
+по умолчанию его пул отключается (--cv-threads 1), чтобы мерить только разбиение
+на полосы. Ускорение ограничено числом ядер машины (печатается в начале).
+"""
+
+import argparse
+import json
+import os
+
+import cv2
+import numpy as np
+
+from common import BenchResults, time_calls
+import synthetic
+
+from frame_recorder import FrameReader
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Поиск мобов по полосам в пуле потоков")
+    parser.add_argument("--frames", help="запись frame_recorder (по умолчанию синтетика)")
+    parser.add_argument("--samples", type=int, default=10, help="синтетических кадров")
+    parser.add_argument("--width", type=int, default=2560)
+    parser.add_argument("--height", type=int, default=1440)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pyramid", type=int, default=1, help="1, 2 или 4 (см. MobSearcher)")
+    parser.add_argument("--cv-threads", type=int, default=1, help="cv2.setNumThreads")
+    parser.add_argument("--template", default=synthetic.TEMPLATE_PATH)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--out", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    from mob_searcher import MobSearcher
+
+    cv2.setNumThreads(args.cv_threads)
+    print(f"ядер: {os.cpu_count()}, потоков OpenCV: {cv2.getNumThreads()}")
+
+    reader = None
+    if args.frames:
+        reader = FrameReader(args.frames)
+        frames = [reader.frame(i)[0] for i in range(len(reader))]
+    else:
+        frames = [
+            synthetic.make_mob_frame(
+                n_targets=16, n_decoys=24, width=args.width, height=args.height, seed=i
+            )[0]
+            for i in range(args.samples)
+        ]
+
+    results = BenchResults("mob_tile_bench")
+    scaling = {}
+    base_t = None
+    reference = None
+    for workers in args.workers:
+        searcher = MobSearcher(args.template, pyramid=args.pyramid, workers=workers)
+        out = [searcher.analyze(f) for f in frames]
+        found = [({(t.x, t.y) for t in targets}, set(candidates)) for targets, candidates, _ in out]
+        if reference is None:
+            reference = found
+        mismatched = sum(a != b for a, b in zip(found, reference))
+
+        t = time_calls(searcher.analyze, frames, args.repeat)
+        searcher.close()
+        results.add(f"mob.analyze_w{workers}", t)
+        if base_t is None:
+            base_t = t
+        speedup = float(np.median(base_t) / np.median(t))
+        tiles = len(searcher.tile_bounds(frames[0].shape[0]))
+        scaling[workers] = {"tiles": tiles, "speedup": speedup, "mismatched": mismatched}
+        print(
+            f"потоков {workers:>2} (полос {tiles:>2}): ускорение x{speedup:.2f}, "
+            f"расхождений с первым прогоном {mismatched} из {len(frames)}"
+        )
+
+    if args.out:
+        data = results.to_dict()
+        data["scaling"] = scaling
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.out}")
+    if reader is not None:
+        del frames
+        reader.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+OCR чата: Tesseract в процессе (tesserocr) против процесса tesseract на каждый вызов
+(pytesseract), на целой области чата и по одной строке (PSM 7).
+
+Примеры (из папки Projectx):
+    python benchmarks/ocr_bench.py
+    python benchmarks/ocr_bench.py --psm 6 --whitelist "0123456789/"
+    python benchmarks/ocr_bench.py --backends pytesseract --out ocr.json
+
+Бэкенд, который не установлен (нет пакета tesserocr или бинарника tesseract),
+попадает в пропущенные стадии с причиной. Для каждого бэкенда печатается, в скольких
+кадрах текст совпал с первым отработавшим бэкендом.
+"""
+
+import argparse
+import json
+
+from common import BenchResults, quiet, time_calls
+import synthetic
+
+from pipeline_bench import CHAT_SAMPLES
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение OCR-бэкендов на кадрах чата")
+    parser.add_argument("--backends", nargs="+", default=["pytesseract", "tesserocr"])
+    parser.add_argument("--lang", default="rus+eng")
+    parser.add_argument("--psm", type=int, default=3)
+    parser.add_argument("--whitelist", default="")
+    parser.add_argument("--samples", type=int, default=6, help="синтетических кадров чата")
+    parser.add_argument("--repeat", type=int, default=2)
+    parser.add_argument("--out", help="сохранить результаты в JSON")
+    args = parser.parse_args()
+
+    from chat_rows import IncrementalChatOcr
+    from ocr_engines import create_ocr
+
+    frames = [
+        synthetic.make_chat_frame(
+            [CHAT_SAMPLES[(i + k) % len(CHAT_SAMPLES)] for k in range(6)], seed=i
+        )
+        for i in range(args.samples)
+    ]
+    # строки чата по отдельности — как их отдаёт IncrementalChatOcr
+    splitter = IncrementalChatOcr(lambda bgra: "")
+    lines = []
+    for frame in frames[:2]:
+        for (y1, y2), _ in splitter.rows(frame):
+            lines.append(frame[max(0, y1 - splitter.ROW_PAD) : y2 + splitter.ROW_PAD].copy())
+
+    results = BenchResults("ocr_bench")
+    reference, reference_name = None, None
+    agreement = {}
+    for backend in args.backends:
+        try:
+            with quiet():
+                engine = create_ocr(backend, lang=args.lang, psm=args.psm, whitelist=args.whitelist)
+                texts = [engine(f) for f in frames]
+        except Exception as e:
+            results.skip(f"ocr.{backend}.*", f"{type(e).__name__}: {e}")
+            continue
+        print(f"{backend}: загрузка {engine.load_time * 1000:.1f}ms")
+        results.add(f"ocr.{backend}.frame", time_calls(engine, frames, args.repeat, warmup=1))
+        results.add(f"ocr.{backend}.line", time_calls(engine.line, lines, args.repeat, warmup=1))
+
+        # прокрутка чата: инкрементальный OCR с этим движком
+        incremental = IncrementalChatOcr(engine)
+        results.add(f"ocr.{backend}.incremental", time_calls(incremental, frames, 1, warmup=0))
+        print(f"{backend}: инкрементальный OCR {incremental.stats()}")
+
+        if reference is None:
+            reference, reference_name = texts, backend
+        same = sum(" ".join(a.split()) == " ".join(b.split()) for a, b in zip(texts, reference))
+        agreement[backend] = same
+        print(f"{backend}: текст совпал с {reference_name} в {same} из {len(frames)} кадров")
+        engine.close()
+
+    if args.out:
+        data = results.to_dict()
+        data["agreement"] = agreement
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        print(f"Результаты сохранены в {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,482 @@
+"""
+Бенчмарк стадий пайплайна capture -> detect -> decide -> act.
+
+Примеры (из папки Projectx):
+    python benchmarks/pipeline_bench.py run --out bench.json
+    python benchmarks/pipeline_bench.py run --frames session.frames --weights best.pt --out new.json
+    python benchmarks/pipeline_bench.py compare bench.json new.json --threshold 10
+
+Без --frames кадры генерируются синтетически (benchmarks/synthetic.py) и пишутся во
+временную запись, чтобы grab шёл тем же путём ReplaySource/mmap, что и при replay.
+Стадии, для которых нет зависимостей (ultralytics, веса, tesseract), пропускаются
+с указанием причины в JSON.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from common import BenchResults, compare, quiet, time_calls
+import synthetic
+
+from frame_recorder import FrameReader, FrameRecorder, ReplaySource
+from pipeline import STATUS_TO_STATE
+from screen_capture import BgraFrame, to_gray
+
+CHAT_SAMPLES = [
+    "You use: Spoil",
+    "Вы используете: Spoil",
+    'Умение "Оценить" активировано',
+    "Спойл не удался",
+    "Цель уже оценена",
+    "Player: hello there",
+    "You have earned 1520 experience",
+]
+
+
+def _synthetic_recording(path, n_frames):
+    """HP убывает от 100% до 0 и держится на нуле — как бой до смерти цели."""
+    boxes = []
+    with quiet(), FrameRecorder(path) as rec:
+        for i in range(n_frames):
+            hp = max(0.0, 1.0 - i / max(1, n_frames - 5))
+            img, window_box, hp_box = synthetic.make_hp_frame(hp, seed=i)
+            rec.write(img, 1000.0 + i * 0.1)
+            boxes.append((window_box, hp_box))
+    return boxes
+
+
+def _load_hp_analyzer(results, args):
+    try:
+        from hp_analyzer import HpAnalyzerThread
+    except Exception as e:
+        results.skip("hp.*", f"hp_analyzer не импортируется: {e}")
+        return None, None
+    analyzer = None
+    if args.weights:
+        try:
+            from detectors import create_detector
+
+            with quiet():
+                detector = create_detector(
+                    args.backend, args.weights, imgsz=args.imgsz, threads=args.threads
+                )
+                analyzer = HpAnalyzerThread(
+                    (0, 0, 1, 1),
+                    lambda *a: None,
+                    detector=detector,
+                    change_gate=False,
+                    roi_lock=False,
+                    crop_detect=False,
+                )
+            results.add("hp.detector_load", [detector.load_time])
+            results.add("hp.detector_warmup", [detector.warmup_time])
+        except Exception as e:
+            results.skip("hp.detect_and_analyze", f"детектор не загружен: {e}")
+    else:
+        results.skip("hp.detect_and_analyze", "не задан --weights")
+    return HpAnalyzerThread, analyzer
+
+
+def bench_capture(results, reader, repeat):
+    left, top, width, height = reader.bounds()
+    monitor = {"left": left, "top": top, "width": width, "height": height}
+    source = ReplaySource(reader.path, loop=True)
+    n = len(reader) * repeat
+    results.add(
+        "capture.grab",
+        time_calls(lambda _: BgraFrame.from_shot(source.grab(monitor)), range(n)),
+    )
+    source.close()
+
+
+def bench_live_grab(results, region, repeat):
+    try:
+        import mss
+
+        with mss.mss() as sct:
+            x, y, w, h = region
+            monitor = {"left": x, "top": y, "width": w, "height": h}
+            results.add(
+                "capture.grab_live",
+                time_calls(lambda _: BgraFrame.from_shot(sct.grab(monitor)), range(50 * repeat)),
+            )
+    except Exception as e:
+        results.skip("capture.grab_live", e)
+
+
+def bench_convert(results, frames, repeat):
+    results.add(
+        "convert.bgra2bgr",
+        time_calls(lambda f: cv2.cvtColor(f, cv2.COLOR_BGRA2BGR), frames, repeat),
+    )
+    results.add("convert.bgra2gray", time_calls(to_gray, frames, repeat))
+
+
+def bench_hp(results, analyzer_cls, analyzer, frames, boxes, repeat):
+    if analyzer_cls is None:
+        return
+    if boxes is not None:
+        pairs = list(zip(frames, [b[1] for b in boxes]))
+        results.add(
+            "hp.analyze_hp_in_box",
+            time_calls(lambda p: analyzer_cls.analyze_hp_in_box(p[0], p[1]), pairs, repeat),
+        )
+    elif analyzer is not None:
+        detected = []
+        with quiet():
+            for f in frames:
+                _, _, _, hp_box = analyzer.detect_and_analyze(f)
+                if hp_box is not None:
+                    detected.append((f, hp_box))
+        if detected:
+            results.add(
+                "hp.analyze_hp_in_box",
+                time_calls(lambda p: analyzer_cls.analyze_hp_in_box(p[0], p[1]), detected, repeat),
+            )
+        else:
+            results.skip("hp.analyze_hp_in_box", "на записи не найден HP bar")
+    else:
+        results.skip("hp.analyze_hp_in_box", "нет боксов: запись без --weights")
+
+    if analyzer is not None:
+        results.add(
+            "hp.detect_and_analyze", time_calls(analyzer.detect_and_analyze, frames, repeat)
+        )
+        # то же с детекцией по кропу вокруг последнего окна цели
+        analyzer.crop_detect = True
+        results.add(
+            "hp.detect_and_analyze_crop",
+            time_calls(analyzer.detect_and_analyze, frames, repeat),
+        )
+        analyzer.crop_detect = False
+
+
+def bench_mob(results, template_path, repeat):
+    try:
+        from mob_searcher import MobSearcher
+    except Exception as e:
+        results.skip("mob.*", f"mob_searcher не импортируется: {e}")
+        return
+    searcher = MobSearcher(template_path)
+    frames = [
+        synthetic.make_mob_frame(seed=i, template=searcher.template)[0] for i in range(10)
+    ]
+    grays = [to_gray(f) for f in frames]
+    results.add(
+        "mob.find_possible_targets",
+        time_calls(searcher.find_possible_targets, grays, repeat),
+    )
+    pairs = []
+    for g in grays:
+        candidates, _ = searcher.find_possible_targets(g)
+        pairs.extend((g, rect) for rect in candidates)
+    if pairs:
+        results.add(
+            "mob.check_circle_near_name",
+            time_calls(lambda p: searcher.check_circle_near_name(p[0], p[1]), pairs, repeat),
+        )
+
+    # проверка всех кандидатов кадра: цикл по одному против мозаики одним matchTemplate;
+    # отдельно — «людный» экран с десятками кандидатов
+    crowded = [
+        to_gray(
+            synthetic.make_mob_frame(
+                n_targets=16, n_decoys=24, seed=100 + i, template=searcher.template
+            )[0]
+        )
+        for i in range(10)
+    ]
+    for name, gray_set in (("", grays), ("_crowded", crowded)):
+        framed = [(g, searcher.find_possible_targets(g)[0]) for g in gray_set]
+        loop_t = time_calls(
+            lambda p: [searcher.check_circle_near_name(p[0], r) for r in p[1]], framed, repeat
+        )
+        batch_t = time_calls(
+            lambda p: searcher.check_circles_near_names(p[0], p[1]), framed, repeat
+        )
+        results.add(f"mob.verify_loop{name}", loop_t)
+        results.add(f"mob.verify_batched{name}", batch_t)
+        mismatched = sum(
+            [searcher.check_circle_near_name(g, r)[0] for r in rects]
+            != [found for found, _ in searcher.check_circles_near_names(g, rects)]
+            for g, rects in framed
+        )
+        n_candidates = sum(len(rects) for _, rects in framed) / len(framed)
+        print(
+            f"проверка{name}: кандидатов на кадр {n_candidates:.0f}, "
+            f"ускорение x{np.median(loop_t) / np.median(batch_t):.2f}, "
+            f"расхождений {mismatched} из {len(framed)}"
+        )
+
+    # поиск табличек: полное разрешение против грубо-точной пирамиды, кадр 2560x1440;
+    # расхождения — и на плотной раскладке (столбики табличек, белые полосы рядом)
+    stacked = [
+        to_gray(
+            synthetic.make_stacked_mob_frame(
+                width=2560, height=1440, seed=300 + i, template=searcher.template
+            )[0]
+        )
+        for i in range(5)
+    ]
+    large = [
+        to_gray(
+            synthetic.make_mob_frame(
+                n_targets=16, n_decoys=24, width=2560, height=1440, seed=200 + i,
+                template=searcher.template,
+            )[0]
+        )
+        for i in range(5)
+    ]
+    full_t = time_calls(searcher.find_possible_targets, large, repeat)
+    results.add("mob.find_targets_1440p", full_t)
+    for factor in (2, 4):
+        pyramid = MobSearcher(template_path, pyramid=factor)
+        pyr_t = time_calls(pyramid.find_possible_targets, large, repeat)
+        results.add(f"mob.find_targets_1440p_pyr{factor}", pyr_t)
+        mismatched = sum(
+            set(searcher.find_possible_targets(g)[0]) != set(pyramid.find_possible_targets(g)[0])
+            for g in large + stacked
+        )
+        print(
+            f"пирамида x{factor}: ускорение x{np.median(full_t) / np.median(pyr_t):.2f}, "
+            f"расхождений {mismatched} из {len(large) + len(stacked)}"
+        )
+
+    def search_frame(gray):
+        return searcher.analyze(gray)[0]
+
+    results.add("mob.search_frame", time_calls(search_frame, grays, repeat))
+
+
+def bench_chat(results, repeat):
+    try:
+        from chat_handler import ChatMessageHandler
+    except Exception as e:
+        results.skip("chat.*", f"chat_handler не импортируется: {e}")
+        return
+    handler = ChatMessageHandler()
+    results.add(
+        "chat.process_message",
+        time_calls(handler.process_message, CHAT_SAMPLES * 20, repeat),
+    )
+    try:
+        import pytesseract
+        from PIL import Image
+
+        frames = [
+            synthetic.make_chat_frame(CHAT_SAMPLES[i : i + 6], seed=i) for i in range(3)
+        ]
+        images = [Image.fromarray(cv2.cvtColor(f, cv2.COLOR_BGRA2RGB)) for f in frames]
+        pytesseract.get_tesseract_version()
+        results.add(
+            "chat.ocr",
+            time_calls(
+                lambda im: pytesseract.image_to_string(im, lang="rus+eng"),
+                images,
+                repeat,
+                warmup=1,
+            ),
+        )
+    except Exception as e:
+        results.skip("chat.ocr", e)
+
+    # инкрементальный OCR: прокрутка чата по одной строке, каждый кадр дважды (новый шум фона)
+    from chat_rows import IncrementalChatOcr
+
+    messages = [f"{CHAT_SAMPLES[i % len(CHAT_SAMPLES)]} #{i}" for i in range(40)]
+    scroll = [
+        synthetic.make_chat_frame(messages[max(0, t - 8) : t], seed=t * 2 + k)
+        for t in range(1, len(messages) + 1)
+        for k in range(2)
+    ]
+    # без OCR — стоимость разбиения на строки и сопоставления отпечатков
+    incremental = IncrementalChatOcr(lambda bgra: "")
+    results.add("chat.incremental_overhead", time_calls(incremental, scroll, 1, warmup=0))
+    try:
+        import pytesseract
+
+        from chat_handler import tesseract_ocr
+
+        pytesseract.get_tesseract_version()
+        results.add("chat.ocr_full_scroll", time_calls(tesseract_ocr, scroll, 1, warmup=1))
+        incremental = IncrementalChatOcr(tesseract_ocr)
+        results.add("chat.ocr_incremental_scroll", time_calls(incremental, scroll, 1, warmup=0))
+        print(f"инкрементальный OCR: {incremental.stats()}")
+    except Exception as e:
+        results.skip("chat.ocr_*_scroll", e)
+
+
+def _make_controller(send):
+    from events import HpActionController
+
+    return HpActionController(
+        send_command_callback=send,
+        spoil_enabled=False,
+        no_target_command=["F5"],
+        dead_target_command=["F1"],
+        alive_target_command=["1", "2"],
+        cooldown_sec=0.0,
+    )
+
+
+def bench_controller(results, repeat):
+    controller = _make_controller(lambda cmd: None)
+    states = []
+    for i in range(200):
+        if i % 50 < 40:
+            states.append(("alive_target", 100.0 - (i % 50) * 2.5))
+        elif i % 50 < 45:
+            states.append(("dead_target", 0.0))
+        else:
+            states.append(("no_target", 0.0))
+    results.add(
+        "controller.update",
+        time_calls(lambda s: controller.update(s[0], s[1]), states, repeat),
+    )
+
+
+def _open_loopback(results, url):
+    try:
+        from arduino_controller import ArduinoController
+
+        with quiet():
+            arduino = ArduinoController(url, timeout=0.5)
+        if arduino.ser is None:
+            raise RuntimeError(f"порт {url} не открыт")
+        return arduino
+    except Exception as e:
+        results.skip("arduino.send_command", e)
+        return None
+
+
+def bench_arduino(results, arduino, repeat):
+    def send(cmd):
+        arduino.send_command(cmd)
+        arduino.ser.read(len(cmd))  # очищаем loopback, чтобы буфер не рос
+
+    results.add("arduino.send_command", time_calls(send, ["F1\n", "MOUSE_MOVE 10 -5\n"] * 50, repeat))
+
+
+def bench_e2e(results, analyzer_cls, analyzer, reader, boxes, arduino):
+    """
+    Латентность реакции: от grab кадра с изменившимся HP до записи команды в порт
+    (и её получения на другом конце loopback).
+    """
+    if analyzer_cls is None or arduino is None:
+        results.skip("e2e.hp_change_to_command", "нет hp_analyzer или loopback-порта")
+        return
+    if analyzer is None and boxes is None:
+        results.skip("e2e.hp_change_to_command", "запись без --weights: нет детектора")
+        return
+
+    sent = []
+
+    def send(key):
+        sent.append(key)
+        arduino.send_key_by_name(key)
+
+    controller = _make_controller(send)
+    left, top, width, height = reader.bounds()
+    monitor = {"left": left, "top": top, "width": width, "height": height}
+    source = ReplaySource(reader.path)
+    samples = []
+    prev_hp = None
+    with quiet():
+        for i in range(len(reader)):
+            t0 = time.perf_counter()
+            img = BgraFrame.from_shot(source.grab(monitor)).array
+            if analyzer is not None:
+                status, hp, _, _ = analyzer.detect_and_analyze(img)
+            else:
+                hp = analyzer_cls.analyze_hp_in_box(img, boxes[i][1])
+                status = "Цель мертва" if hp < 1.5 else "Цель жива"
+            n_sent = len(sent)
+            controller.update(STATUS_TO_STATE.get(status, "no_target"), hp)
+            if len(sent) > n_sent:
+                arduino.ser.read_until(b"\n")
+                if prev_hp is None or abs(hp - prev_hp) > 1e-6:
+                    samples.append(time.perf_counter() - t0)
+            prev_hp = hp
+    source.close()
+    results.add("e2e.hp_change_to_command", samples)
+
+
+def run(args):
+    results = BenchResults("pipeline")
+    tmpdir = None
+    boxes = None
+    if args.frames:
+        path = args.frames
+    else:
+        tmpdir = tempfile.mkdtemp(prefix="projectx_bench_")
+        path = os.path.join(tmpdir, "synthetic.frames")
+        boxes = _synthetic_recording(path, args.synthetic_frames)
+
+    reader = FrameReader(path)
+    frames = [reader.frame(i)[0] for i in range(len(reader))]
+    print(f"Кадров: {len(frames)}, область: {reader.bounds()}")
+
+    bench_capture(results, reader, args.repeat)
+    if args.live:
+        bench_live_grab(results, reader.bounds(), args.repeat)
+    bench_convert(results, frames, args.repeat)
+
+    analyzer_cls, analyzer = _load_hp_analyzer(results, args)
+    bench_hp(results, analyzer_cls, analyzer, frames, boxes, args.repeat)
+    bench_mob(results, args.template, args.repeat)
+    bench_chat(results, args.repeat)
+    bench_controller(results, args.repeat)
+
+    arduino = _open_loopback(results, args.serial)
+    if arduino is not None:
+        bench_arduino(results, arduino, args.repeat)
+    bench_e2e(results, analyzer_cls, analyzer, reader, boxes, arduino)
+    if arduino is not None:
+        with quiet():
+            arduino.close()
+
+    del frames
+    reader.close()
+    if args.out:
+        results.save(args.out)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарк стадий пайплайна")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    r = sub.add_parser("run", help="замерить стадии и сохранить JSON")
+    r.add_argument("--frames", help="файл записи (frame_recorder); без него — синтетика")
+    r.add_argument("--synthetic-frames", type=int, default=60)
+    r.add_argument("--weights", help="веса/модель детектора для hp.detect_and_analyze")
+    r.add_argument("--backend", default="ultralytics", help="ultralytics | onnx | openvino")
+    r.add_argument("--imgsz", type=int, default=640)
+    r.add_argument("--threads", type=int, default=0)
+    r.add_argument("--template", default=synthetic.TEMPLATE_PATH)
+    r.add_argument("--serial", default="loop://", help="порт/URL pyserial для arduino-стадий")
+    r.add_argument("--repeat", type=int, default=3)
+    r.add_argument("--live", action="store_true", help="дополнительно замерить живой mss grab")
+    r.add_argument("--out", help="куда сохранить JSON")
+
+    c = sub.add_parser("compare", help="сравнить два JSON и показать регрессии")
+    c.add_argument("base")
+    c.add_argument("new")
+    c.add_argument("--metric", default="p50_ms")
+    c.add_argument("--threshold", type=float, default=10.0, help="порог регрессии, %%")
+
+    args = parser.parse_args(argv)
+    if args.cmd == "run":
+        return run(args)
+    regressions = compare(args.base, args.new, args.metric, args.threshold)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
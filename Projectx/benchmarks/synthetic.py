@@ -0,0 +1,163 @@
+"""
+Синтетические BGRA-кадры для бенчмарков, когда записи (frame_recorder) нет под рукой.
+Геометрия упрощённая, но пиксели проходят те же цветовые пороги, что и настоящие:
+красный HP bar, белые таблички имён (>= 252) с иконкой-шаблоном справа, строки чата.
+"""
+
+import os
+
+import cv2
+import numpy as np
+
+TEMPLATE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src", "cross.jpg"
+)
+
+
+def _background(rng, width, height):
+    noise = rng.integers(20, 90, size=(height // 8 + 1, width // 8 + 1, 3), dtype=np.uint8)
+    bg = cv2.resize(noise, (width, height), interpolation=cv2.INTER_LINEAR)
+    return cv2.cvtColor(bg, cv2.COLOR_BGR2BGRA)
+
+
+def make_hp_frame(hp_fraction, width=640, height=480, seed=0, window_pos=(220, 20)):
+    """
+    Кадр с окном цели и HP bar, заполненным на hp_fraction (0..1).
+    Возвращает (bgra, window_box, hp_box); боксы в формате (x1, y1, x2, y2).
+    """
+    rng = np.random.default_rng(seed)
+    img = _background(rng, width, height)
+    wx, wy = window_pos
+    ww, wh = 200, 48
+    cv2.rectangle(img, (wx, wy), (wx + ww, wy + wh), (30, 30, 30, 255), -1)
+    cv2.rectangle(img, (wx, wy), (wx + ww, wy + wh), (140, 140, 140, 255), 1)
+
+    hx1, hy1, hx2, hy2 = wx + 10, wy + 28, wx + ww - 10, wy + 38
+    cv2.rectangle(img, (hx1, hy1), (hx2 - 1, hy2 - 1), (45, 45, 60, 255), -1)
+    fill = int(round((hx2 - hx1) * max(0.0, min(1.0, hp_fraction))))
+    if fill > 0:
+        cv2.rectangle(img, (hx1, hy1), (hx1 + fill - 1, hy2 - 1), (20, 20, 200, 255), -1)
+    return img, (wx, wy, wx + ww, wy + wh), (hx1, hy1, hx2, hy2)
+
+
+def load_template():
+    return cv2.imread(TEMPLATE_PATH, cv2.IMREAD_GRAYSCALE)
+
+
+def make_mob_frame(n_targets=8, n_decoys=8, width=1280, height=720, seed=0, template=None):
+    """
+    Кадр с табличками имён: n_targets с иконкой-шаблоном справа и n_decoys без неё.
+    Возвращает (bgra, targets) — targets: список (x, y, w, h) табличек с иконкой.
+    """
+    rng = np.random.default_rng(seed)
+    img = _background(rng, width, height)
+    if template is None:
+        template = load_template()
+    th, tw = template.shape[:2]
+    icon = cv2.cvtColor(template, cv2.COLOR_GRAY2BGRA)
+
+    targets = []
+    occupied = []
+    for i in range(n_targets + n_decoys):
+        for _ in range(50):
+            w = int(rng.integers(50, 160))
+            h = int(rng.integers(th + 1, 28))
+            x = int(rng.integers(0, width - w - tw - 4))
+            y = int(rng.integers(0, height - h - 2))
+            box = (x - 12, y - 12, x + w + tw + 16, y + h + 12)
+            if all(
+                box[2] < o[0] or box[0] > o[2] or box[3] < o[1] or box[1] > o[3]
+                for o in occupied
+            ):
+                break
+        else:
+            continue
+        occupied.append(box)
+        cv2.rectangle(img, (x, y), (x + w - 1, y + h - 1), (255, 255, 255, 255), -1)
+        if i < n_targets:
+            # иконка внутри полосы, которую проверяет check_circle_near_name: морфология
+            # (ядро 10x1) сдвигает правый край контура таблички на ~2 px
+            img[y : y + th, x + w + 3 : x + w + 3 + tw] = icon
+            targets.append((x, y, w, h))
+    return img, targets
+
+
+def make_stacked_mob_frame(n_stacks=6, n_bars=6, width=1280, height=720, seed=0, template=None):
+    """
+    Плотная раскладка для сверки грубо-точной пирамиды с полным поиском: столбики
+    из 2-4 табличек с зазором 1-3 px и таблички рядом с высокой белой полосой
+    (10 px шириной, 100-160 px высотой). Возвращает (bgra, targets), как make_mob_frame.
+    """
+    rng = np.random.default_rng(seed)
+    img = _background(rng, width, height)
+    if template is None:
+        template = load_template()
+    th, tw = template.shape[:2]
+    icon = cv2.cvtColor(template, cv2.COLOR_GRAY2BGRA)
+    white = (255, 255, 255, 255)
+
+    targets = []
+    occupied = []
+
+    def place(box_w, box_h):
+        for _ in range(50):
+            x = int(rng.integers(0, width - box_w))
+            y = int(rng.integers(0, height - box_h))
+            box = (x - 12, y - 12, x + box_w + 12, y + box_h + 12)
+            if all(
+                box[2] < o[0] or box[0] > o[2] or box[3] < o[1] or box[1] > o[3]
+                for o in occupied
+            ):
+                occupied.append(box)
+                return x, y
+        return None
+
+    def plate(x, y, w, h):
+        cv2.rectangle(img, (x, y), (x + w - 1, y + h - 1), white, -1)
+        if rng.random() < 0.5:
+            img[y : y + th, x + w + 3 : x + w + 3 + tw] = icon
+            targets.append((x, y, w, h))
+
+    for _ in range(n_stacks):
+        n = int(rng.integers(2, 5))
+        w = int(rng.integers(50, 160))
+        h = int(rng.integers(th + 1, 28))
+        gaps = rng.integers(1, 4, size=n).tolist()
+        pos = place(w + tw + 4, n * h + sum(gaps))
+        if pos is None:
+            continue
+        x, y = pos
+        for gap in gaps:
+            plate(x, y, w, h)
+            y += h + gap
+
+    for _ in range(n_bars):
+        w = int(rng.integers(50, 160))
+        h = int(rng.integers(th + 1, 28))
+        bar_h = int(rng.integers(100, 161))
+        pos = place(w + tw + 22, bar_h)
+        if pos is None:
+            continue
+        x, y = pos
+        plate(x, y + int(rng.integers(0, bar_h - h)), w, h)
+        bar_x = x + w + tw + 12
+        cv2.rectangle(img, (bar_x, y), (bar_x + 9, y + bar_h - 1), white, -1)
+    return img, targets
+
+
+def make_chat_frame(lines, width=420, height=160, seed=0):
+    """Кадр области чата: строки текста снизу вверх, как в игровом чате."""
+    rng = np.random.default_rng(seed)
+    img = np.zeros((height, width, 4), dtype=np.uint8)
+    img[:, :, :3] = rng.integers(10, 30, size=(height, width, 3), dtype=np.uint8)
+    img[:, :, 3] = 255
+    y = height - 8
+    for line in reversed(list(lines)):
+        if y < 14:
+            break
+        cv2.putText(
+            img, line, (6, y), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (230, 230, 230, 255), 1,
+            cv2.LINE_AA,
+        )
+        y -= 18
+    return img
@@ -1,3 +1,7 @@
+import time
+
+STARTUP_T0 = time.perf_counter()
+
 import sys
 import os
 
@@ -40,4 +44,15 @@ if __name__ == "__main__":
         on_select_area=on_select_area,
         on_arduino_found=on_arduino_found,
     )
+    if "--startup-check" in sys.argv:
+        # профиль запуска (src/startup_profile.py): время до показа окна, затем выход
+        from startup_profile import report_startup
+
+        def on_first_map(event):
+            if event.widget is app:
+                app.unbind("<Map>")
+                report_startup(time.perf_counter() - STARTUP_T0)
+                app.after(100, app.on_closing)
+
+        app.bind("<Map>", on_first_map)
     app.mainloop()
@@ -1,9 +1,21 @@
+import math
 import serial
+import threading
 import time
 import serial.tools.list_ports
 
 
 class ArduinoController:
+    # Максимальный сдвиг одной команды MOUSE_MOVE (Mouse.move принимает signed char)
+    MOUSE_MAX_STEP = 127
+    # Ожидание остановки курсора после пакета движений: базовое + на каждый шаг пакета
+    # (Arduino получает шаги по serial и отдаёт их HID-отчётами по одному за опрос)
+    MOUSE_SETTLE_SEC = 0.02
+    MOUSE_STEP_SEC = 0.025
+    # курсор считается остановившимся, если позиция не меняется столько секунд
+    MOUSE_STABLE_SEC = 0.03
+    MOUSE_POLL_SEC = 0.01
+
     # Карта команд — сопоставляет имена клавиш с командами для Arduino
     key_map = {
         # Команды из твоего скетча
@@ -73,8 +85,12 @@ class ArduinoController:
     def __init__(self, port, baudrate=9600, timeout=0.5):
         self.ser = None
         self.port = port
+        # в порт пишут CommandStage (клавиши) и поиск мобов (мышь) из разных потоков:
+        # одна запись — целиком, движение мыши с коррекцией — без вклинившихся клавиш
+        self._write_lock = threading.RLock()
         try:
-            self.ser = serial.Serial(port, baudrate, timeout=timeout)
+            # serial_for_url принимает и обычные порты (COM3), и URL вроде loop:// для тестов
+            self.ser = serial.serial_for_url(port, baudrate, timeout=timeout)
             print(f"Подключено к порту {port} с baudrate {baudrate}")
             time.sleep(0.5)  # Ждём инициализацию Arduino
         except serial.SerialException as e:
@@ -83,7 +99,8 @@ class ArduinoController:
     def send_command(self, command):
         if self.ser and self.ser.is_open:
             try:
-                self.ser.write(command.encode("utf-8"))
+                with self._write_lock:
+                    self.ser.write(command.encode("utf-8"))
                 print(f"Отправлено: {repr(command)}")
             except Exception as e:
                 print(f"Ошибка при отправке команды: {e}")
@@ -116,6 +133,93 @@ class ArduinoController:
         cmd = f"MOUSE_MOVE {dx} {dy}\n"
         self.send_command(cmd)
 
+    @classmethod
+    def plan_mouse_path(cls, dx, dy, max_step=None):
+        """
+        Разбивает относительное движение (dx, dy) на равные шаги не длиннее max_step
+        по каждой оси. Сумма шагов точно равна (dx, dy); для нулевого движения — [].
+        """
+        max_step = max_step or cls.MOUSE_MAX_STEP
+        dx, dy = int(round(dx)), int(round(dy))
+        n = math.ceil(max(abs(dx), abs(dy)) / max_step)
+        steps = []
+        for i in range(1, n + 1):
+            # целочисленные доли без накопления ошибки округления
+            sx = dx * i // n - dx * (i - 1) // n
+            sy = dy * i // n - dy * (i - 1) // n
+            steps.append((sx, sy))
+        return steps
+
+    def move_mouse_path(self, steps):
+        """Все шаги движения — одной записью в порт (а не отдельной командой на шаг)."""
+        if not steps:
+            return
+        self.send_command("".join(f"MOUSE_MOVE {sx} {sy}\n" for sx, sy in steps))
+
+    def move_mouse_by(self, dx, dy):
+        """Относительное движение любой длины: план шагов + одна пакетная запись."""
+        steps = self.plan_mouse_path(dx, dy)
+        self.move_mouse_path(steps)
+        return steps
+
+    def move_mouse_to(self, target_x, target_y, get_position, verify=True, tolerance=2):
+        """
+        Движение курсора в точку экрана за один тик.
+        :param get_position: функция () -> (x, y) текущей позиции курсора (pyautogui.position)
+        :param verify: после движения дождаться остановки курсора и, если он не дошёл
+            (ускорение указателя в ОС, потерянные шаги), досылать один корректирующий пакет
+        :param tolerance: допустимый промах (px) по каждой оси
+        :return: промах (x, y) после основного пакета, до коррекции; без verify — (0, 0)
+        """
+        with self._write_lock:
+            return self._move_mouse_to(target_x, target_y, get_position, verify, tolerance)
+
+    def _move_mouse_to(self, target_x, target_y, get_position, verify, tolerance):
+        start = tuple(get_position())
+        steps = self.move_mouse_by(target_x - start[0], target_y - start[1])
+        if not verify or not steps:
+            return 0, 0
+
+        if self.ser and self.ser.is_open:
+            try:
+                self.ser.flush()  # дождаться отправки пакета, прежде чем читать курсор
+            except Exception:
+                pass
+        (current_x, current_y), settled = self._wait_cursor_settled(start, len(steps), get_position)
+        error_x, error_y = target_x - current_x, target_y - current_y
+        if (current_x, current_y) == start:
+            # курсор ещё не сдвинулся — пакет не дошёл; повтор удвоил бы движение
+            print("[ArduinoController] Курсор не сдвинулся после движения, коррекция пропущена")
+        elif not settled:
+            # пакет ещё исполняется — коррекция на весь остаток дала бы перелёт
+            print("[ArduinoController] Курсор ещё движется, коррекция пропущена")
+        elif abs(error_x) > tolerance or abs(error_y) > tolerance:
+            print(f"[ArduinoController] Коррекция движения мыши: ({error_x}, {error_y})")
+            self.move_mouse_by(error_x, error_y)
+        return error_x, error_y
+
+    def _wait_cursor_settled(self, start, n_steps, get_position):
+        """
+        Ждёт, пока курсор сдвинется со start и простоит MOUSE_STABLE_SEC, но не дольше
+        MOUSE_SETTLE_SEC + n_steps * MOUSE_STEP_SEC. :return: (позиция, остановился ли)
+        """
+        deadline = time.perf_counter() + self.MOUSE_SETTLE_SEC + n_steps * self.MOUSE_STEP_SEC
+        position = tuple(get_position())
+        stable_since = None
+        while True:
+            now = time.perf_counter()
+            if position != start and stable_since is not None:
+                if now - stable_since >= self.MOUSE_STABLE_SEC:
+                    return position, True
+            if now >= deadline:
+                return position, False
+            time.sleep(self.MOUSE_POLL_SEC)
+            current = tuple(get_position())
+            if current != position:
+                position, stable_since = current, None
+            elif stable_since is None:
+                stable_since = time.perf_counter()
+
     def mouse_click_left(self):
         """
         Отправка команды клика левой кнопкой мыши.
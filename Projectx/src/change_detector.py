@@ -0,0 +1,87 @@
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """
+    Дешёвый детектор изменений области между тиками.
+
+    Кадр уменьшается INTER_AREA в `downscale` раз (усреднение блоков, тонкие изменения
+    вроде сдвига края HP bar на 1-2 px всё равно меняют блок), затем thresholded abs-diff
+    с уменьшенной копией последнего кадра, признанного изменившимся (того, что реально
+    обработали). Если изменившихся блоков меньше min_changed_ratio — кадр считается
+    неизменным и дорогую обработку (YOLO, OCR) можно пропустить. Опорный кадр на пропусках
+    не обновляется, поэтому медленное изменение, ниже порога за тик, накапливается
+    и всё равно срабатывает.
+    """
+
+    def __init__(
+        self,
+        name="region",
+        downscale=4,
+        threshold=8,
+        min_changed_ratio=0.0,
+        report_every=200,
+    ):
+        """
+        :param name: имя для логов
+        :param downscale: во сколько раз уменьшать кадр перед сравнением
+        :param threshold: порог разницы яркости блока (0..255)
+        :param min_changed_ratio: доля изменившихся блоков, начиная с которой кадр «изменился»
+        :param report_every: печатать статистику пропусков каждые N проверок (0 — не печатать)
+        """
+        self.name = name
+        self.downscale = max(1, int(downscale))
+        self.threshold = int(threshold)
+        self.min_changed_ratio = float(min_changed_ratio)
+        self.report_every = int(report_every)
+
+        self._prev = None
+        self.checked = 0
+        self.skipped = 0
+
+    def _signature(self, img):
+        h, w = img.shape[:2]
+        size = (max(1, w // self.downscale), max(1, h // self.downscale))
+        return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+    def changed(self, img):
+        """True — кадр изменился (или первый), False — можно переиспользовать прошлый результат."""
+        sig = self._signature(img)
+        prev = self._prev
+        self.checked += 1
+
+        if prev is None or prev.shape != sig.shape:
+            is_changed = True
+        else:
+            diff = cv2.absdiff(sig, prev)
+            if diff.ndim == 3:
+                diff = diff.max(axis=2)
+            changed_blocks = np.count_nonzero(diff > self.threshold)
+            is_changed = bool(changed_blocks > self.min_changed_ratio * diff.size)
+
+        if is_changed:
+            self._prev = sig
+        else:
+            self.skipped += 1
+        if self.report_every and self.checked % self.report_every == 0:
+            print(
+                f"[ChangeDetector:{self.name}] пропущено {self.skipped}/{self.checked} "
+                f"({self.skip_ratio * 100:.1f}%)"
+            )
+        return is_changed
+
+    def invalidate(self):
+        """Сбросить опорный кадр — следующий changed() вернёт True."""
+        self._prev = None
+
+    @property
+    def skip_ratio(self):
+        return self.skipped / self.checked if self.checked else 0.0
+
+    def stats(self):
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "skip_ratio": self.skip_ratio,
+        }
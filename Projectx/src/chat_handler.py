@@ -1,13 +1,19 @@
 import tkinter as tk
 from tkinter import ttk
-from PIL import ImageGrab
+from PIL import Image
+import cv2
 import pytesseract
 import threading
 import time
 import json
 import os
 
+import config
 from area_selector import AreaSelector  # Импорт твоего AreaSelector
+from change_detector import ChangeDetector
+from chat_rows import IncrementalChatOcr
+from scheduler import AdaptiveScheduler
+from screen_capture import get_capture_service
 
 
 class ChatMessageHandler:
@@ -134,15 +140,66 @@ class ChatSettingsWindow(tk.Toplevel):
         self.destroy()
 
 
-class ChatOCR(threading.Thread):
-    """Поток для захвата экрана и распознавания текста."""
+def tesseract_ocr(bgra, lang="rus+eng"):
+    """OCR области чата через pytesseract (процесс tesseract на каждый вызов, см. ocr_engines)."""
+    img = Image.fromarray(cv2.cvtColor(bgra, cv2.COLOR_BGRA2RGB))
+    return pytesseract.image_to_string(img, lang=lang)
+
 
-    def __init__(self, bbox, message_handler, hp_action_controller=None, interval=0.2):
+class ChatOCR(threading.Thread):
+    """
+    Поток для захвата экрана и распознавания текста.
+    Период адаптивный: interval пока в чате появляется новый текст или идёт бой,
+    до max_interval в простое.
+    """
+
+    CAPTURE_NAME = "chat"
+
+    def __init__(
+        self,
+        bbox,
+        message_handler,
+        hp_action_controller=None,
+        interval=0.2,
+        capture=None,
+        change_gate=True,
+        max_interval=None,
+        ocr=None,
+        incremental=True,
+        ocr_factory=None,
+    ):
+        """
+        :param ocr: ocr(bgra) -> текст: движок ocr_engines или RemoteOcr сервера инференса
+            (по умолчанию — tesseract_ocr)
+        :param incremental: распознавать только новые строки чата (IncrementalChatOcr),
+            иначе — всю область каждый раз, когда она изменилась
+        :param ocr_factory: () -> ocr или None; вызывается в потоке распознавания, а не
+            в потоке Tk (подключение к серверу инференса может занять секунды).
+            None из фабрики или ошибка — используется ocr
+        """
         super().__init__(daemon=True)
         self.bbox = bbox  # (x, y, w, h)
+        self.incremental = incremental
+        self.ocr_factory = ocr_factory
+        self._fallback_ocr = ocr
+        self.ocr = None
+        if ocr_factory is None:
+            self._set_ocr(ocr)
         self.message_handler = message_handler
         self.hp_action_controller = hp_action_controller
         self.interval = interval
+        self.capture = capture or get_capture_service()
+        self.capture_name = f"{self.CAPTURE_NAME}:{id(self)}"
+        # пропуск OCR, если область чата не изменилась с прошлого тика
+        self.change_detector = ChangeDetector("chat") if change_gate else None
+        self.last_text = None
+        # при воспроизведении записи время ускорено в capture.speed раз
+        speed = getattr(self.capture, "speed", 1.0) or 1.0
+        self.scheduler = AdaptiveScheduler(
+            interval / speed,
+            max_interval / speed if max_interval else None,
+            name="chat",
+        )
         self.running = False
 
     def start(self):
@@ -152,23 +209,89 @@ class ChatOCR(threading.Thread):
     def stop(self):
         self.running = False
 
+    def _set_ocr(self, ocr):
+        self.ocr = ocr or tesseract_ocr
+        if self.incremental:
+            self.ocr = IncrementalChatOcr(self.ocr)
+
+    def _create_ocr(self):
+        ocr = None
+        try:
+            ocr = self.ocr_factory()
+        except Exception as e:
+            print(f"[ChatOCR] OCR не создан, используется запасной: {e}")
+        self._set_ocr(ocr or self._fallback_ocr)
+
+    def _in_combat(self):
+        controller = self.hp_action_controller
+        return controller is not None and controller.current_state in (
+            controller.STATE_ALIVE_TARGET,
+            controller.STATE_DEAD_TARGET,
+        )
+
+    def _close_ocr(self):
+        close = getattr(self.ocr, "close", None)
+        if close is not None:
+            close()
+
     def run(self):
-        while self.running:
-            x, y, w, h = self.bbox
-            try:
-                img = ImageGrab.grab(bbox=(x, y, x + w, y + h))
-                text = pytesseract.image_to_string(img, lang="rus+eng")
-                print(f"[ChatOCR] Распознанный текст:\n{text}\n{'-'*40}")
-                state = self.message_handler.process_message(text)
-                if state:
-                    print(f"[ChatOCR] Обнаружено состояние: {state}")
-                    if self.hp_action_controller:
-                        is_spoiled, can_sweep = self.message_handler.get_state()
-                        self.hp_action_controller.set_spoil_state(is_spoiled, can_sweep)
-                time.sleep(self.interval)
-            except Exception as e:
-                print(f"[ChatOCR] Ошибка распознавания: {e}")
-                time.sleep(5)
+        if self.ocr is None:
+            self._create_ocr()
+        if not self.running:
+            self._close_ocr()
+            return
+        self.capture.register(self.capture_name, self.bbox, self.scheduler.interval)
+        last_id = None
+        try:
+            while self.running:
+                try:
+                    frame = self.capture.get_frame(self.capture_name, after_id=last_id)
+                    if frame is None or frame.image.size == 0:
+                        self.scheduler.wait()
+                        continue
+                    last_id = frame.frame_id
+                    prev_text = self.last_text
+                    changed = (
+                        self.change_detector is None
+                        or self.change_detector.changed(frame.image)
+                    )
+                    new_text = None
+                    if changed or self.last_text is None:
+                        new_text = self.ocr(frame.image)
+                        self.last_text = new_text
+                        if new_text or not self.incremental:
+                            print(f"[ChatOCR] Распознанный текст:\n{new_text}\n{'-'*40}")
+                    if self.incremental:
+                        # в инкрементальном режиме ocr возвращает только новые строки:
+                        # каждая обрабатывается один раз, а не на каждом тике
+                        text = new_text or ""
+                        active = bool(text)
+                    else:
+                        text = self.last_text
+                        active = text != prev_text
+                    state = self.message_handler.process_message(text) if text else None
+                    if state:
+                        print(f"[ChatOCR] Обнаружено состояние: {state}")
+                        if self.hp_action_controller:
+                            is_spoiled, can_sweep = self.message_handler.get_state()
+                            self.hp_action_controller.set_spoil_state(is_spoiled, can_sweep)
+                    self.scheduler.update(active or self._in_combat())
+                    self.capture.set_interval(self.capture_name, self.scheduler.interval)
+                    self.scheduler.wait()
+                except Exception as e:
+                    print(f"[ChatOCR] Ошибка распознавания: {e}")
+                    time.sleep(5)
+        finally:
+            self.capture.unregister(self.capture_name)
+            self._close_ocr()
+            if self.change_detector is not None:
+                print(f"[ChatOCR] change gate: {self.change_detector.stats()}")
+            print(f"[ChatOCR] scheduler: {self.scheduler.stats()}")
+            if self.incremental:
+                print(f"[ChatOCR] rows: {self.ocr.stats()}")
+            engine = self.ocr.ocr if self.incremental else self.ocr
+            if hasattr(engine, "stats"):
+                print(f"[ChatOCR] engine: {engine.stats()}")
 
 
 class ChatHandlerWindow(tk.Toplevel):
@@ -231,14 +354,41 @@ class ChatHandlerWindow(tk.Toplevel):
             return
         if self.ocr:
             self.ocr.stop()
+        cfg = config.load_config()
+        # загрузка моделей Tesseract и подключение к серверу (с его запуском) —
+        # в потоке ChatOCR, окно не замирает
         self.ocr = ChatOCR(
             self.selected_area,
             self.message_handler,
             hp_action_controller=self.hp_action_controller,
+            interval=cfg["chat_min_interval_sec"],
+            max_interval=cfg["chat_max_interval_sec"],
+            incremental=cfg["chat_incremental_ocr"],
+            ocr_factory=lambda: self._ocr_from_config(cfg),
         )
         self.ocr.start()
         self.update_status("Распознавание запущено", "green")
 
+    @staticmethod
+    def _ocr_from_config(cfg):
+        """RemoteOcr сервера инференса (inference_mode=server), иначе локальный движок."""
+        if cfg["inference_mode"] == "server":
+            from inference_server import RemoteOcr, client_from_config
+
+            try:
+                return RemoteOcr(
+                    client_from_config(cfg, timeout=10.0).connect(),
+                    lang=cfg["ocr_lang"],
+                    psm=cfg["ocr_psm"],
+                    whitelist=cfg["ocr_whitelist"],
+                    backend=cfg["ocr_backend"],
+                )
+            except Exception as e:
+                print(f"[ChatHandlerWindow] Сервер инференса недоступен, OCR локально: {e}")
+        from ocr_engines import ocr_from_config
+
+        return ocr_from_config(cfg)
+
     def stop_ocr(self):
         if self.ocr:
             self.ocr.stop()
@@ -0,0 +1,288 @@
+"""
+Инкрементальный OCR чата: распознаются только строки, появившиеся с прошлого тика.
+
+Область чата делится на строки текста по горизонтальному профилю маски букв.
+Каждая строка получает отпечаток (яркость и маска букв, обрезанные по самим буквам),
+поэтому он не зависит от вертикального положения строки. Прокрутка находится
+сопоставлением отпечатков с прошлым кадром: новые — строки ниже последней уже виденной.
+Новые строки с известным отпечатком берут текст из кеша, остальные склеиваются
+столбиком в одно изображение и уходят в OCR одним вызовом, а если движок держит
+Tesseract в процессе (ocr.persistent) — распознаются по одной в режиме строки.
+"""
+
+import hashlib
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from screen_capture import to_gray
+
+
+def text_mask(gray):
+    """Маска букв: порог Оцу, буквами считается меньший по площади класс."""
+    _, mask = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    if cv2.countNonZero(mask) > mask.size // 2:
+        mask = cv2.bitwise_not(mask)
+    return mask
+
+
+def split_rows(mask, min_ink=2, min_height=5, max_gap=1):
+    """
+    Строки текста по горизонтальному профилю: (y1, y2) полос, где в строке пикселей
+    не меньше min_ink пикселей букв. Разрывы до max_gap px (точки над буквами,
+    «й») склеиваются, полосы ниже min_height отбрасываются.
+    """
+    ink = np.count_nonzero(mask, axis=1) >= min_ink
+    edges = np.diff(np.concatenate(([0], ink.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1).tolist()
+    ends = np.flatnonzero(edges == -1).tolist()
+    rows = []
+    for y1, y2 in zip(starts, ends):
+        if rows and y1 - rows[-1][1] <= max_gap:
+            rows[-1] = (rows[-1][0], y2)
+        else:
+            rows.append((y1, y2))
+    return [(y1, y2) for y1, y2 in rows if y2 - y1 >= min_height]
+
+
+# на сколько px может сместиться рамка букв одной и той же строки между кадрами
+ROW_SHIFT = 1
+# порядок сдвигов при сравнении: сначала без сдвига — самый частый случай
+_SHIFTS = sorted(
+    ((dy, dx) for dy in range(-ROW_SHIFT, ROW_SHIFT + 1) for dx in range(-ROW_SHIFT, ROW_SHIFT + 1)),
+    key=lambda d: abs(d[0]) + abs(d[1]),
+)
+
+
+class RowSignature:
+    """
+    Отпечаток строки: яркость и маска букв, обрезанные по самим буквам, и хеш маски.
+    Сглаженные края букв на полупрозрачном фоне чата от кадра к кадру переключаются
+    через порог маски, поэтому кроме точного хеша есть нечёткое сравнение (same_row).
+    """
+
+    __slots__ = ("padded", "shape", "ink", "fg", "bg", "digest")
+
+    def __init__(self, gray, mask):
+        gray = gray.astype(np.int16)
+        self.shape = mask.shape
+        self.ink = int(np.count_nonzero(mask))
+        # уровни букв и фона строки — для порога «пиксель действительно другой»
+        self.fg = float(np.median(gray[mask]))
+        self.bg = float(np.median(gray[~mask])) if self.ink < mask.size else 0.0
+        # яркость с полями ROW_SHIFT цвета фона — для сравнения со сдвигом без копий
+        self.padded = np.full(
+            (self.shape[0] + 2 * ROW_SHIFT, self.shape[1] + 2 * ROW_SHIFT),
+            int(self.bg),
+            dtype=np.int16,
+        )
+        self.padded[ROW_SHIFT:-ROW_SHIFT, ROW_SHIFT:-ROW_SHIFT] = gray
+        digest = hashlib.blake2b(np.packbits(mask, axis=1).tobytes(), digest_size=12)
+        digest.update(np.array(mask.shape, dtype=np.int32).tobytes())
+        self.digest = digest.hexdigest()
+
+    @classmethod
+    def from_row(cls, gray_row, mask_row):
+        """None — в строке нет пикселей букв."""
+        rows = np.flatnonzero(mask_row.any(axis=1))
+        cols = np.flatnonzero(mask_row.any(axis=0))
+        if cols.size == 0:
+            return None
+        crop = (slice(rows[0], rows[-1] + 1), slice(cols[0], cols[-1] + 1))
+        return cls(gray_row[crop], np.ascontiguousarray(mask_row[crop] > 0))
+
+
+def same_row(a, b, tolerance=0.005):
+    """
+    Одна и та же строка: яркость строк, совмещённых с точностью до сдвига рамки
+    на ROW_SHIFT px, отличается больше чем на половину контраста букв не более чем
+    в доле tolerance пикселей букв. Сглаженный край на другом фоне меняет яркость
+    на единицы, другая буква или цифра — на весь контраст.
+    """
+    if a.digest == b.digest:
+        return True
+    (ah, aw), (bh, bw) = a.shape, b.shape
+    if abs(ah - bh) > 2 * ROW_SHIFT or abs(aw - bw) > 2 * ROW_SHIFT:
+        return False
+    delta = (min(a.fg, b.fg) - max(a.bg, b.bg)) / 2.0
+    if delta <= 0:
+        return False
+    limit = max(2, int(tolerance * max(a.ink, b.ink)))
+    h, w = min(ah, bh), min(aw, bw)
+    m = ROW_SHIFT
+    a_view = a.padded[m : m + h, m : m + w]
+    for dy, dx in _SHIFTS:
+        b_view = b.padded[m + dy : m + dy + h, m + dx : m + dx + w]
+        if np.count_nonzero(np.abs(a_view - b_view) > delta) <= limit:
+            return True
+    return False
+
+
+def find_new_rows(prev, current, same=same_row):
+    """
+    Индекс первой новой строки в current по отпечаткам прошлого кадра prev.
+    Ищется последняя строка prev (или, если её уже не видно, предыдущая) в current;
+    при повторах выбирается положение, где совпадает самая длинная цепочка строк над ней,
+    а при равных цепочках — самое верхнее: повтор той же строки в незаполненном чате —
+    новая строка, а не уже прочитанная. Совпадения нет — все строки новые (0).
+    """
+    if not prev or not current:
+        return 0
+    memo = {}
+
+    def eq(j, i):
+        key = (j, i)
+        if key not in memo:
+            memo[key] = same(current[j], prev[i])
+        return memo[key]
+
+    n = len(prev)
+    for back in range(1, n + 1):
+        best_score, best_j = 0, None
+        for j in range(len(current)):
+            if not eq(j, n - back):
+                continue
+            score = 0
+            while score <= j and score + back <= n and eq(j - score, n - back - score):
+                score += 1
+            if score > best_score:
+                best_score, best_j = score, j
+        if best_j is not None:
+            return best_j + 1
+    return 0
+
+
+class IncrementalChatOcr:
+    """
+    ocr(bgra) -> текст только новых строк чата (пустая строка, если новых нет).
+    Счётчики: rows_ocr — строки, ушедшие в OCR; rows_cached — новые строки с текстом
+    из кеша; rows_skipped — уже распознанные строки, оставшиеся на экране.
+    """
+
+    ROW_PAD = 3  # поля строки при склейке для OCR (px)
+    FUZZY_LOOKUP = 32  # сколько последних строк кеша сравнивать нечётко
+
+    def __init__(self, ocr, cache_size=512, min_ink=2, min_height=5, max_gap=1):
+        """
+        :param ocr: функция ocr(bgra) -> текст (движок ocr_engines, tesseract_ocr или RemoteOcr);
+            у движков с persistent = True строки распознаются по одной через ocr.line
+        :param cache_size: сколько отпечатков строк с текстом помнить
+        """
+        self.ocr = ocr
+        self.cache_size = int(cache_size)
+        self.min_ink = min_ink
+        self.min_height = min_height
+        self.max_gap = max_gap
+        self.cache = OrderedDict()  # digest -> (RowSignature, текст строки)
+        self.prev = []  # отпечатки строк прошлого кадра, сверху вниз
+        self.ocr_calls = 0
+        self.rows_ocr = 0
+        self.rows_cached = 0
+        self.rows_skipped = 0
+        self.scrolls = 0
+
+    def reset(self):
+        self.prev = []
+
+    def rows(self, bgra):
+        """Строки кадра: список ((y1, y2), RowSignature), сверху вниз."""
+        gray = to_gray(bgra)
+        mask = text_mask(gray)
+        out = []
+        for y1, y2 in split_rows(mask, self.min_ink, self.min_height, self.max_gap):
+            sig = RowSignature.from_row(gray[y1:y2], mask[y1:y2])
+            if sig is not None:
+                out.append(((y1, y2), sig))
+        return out
+
+    def lookup(self, sig):
+        """Текст уже распознанной строки с таким отпечатком (или None)."""
+        entry = self.cache.get(sig.digest)
+        if entry is None:
+            # точного совпадения нет — нечёткое сравнение с последними строками
+            # (повторы сообщений в чате идут подряд, весь кеш перебирать незачем)
+            for _, (known, text) in zip(range(self.FUZZY_LOOKUP), reversed(self.cache.values())):
+                if same_row(sig, known):
+                    entry = (known, text)
+                    break
+            else:
+                return None
+        self.cache.move_to_end(entry[0].digest)
+        return entry[1]
+
+    def _remember(self, sig, text):
+        self.cache[sig.digest] = (sig, text)
+        self.cache.move_to_end(sig.digest)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+
+    def _ocr_rows(self, bgra, bands):
+        """Новые строки столбиком в одном изображении -> тексты строк (None — не разобрать)."""
+        h = bgra.shape[0]
+        crops = []
+        for y1, y2 in bands:
+            top, bottom = max(0, y1 - self.ROW_PAD), min(h, y2 + self.ROW_PAD)
+            crops.append(bgra[top:bottom])
+        if getattr(self.ocr, "persistent", False):
+            # вызов без запуска процесса: по строке на вызов, текст сопоставлен строкам точно
+            self.ocr_calls += len(crops)
+            lines = [self.ocr.line(np.ascontiguousarray(crop)) for crop in crops]
+            return "\n".join(lines), lines
+        self.ocr_calls += 1
+        text = self.ocr(np.ascontiguousarray(np.vstack(crops)))
+        lines = [line for line in text.splitlines() if line.strip()]
+        # tesseract может склеить или разбить строки — тогда кешировать нечего
+        if len(lines) != len(bands):
+            return text, [None] * len(bands)
+        return text, lines
+
+    def __call__(self, bgra):
+        rows = self.rows(bgra)
+        signatures = [sig for _, sig in rows]
+        first_new = find_new_rows(self.prev, signatures)
+        scrolled = 0 < first_new < len(self.prev)
+
+        texts = [None] * (len(rows) - first_new)
+        to_ocr = []
+        for k, (band, sig) in enumerate(rows[first_new:]):
+            cached = self.lookup(sig)
+            if cached is not None:
+                texts[k] = cached
+            else:
+                to_ocr.append((k, band, sig))
+        if to_ocr:
+            block, lines = self._ocr_rows(bgra, [band for _, band, _ in to_ocr])
+        # кадр запоминается только после OCR: если OCR упал, повтор на том же
+        # кадре распознает новые строки, а не сочтёт их уже прочитанными
+        self.prev = signatures
+        self.rows_skipped += first_new
+        self.rows_cached += len(texts) - len(to_ocr)
+        self.rows_ocr += len(to_ocr)
+        if scrolled:
+            self.scrolls += 1
+        if to_ocr:
+            if all(line is None for line in lines):
+                # строки не сопоставить с текстом — отдаём блок как есть, без кеша
+                known = [t for t in texts if t is not None]
+                return "\n".join(known + [block.strip()]).strip()
+            for (k, _, sig), line in zip(to_ocr, lines):
+                texts[k] = line
+                self._remember(sig, line)
+        return "\n".join(texts)
+
+    def stats(self):
+        total = self.rows_ocr + self.rows_cached + self.rows_skipped
+        return {
+            "ocr_calls": self.ocr_calls,
+            "rows_ocr": self.rows_ocr,
+            "rows_cached": self.rows_cached,
+            "rows_skipped": self.rows_skipped,
+            "scrolls": self.scrolls,
+            "ocr_ratio": round(self.rows_ocr / total, 3) if total else 0.0,
+        }
+
+    def close(self):
+        close = getattr(self.ocr, "close", None)
+        if close is not None:
+            close()
@@ -0,0 +1,274 @@
+"""
+Классический детектор окна цели и HP bar без нейросети — для слабых машин и
+многих клиентов на одном CPU.
+
+Окно цели ищется сопоставлением с шаблоном (cv2.matchTemplate, TM_SQDIFF с маской
+неизменных пикселей окна): грубо — на кадре, уменьшенном в 2 раза, затем уточнение
+в окрестности лучшего совпадения на полном разрешении. HP bar — по сериям пикселей
+цвета заливки (LUT-классы из hp_fill) в строках около места полосы из шаблона:
+левый край и строки берутся из серий, ширина — из шаблона (заливка бывает неполной).
+Если заливки нет (цель мертва), полоса ставится по шаблону.
+
+predict() отдаёт тот же формат (N, 6), что и YOLO-бэкенды (cls 0 — окно, cls 1 — HP bar),
+поэтому HpAnalyzerThread, детекция по кропу и HpRoiLock работают без изменений:
+
+    detector_backend = "classic", detector_weights = путь к шаблону .npz
+
+Шаблон снимается с записи frame_recorder по детекциям YOLO (медиана кропов окна,
+маска — пиксели с малым разбросом между кадрами) или по боксам, заданным вручную:
+
+    python src/classic_detector.py calibrate --frames session.frames --weights best.pt --out target.npz
+    python src/classic_detector.py calibrate --frames session.frames --window 220,20,420,68 --hp 230,48,410,58 --out target.npz
+"""
+
+import argparse
+import math
+
+import cv2
+import numpy as np
+
+import hp_fill
+from detectors import Detector
+from screen_capture import to_gray
+
+# СКО яркости пикселя между кадрами калибровки, выше которой пиксель не входит в маску
+STABLE_STD = 12.0
+# маска не может быть меньше этой доли шаблона (иначе — полоса рамки по краям)
+MIN_MASK_RATIO = 0.2
+# ширина полосы рамки, если стабильных пикселей мало
+FALLBACK_BORDER_PX = 3
+
+
+def calibrate(samples):
+    """
+    Шаблон окна цели по кадрам с известными боксами.
+    :param samples: список (img BGR/BGRA, window_box, hp_box)
+    :return: dict(template, mask, hp_rel) для save_template
+    """
+    if not samples:
+        raise ValueError("Нет кадров для калибровки")
+    sizes = np.array(
+        [(int(w[2]) - int(w[0]), int(w[3]) - int(w[1])) for _, w, _ in samples]
+    )
+    tw, th = (int(v) for v in np.median(sizes, axis=0))
+    if tw < 8 or th < 8:
+        raise ValueError(f"Слишком маленькое окно цели: {tw}x{th}")
+
+    crops, rel = [], []
+    for img, window_box, hp_box in samples:
+        x1, y1, x2, y2 = map(int, window_box)
+        crop = to_gray(img[max(0, y1) : y2, max(0, x1) : x2])
+        if crop.size == 0:
+            continue
+        if crop.shape != (th, tw):
+            crop = cv2.resize(crop, (tw, th), interpolation=cv2.INTER_AREA)
+        crops.append(crop)
+        sx, sy = tw / max(1, x2 - x1), th / max(1, y2 - y1)
+        hx1, hy1, hx2, hy2 = hp_box
+        rel.append(((hx1 - x1) * sx, (hy1 - y1) * sy, (hx2 - x1) * sx, (hy2 - y1) * sy))
+    stack = np.stack(crops).astype(np.float32)
+    template = np.median(stack, axis=0).astype(np.uint8)
+    hp_rel = np.round(np.median(np.array(rel), axis=0)).astype(np.int32)
+
+    if len(crops) > 1:
+        mask = stack.std(axis=0) < STABLE_STD
+    else:
+        mask = np.ones((th, tw), dtype=bool)
+    # заливка HP bar меняется всегда — её в шаблоне быть не должно
+    hx1, hy1, hx2, hy2 = hp_rel
+    mask[max(0, hy1 - 1) : hy2 + 1, max(0, hx1 - 1) : hx2 + 1] = False
+    if mask.mean() < MIN_MASK_RATIO:
+        b = FALLBACK_BORDER_PX
+        mask[:] = False
+        mask[:b, :] = mask[-b:, :] = mask[:, :b] = mask[:, -b:] = True
+    print(
+        f"[ClassicDetector] Шаблон {tw}x{th} по {len(crops)} кадрам, "
+        f"маска {mask.mean() * 100:.0f}%, HP bar {tuple(int(v) for v in hp_rel)}"
+    )
+    return {"template": template, "mask": mask.astype(np.uint8), "hp_rel": hp_rel}
+
+
+def save_template(path, calibration):
+    np.savez_compressed(path, **calibration)
+    print(f"[ClassicDetector] Шаблон сохранён: {path}")
+
+
+class ClassicDetector(Detector):
+    """Шаблон рамки окна + серии цвета HP bar; интерфейс detectors.Detector."""
+
+    backend = "classic"
+
+    # СКО разницы с шаблоном (0..255), при которой уверенность падает до нуля
+    MAX_RMS = 32.0
+    # ниже этой уверенности совпадение не считается окном (conf детектора — для YOLO)
+    MIN_SCORE = 0.4
+    # на сколько строк выше/ниже места из шаблона ищется полоса
+    BAR_SEARCH_ROWS = 3
+    # допустимый сдвиг левого края серии от края полосы в шаблоне (px)
+    BAR_EDGE_TOLERANCE = 3
+    # минимальная длина серии заливки в строке (px)
+    MIN_RUN = 2
+
+    def _load(self):
+        with np.load(self.weights) as f:
+            data = {k: f[k] for k in f.files}
+        self.template = np.ascontiguousarray(data["template"], dtype=np.uint8)
+        self.mask = (np.asarray(data["mask"]) > 0).astype(np.float32)
+        self.hp_rel = tuple(int(v) for v in data["hp_rel"])
+        th, tw = self.template.shape
+        # грубый поиск в 2 раза меньше, если шаблон после уменьшения ещё различим
+        self.scale = 0.5 if min(th, tw) >= 24 else 1.0
+        self._template_f = self.template.astype(np.float32)
+        self._mask_count = float(self.mask.sum())
+        if self.scale < 1.0:
+            size = (max(1, int(tw * self.scale)), max(1, int(th * self.scale)))
+            self._small_template = cv2.resize(self._template_f, size, interpolation=cv2.INTER_AREA)
+            self._small_mask = (
+                cv2.resize(self.mask, size, interpolation=cv2.INTER_AREA) > 0.99
+            ).astype(np.float32)
+        self.matches = 0
+        self.misses = 0
+
+    def _match(self, gray_f, template, mask):
+        if gray_f.shape[0] < template.shape[0] or gray_f.shape[1] < template.shape[1]:
+            return None, math.inf
+        res = cv2.matchTemplate(gray_f, template, cv2.TM_SQDIFF, mask=mask)
+        min_val, _, min_loc, _ = cv2.minMaxLoc(res)
+        return min_loc, max(min_val, 0.0)
+
+    def find_window(self, gray):
+        """(x1, y1, x2, y2) лучшего совпадения с шаблоном и уверенность 0..1."""
+        th, tw = self.template.shape
+        h, w = gray.shape
+        if h < th or w < tw:
+            return None, 0.0
+        if self.scale < 1.0:
+            small = cv2.resize(
+                gray, None, fx=self.scale, fy=self.scale, interpolation=cv2.INTER_AREA
+            ).astype(np.float32)
+            loc, _ = self._match(small, self._small_template, self._small_mask)
+            if loc is None:
+                return None, 0.0
+            r = int(math.ceil(1.0 / self.scale)) + 1
+            cx, cy = int(loc[0] / self.scale), int(loc[1] / self.scale)
+            x1, y1 = max(0, cx - r), max(0, cy - r)
+            x2, y2 = min(w, cx + r + tw), min(h, cy + r + th)
+        else:
+            x1, y1, x2, y2 = 0, 0, w, h
+        loc, sqdiff = self._match(
+            gray[y1:y2, x1:x2].astype(np.float32), self._template_f, self.mask
+        )
+        if loc is None:
+            return None, 0.0
+        rms = math.sqrt(sqdiff / max(self._mask_count, 1.0))
+        score = max(0.0, 1.0 - rms / self.MAX_RMS)
+        x, y = x1 + loc[0], y1 + loc[1]
+        return (x, y, x + tw, y + th), score
+
+    def find_hp_bar(self, img, window_box):
+        """
+        HP bar внутри окна: строки с сериями цвета заливки около места из шаблона.
+        :return: (x1, y1, x2, y2) и найден ли бар по цвету (False — место из шаблона)
+        """
+        wx, wy = int(window_box[0]), int(window_box[1])
+        rx1, ry1, rx2, ry2 = self.hp_rel
+        expected = (wx + rx1, wy + ry1, wx + rx2, wy + ry2)
+        m = self.BAR_SEARCH_ROWS
+        h, w = img.shape[:2]
+        bx1 = max(0, expected[0] - self.BAR_EDGE_TOLERANCE)
+        by1, by2 = max(0, expected[1] - m), min(h, expected[3] + m)
+        bx2 = min(w, expected[2])
+        if bx2 <= bx1 or by2 <= by1:
+            return expected, False
+
+        filled = hp_fill.classify(img[by1:by2, bx1:bx2]) > 0
+        run_rows = np.flatnonzero(filled.sum(axis=1) >= self.MIN_RUN)
+        if run_rows.size == 0:
+            return expected, False
+        # самый длинный блок подряд идущих строк с заливкой
+        splits = np.flatnonzero(np.diff(run_rows) > 1) + 1
+        block = max(np.split(run_rows, splits), key=len)
+        left = int(filled[block].any(axis=0).argmax()) + bx1
+        if abs(left - expected[0]) > self.BAR_EDGE_TOLERANCE:
+            return expected, False
+        y1, y2 = by1 + int(block[0]), by1 + int(block[-1]) + 1
+        return (left, y1, left + (rx2 - rx1), y2), True
+
+    def predict(self, img, imgsz=None):
+        """img — BGR/BGRA (в т.ч. strided view); imgsz не используется."""
+        window_box, score = self.find_window(to_gray(img))
+        if window_box is None or score < max(self.conf, self.MIN_SCORE):
+            self.misses += 1
+            return np.zeros((0, 6), dtype=np.float32)
+        self.matches += 1
+        hp_box, by_color = self.find_hp_bar(img, window_box)
+        # бар по цвету подтверждает окно; по одному шаблону — уверенность ниже
+        hp_score = score if by_color else score * 0.9
+        return np.array(
+            [(*window_box, score, 0), (*hp_box, hp_score, 1)], dtype=np.float32
+        )
+
+
+def _parse_box(text):
+    x1, y1, x2, y2 = (int(v) for v in text.split(","))
+    return x1, y1, x2, y2
+
+
+def calibrate_from_recording(path, reference=None, window=None, hp=None, limit=50):
+    """
+    Калибровка по записи frame_recorder: боксы от reference-детектора (YOLO) на первых
+    limit кадрах, где найдены оба бокса, или одни и те же боксы window/hp для всех кадров.
+    """
+    from frame_recorder import FrameReader
+    from screen_capture import as_bgr
+
+    reader = FrameReader(path)
+    samples = []
+    try:
+        for i in range(len(reader)):
+            img = reader.frame(i)[0]
+            if reference is None:
+                samples.append((img.copy(), window, hp))
+            else:
+                window_box = hp_box = None
+                for x1, y1, x2, y2, score, cls in reference.predict(as_bgr(img)):
+                    if int(cls) == 0 and score > 0.5:
+                        window_box = (x1, y1, x2, y2)
+                    elif int(cls) == 1 and score > 0.5:
+                        hp_box = (x1, y1, x2, y2)
+                if window_box is None or hp_box is None:
+                    continue
+                samples.append((img.copy(), window_box, hp_box))
+            if len(samples) >= limit:
+                break
+        return calibrate(samples)
+    finally:
+        reader.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Шаблон окна цели для классического детектора")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    cal = sub.add_parser("calibrate", help="снять шаблон с записи frame_recorder")
+    cal.add_argument("--frames", required=True)
+    cal.add_argument("--out", required=True, help="файл шаблона .npz")
+    cal.add_argument("--window", type=_parse_box, help="x1,y1,x2,y2 окна цели (вместо YOLO)")
+    cal.add_argument("--hp", type=_parse_box, help="x1,y1,x2,y2 HP bar (вместо YOLO)")
+    cal.add_argument("--weights", help="веса YOLO для боксов (по умолчанию из config)")
+    cal.add_argument("--backend", default="ultralytics")
+    cal.add_argument("--limit", type=int, default=50, help="сколько кадров брать")
+    args = parser.parse_args()
+
+    if (args.window is None) != (args.hp is None):
+        parser.error("--window и --hp задаются вместе")
+    reference = None
+    if args.window is None:
+        import config
+        from detectors import create_detector
+
+        weights = args.weights or config.load_config()["detector_weights"]
+        reference = create_detector(args.backend, weights)
+    calibration = calibrate_from_recording(
+        args.frames, reference, args.window, args.hp, limit=args.limit
+    )
+    save_template(args.out, calibration)
@@ -16,8 +16,94 @@ DEFAULTS = {
     "hp_stable_threshold_sec": 2.0,
     "hp_change_epsilon": 0.01,
     "far_transient": True,
+    # периоды тиков потоков анализа (сек): min — в бою, max — в простое
+    "hp_min_interval_sec": 0.1,
+    "hp_max_interval_sec": 0.5,
+    "chat_min_interval_sec": 0.2,
+    "chat_max_interval_sec": 1.0,
+    # сопровождение окна цели без YOLO: принудительная повторная детекция раз в N сек
+    "hp_roi_refresh_sec": 5.0,
+    # детекция по кропу вокруг последнего окна цели: запас в долях размера окна
+    "hp_crop_margin": 0.5,
+    # фильтр HP (Калман): сглаживание, урон в секунду, прогноз смерти цели
+    "hp_filter_enabled": True,
+    "hp_filter_process_noise": 20.0,
+    "hp_filter_measurement_noise": 0.5,
+    # за сколько секунд до прогнозируемой смерти слать команды мёртвой цели (0 — не слать);
+    # выключено по умолчанию: ошибка прогноза — sweep по живому мобу
+    "hp_death_lead_sec": 0.0,
+    # инференс: local — в процессе GUI, server — отдельный процесс (inference_server.py)
+    "inference_mode": "local",
+    "inference_address": "127.0.0.1:50555",
+    "inference_workers": 1,
+    # детектор окна цели: ultralytics | onnx | openvino | classic (веса — шаблон .npz)
+    "detector_backend": "ultralytics",
+    "detector_weights": r"E:\Projectx\src\FinalDodep\weights\best.pt",
+    "detector_imgsz": 640,
+    "detector_threads": 0,
+    # загрузка и прогрев детектора в фоне сразу после запуска GUI
+    "detector_preload": True,
+    # предпросмотр в окне отладки HP: не чаще стольких кадров в секунду
+    "debug_preview_fps": 10.0,
+    # непрерывный поиск мобов: период поиска и отладочные окна OpenCV
+    "mob_search_interval_sec": 0.5,
+    "mob_search_debug": False,
+    "mob_debug_fps": 2.0,
+    # масштабы шаблона иконки моба (интерфейс игры в другом масштабе — например [0.8, 1.0, 1.25])
+    "mob_template_scales": [1.0],
+    # подтверждённая цель поиска мобов перепроверяется шаблоном не чаще раза в столько секунд
+    "mob_track_reverify_sec": 2.0,
+    # после движения к цели один раз проверить позицию курсора и при промахе скорректировать
+    "mob_move_verify": True,
+    # поиск табличек имён на уменьшенной в 2 или 4 раза маске с уточнением вокруг находок
+    # (1 — по всему кадру в полном разрешении)
+    "mob_pyramid_factor": 2,
+    # потоков для поиска мобов по полосам кадра (0 — по числу ядер, не больше 4; 1 — без пула)
+    "mob_search_workers": 0,
+    # OCR чата только по новым строкам (прокрутка определяется по отпечаткам строк)
+    "chat_incremental_ocr": True,
+    # OCR чата: auto | tesserocr (Tesseract в процессе, модели загружены один раз) | pytesseract
+    "ocr_backend": "auto",
+    "ocr_lang": "rus+eng",
+    # режим сегментации Tesseract (3 — авто, 6 — блок текста) и допустимые символы (пусто — все)
+    "ocr_psm": 3,
+    "ocr_whitelist": "",
 }
 
+INTERVAL_KEYS = (
+    "hp_min_interval_sec",
+    "hp_max_interval_sec",
+    "chat_min_interval_sec",
+    "chat_max_interval_sec",
+    "mob_search_interval_sec",
+)
+
+FILTER_KEYS = (
+    "hp_filter_process_noise",
+    "hp_filter_measurement_noise",
+    "hp_death_lead_sec",
+)
+
+INFERENCE_KEYS = (
+    "inference_mode",
+    "inference_address",
+    "inference_workers",
+)
+
+DETECTOR_KEYS = (
+    "detector_backend",
+    "detector_weights",
+    "detector_imgsz",
+    "detector_threads",
+)
+
+OCR_KEYS = (
+    "ocr_backend",
+    "ocr_lang",
+    "ocr_psm",
+    "ocr_whitelist",
+)
+
 
 def _settings_path():
     return os.path.join(os.path.dirname(__file__), SETTINGS_FILENAME)
@@ -69,6 +155,96 @@ def load_config():
         pass
 
     cfg["far_transient"] = bool(raw.get("far_transient", cfg["far_transient"]))
+
+    for key in INTERVAL_KEYS:
+        try:
+            cfg[key] = max(0.01, float(raw.get(key, cfg[key])))
+        except Exception:
+            pass
+
+    try:
+        # сопровождение без YOLO: слишком частый перезапуск детекции сводит его на нет
+        cfg["hp_roi_refresh_sec"] = max(
+            0.1, float(raw.get("hp_roi_refresh_sec", cfg["hp_roi_refresh_sec"]))
+        )
+    except Exception:
+        pass
+
+    try:
+        # запас кропа — доля размера окна цели, а не интервал
+        margin = float(raw.get("hp_crop_margin", cfg["hp_crop_margin"]))
+        cfg["hp_crop_margin"] = min(2.0, max(0.0, margin))
+    except Exception:
+        pass
+
+    cfg["hp_filter_enabled"] = bool(raw.get("hp_filter_enabled", cfg["hp_filter_enabled"]))
+    for key in FILTER_KEYS:
+        try:
+            cfg[key] = max(0.0, float(raw.get(key, cfg[key])))
+        except Exception:
+            pass
+
+    if raw.get("inference_mode") in ("local", "server"):
+        cfg["inference_mode"] = raw["inference_mode"]
+    cfg["inference_address"] = raw.get("inference_address") or cfg["inference_address"]
+    try:
+        cfg["inference_workers"] = max(1, int(raw.get("inference_workers", cfg["inference_workers"])))
+    except Exception:
+        pass
+
+    if raw.get("detector_backend") in ("ultralytics", "onnx", "openvino", "classic"):
+        cfg["detector_backend"] = raw["detector_backend"]
+    cfg["detector_weights"] = raw.get("detector_weights") or cfg["detector_weights"]
+    for key in ("detector_imgsz", "detector_threads"):
+        try:
+            cfg[key] = max(0, int(raw.get(key, cfg[key])))
+        except Exception:
+            pass
+    cfg["detector_preload"] = bool(raw.get("detector_preload", cfg["detector_preload"]))
+    if raw.get("ocr_backend") in ("auto", "tesserocr", "pytesseract"):
+        cfg["ocr_backend"] = raw["ocr_backend"]
+    cfg["ocr_lang"] = raw.get("ocr_lang") or cfg["ocr_lang"]
+    try:
+        psm = int(raw.get("ocr_psm", cfg["ocr_psm"]))
+        if 0 <= psm <= 13:
+            cfg["ocr_psm"] = psm
+    except Exception:
+        pass
+    cfg["ocr_whitelist"] = str(raw.get("ocr_whitelist") or "")
+    cfg["mob_search_debug"] = bool(raw.get("mob_search_debug", cfg["mob_search_debug"]))
+    cfg["mob_move_verify"] = bool(raw.get("mob_move_verify", cfg["mob_move_verify"]))
+    cfg["chat_incremental_ocr"] = bool(
+        raw.get("chat_incremental_ocr", cfg["chat_incremental_ocr"])
+    )
+    try:
+        # 0 — перепроверять цель шаблоном на каждом кадре
+        cfg["mob_track_reverify_sec"] = max(
+            0.0, float(raw.get("mob_track_reverify_sec", cfg["mob_track_reverify_sec"]))
+        )
+    except Exception:
+        pass
+    try:
+        factor = int(raw.get("mob_pyramid_factor", cfg["mob_pyramid_factor"]))
+        if factor in (1, 2, 4):
+            cfg["mob_pyramid_factor"] = factor
+    except Exception:
+        pass
+    try:
+        workers = int(raw.get("mob_search_workers", cfg["mob_search_workers"]))
+        cfg["mob_search_workers"] = max(0, workers)
+    except Exception:
+        pass
+    try:
+        scales = [float(v) for v in raw.get("mob_template_scales", cfg["mob_template_scales"])]
+        if scales and all(v > 0 for v in scales):
+            cfg["mob_template_scales"] = scales
+    except Exception:
+        pass
+    for key in ("debug_preview_fps", "mob_debug_fps"):
+        try:
+            cfg[key] = max(0.1, float(raw.get(key, cfg[key])))
+        except Exception:
+            pass
     return cfg
 
 
@@ -86,7 +262,26 @@ def save_config(data: dict):
         "hp_stable_threshold_sec": data.get("hp_stable_threshold_sec", DEFAULTS["hp_stable_threshold_sec"]),
         "hp_change_epsilon": data.get("hp_change_epsilon", DEFAULTS["hp_change_epsilon"]),
         "far_transient": data.get("far_transient", DEFAULTS["far_transient"]),
+        "hp_filter_enabled": data.get("hp_filter_enabled", DEFAULTS["hp_filter_enabled"]),
+        "detector_preload": data.get("detector_preload", DEFAULTS["detector_preload"]),
+        "debug_preview_fps": data.get("debug_preview_fps", DEFAULTS["debug_preview_fps"]),
+        "mob_search_debug": data.get("mob_search_debug", DEFAULTS["mob_search_debug"]),
+        "mob_debug_fps": data.get("mob_debug_fps", DEFAULTS["mob_debug_fps"]),
+        "mob_template_scales": data.get("mob_template_scales", DEFAULTS["mob_template_scales"]),
+        "mob_track_reverify_sec": data.get(
+            "mob_track_reverify_sec", DEFAULTS["mob_track_reverify_sec"]
+        ),
+        "mob_move_verify": data.get("mob_move_verify", DEFAULTS["mob_move_verify"]),
+        "mob_pyramid_factor": data.get("mob_pyramid_factor", DEFAULTS["mob_pyramid_factor"]),
+        "mob_search_workers": data.get("mob_search_workers", DEFAULTS["mob_search_workers"]),
+        "chat_incremental_ocr": data.get(
+            "chat_incremental_ocr", DEFAULTS["chat_incremental_ocr"]
+        ),
+        "hp_roi_refresh_sec": data.get("hp_roi_refresh_sec", DEFAULTS["hp_roi_refresh_sec"]),
+        "hp_crop_margin": data.get("hp_crop_margin", DEFAULTS["hp_crop_margin"]),
     }
+    for key in INTERVAL_KEYS + FILTER_KEYS + INFERENCE_KEYS + DETECTOR_KEYS + OCR_KEYS:
+        serial[key] = data.get(key, DEFAULTS[key])
     try:
         with open(path, "w", encoding="utf-8") as f:
             json.dump(serial, f, indent=2, ensure_ascii=False)
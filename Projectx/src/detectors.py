@@ -0,0 +1,297 @@
+"""
+Детекторы окна цели / HP bar с разными CPU-бэкендами.
+
+Все бэкенды возвращают из predict() одинаковый формат — numpy (N, 6):
+    x1, y1, x2, y2, score, cls   в координатах входного изображения,
+тот же, что `results[0].boxes.data` у ultralytics, и его же потребляет
+HpAnalyzerThread.detect_boxes.
+
+Бэкенды:
+    ultralytics — PyTorch eager (как раньше), веса .pt
+    onnx        — ONNX Runtime CPU, модель .onnx
+    openvino    — OpenVINO CPU, модель .xml (или папка *_openvino_model от ultralytics)
+    classic     — без нейросети: шаблон рамки окна + серии цвета HP bar (classic_detector.py),
+                  вместо весов — файл шаблона .npz
+
+Экспорт .pt в onnx/openvino:
+    python src/detectors.py export --weights best.pt --format onnx --imgsz 640
+"""
+
+import argparse
+import glob
+import os
+import time
+
+import cv2
+import numpy as np
+
+BACKENDS = ("ultralytics", "onnx", "openvino", "classic")
+
+
+class DetectorUnavailable(RuntimeError):
+    """
+    Детектор не ответил на этот кадр (например, сервер инференса не успел).
+    Это не «детекций нет»: тик пропускается, прошлый результат анализа остаётся в силе.
+    """
+
+
+class Detector:
+    """Базовый детектор: загрузка, прогрев, predict(img_bgr) -> (N, 6)."""
+
+    backend = None
+
+    def __init__(self, weights, imgsz=640, threads=0, conf=0.25, warmup=True):
+        """
+        :param weights: путь к весам/модели бэкенда
+        :param imgsz: размер входа сети (сторона квадрата)
+        :param threads: число потоков инференса (0 — по умолчанию бэкенда)
+        :param conf: минимальная уверенность детекции
+        :param warmup: прогнать пустые кадры сразу после загрузки
+        """
+        self.weights = weights
+        self.imgsz = int(imgsz)
+        self.threads = int(threads or 0)
+        self.conf = float(conf)
+        self.load_time = 0.0
+        self.warmup_time = 0.0
+
+        t0 = time.perf_counter()
+        self._load()
+        self.load_time = time.perf_counter() - t0
+        if warmup:
+            self.warmup()
+        print(
+            f"[Detector:{self.backend}] {weights} загружен за {self.load_time:.2f}s, "
+            f"прогрев {self.warmup_time:.2f}s (imgsz={self.imgsz}, threads={self.threads or 'auto'})"
+        )
+
+    def _load(self):
+        raise NotImplementedError
+
+    def predict(self, img, imgsz=None):
+        """img — BGR (в т.ч. strided view). imgsz — переопределить размер входа для вызова."""
+        raise NotImplementedError
+
+    def warmup(self, runs=2):
+        dummy = np.zeros((self.imgsz, self.imgsz, 3), dtype=np.uint8)
+        t0 = time.perf_counter()
+        for _ in range(runs):
+            self.predict(dummy)
+        self.warmup_time = time.perf_counter() - t0
+
+    def __call__(self, img, imgsz=None):
+        return self.predict(img, imgsz=imgsz)
+
+
+class UltralyticsDetector(Detector):
+    backend = "ultralytics"
+
+    def _load(self):
+        from ultralytics import YOLO
+
+        if self.threads:
+            import torch
+
+            torch.set_num_threads(self.threads)
+        self.model = YOLO(self.weights)
+
+    def predict(self, img, imgsz=None):
+        results = self.model(img, conf=self.conf, imgsz=imgsz or self.imgsz, verbose=False)
+        return results[0].boxes.data.cpu().numpy()
+
+
+def letterbox(img, size):
+    """Масштабирование с сохранением пропорций и паддингом до size x size (как в ultralytics)."""
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    new_w, new_h = int(round(w * r)), int(round(h * r))
+    pad_x, pad_y = (size - new_w) / 2, (size - new_h) / 2
+    if (new_w, new_h) != (w, h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    img = cv2.copyMakeBorder(
+        img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(114, 114, 114)
+    )
+    return img, r, (left, top)
+
+
+def postprocess_yolo(output, ratio, pad, conf, iou=0.45):
+    """
+    Сырые выходы YOLOv8-экспорта -> (N, 6) в координатах исходного изображения.
+    Поддерживает (1, 4+nc, A) без NMS и (1, N, 6) с NMS, встроенным при экспорте.
+    """
+    out = np.asarray(output)[0]
+    if out.ndim == 2 and out.shape[-1] == 6 and out.shape[0] != 6:
+        dets = out[out[:, 4] >= conf].astype(np.float32)
+    else:
+        preds = out.T  # (A, 4+nc)
+        class_scores = preds[:, 4:]
+        cls = class_scores.argmax(axis=1)
+        scores = class_scores[np.arange(len(cls)), cls]
+        keep = scores >= conf
+        preds, cls, scores = preds[keep], cls[keep], scores[keep]
+        if not len(scores):
+            return np.zeros((0, 6), dtype=np.float32)
+        cx, cy, bw, bh = preds[:, 0], preds[:, 1], preds[:, 2], preds[:, 3]
+        xywh = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+        # NMS по классам: сдвигаем боксы разных классов, чтобы они не пересекались
+        offset = cls[:, None].astype(np.float32) * 8192.0
+        shifted = xywh.copy()
+        shifted[:, :2] += offset
+        idx = cv2.dnn.NMSBoxes(shifted.tolist(), scores.tolist(), conf, iou)
+        idx = np.asarray(idx, dtype=np.int64).reshape(-1)
+        dets = np.zeros((len(idx), 6), dtype=np.float32)
+        dets[:, 0] = xywh[idx, 0]
+        dets[:, 1] = xywh[idx, 1]
+        dets[:, 2] = xywh[idx, 0] + xywh[idx, 2]
+        dets[:, 3] = xywh[idx, 1] + xywh[idx, 3]
+        dets[:, 4] = scores[idx]
+        dets[:, 5] = cls[idx]
+
+    dets[:, [0, 2]] = (dets[:, [0, 2]] - pad[0]) / ratio
+    dets[:, [1, 3]] = (dets[:, [1, 3]] - pad[1]) / ratio
+    return dets
+
+
+class _ExportedDetector(Detector):
+    """Общая пред/постобработка для экспортированных моделей (ONNX, OpenVINO)."""
+
+    dynamic = False
+
+    def _infer(self, blob):
+        raise NotImplementedError
+
+    def predict(self, img, imgsz=None):
+        size = int(imgsz) if (imgsz and self.dynamic) else self.imgsz
+        padded, ratio, pad = letterbox(img, size)
+        blob = cv2.dnn.blobFromImage(padded, 1.0 / 255.0, swapRB=True)
+        return postprocess_yolo(self._infer(blob), ratio, pad, self.conf)
+
+
+class OnnxDetector(_ExportedDetector):
+    backend = "onnx"
+
+    def _load(self):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(
+            self.weights, sess_options=options, providers=["CPUExecutionProvider"]
+        )
+        inp = self.session.get_inputs()[0]
+        self.input_name = inp.name
+        h, w = inp.shape[2], inp.shape[3]
+        if isinstance(h, int) and isinstance(w, int):
+            self.imgsz = h  # статический вход — размер задаёт модель
+        else:
+            self.dynamic = True
+
+    def _infer(self, blob):
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoDetector(_ExportedDetector):
+    backend = "openvino"
+
+    def _load(self):
+        import openvino as ov
+
+        path = self.weights
+        if os.path.isdir(path):
+            xmls = glob.glob(os.path.join(path, "*.xml"))
+            if not xmls:
+                raise FileNotFoundError(f"В {path} нет модели OpenVINO (*.xml)")
+            path = xmls[0]
+        core = ov.Core()
+        model = core.read_model(path)
+        partial = model.inputs[0].get_partial_shape()
+        self.dynamic = partial.is_dynamic
+        if not self.dynamic:
+            self.imgsz = int(partial[2].get_length())
+        cfg = {"PERFORMANCE_HINT": "LATENCY"}
+        if self.threads:
+            cfg["INFERENCE_NUM_THREADS"] = self.threads
+        self.compiled = core.compile_model(model, "CPU", cfg)
+        self.request = self.compiled.create_infer_request()
+
+    def _infer(self, blob):
+        self.request.infer({0: blob})
+        return self.request.get_output_tensor(0).data
+
+
+_BACKEND_CLASSES = {
+    "ultralytics": UltralyticsDetector,
+    "onnx": OnnxDetector,
+    "openvino": OpenVinoDetector,
+}
+
+
+def create_detector(backend="ultralytics", weights=None, imgsz=640, threads=0, conf=0.25):
+    if backend == "classic":
+        from classic_detector import ClassicDetector  # импортирует этот модуль
+
+        return ClassicDetector(weights, imgsz=imgsz, threads=threads, conf=conf)
+    cls = _BACKEND_CLASSES.get(backend)
+    if cls is None:
+        raise ValueError(f"Неизвестный бэкенд детектора: {backend} (есть: {', '.join(BACKENDS)})")
+    return cls(weights, imgsz=imgsz, threads=threads, conf=conf)
+
+
+def create_detector_from_config(cfg):
+    return create_detector(
+        backend=cfg["detector_backend"],
+        weights=cfg["detector_weights"],
+        imgsz=cfg["detector_imgsz"],
+        threads=cfg["detector_threads"],
+    )
+
+
+def export_model(weights, fmt, imgsz=640, dynamic=False, half=False):
+    """Экспорт .pt через ultralytics. Возвращает путь к экспортированной модели."""
+    if fmt not in ("onnx", "openvino"):
+        raise ValueError(f"Формат экспорта: onnx или openvino, получено {fmt}")
+    from ultralytics import YOLO
+
+    path = YOLO(weights).export(format=fmt, imgsz=imgsz, dynamic=dynamic, half=half)
+    print(f"[Detector] Экспортировано: {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Детекторы окна цели: экспорт и проверка")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    exp = sub.add_parser("export", help="экспортировать .pt в onnx/openvino")
+    exp.add_argument("--weights", required=True)
+    exp.add_argument("--format", choices=("onnx", "openvino"), default="onnx")
+    exp.add_argument("--imgsz", type=int, default=640)
+    exp.add_argument("--dynamic", action="store_true", help="динамический размер входа")
+
+    chk = sub.add_parser("check", help="загрузить модель, прогреть и замерить predict")
+    chk.add_argument("--backend", choices=BACKENDS, default="ultralytics")
+    chk.add_argument("--weights", required=True)
+    chk.add_argument("--imgsz", type=int, default=640)
+    chk.add_argument("--threads", type=int, default=0)
+    chk.add_argument("--runs", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.cmd == "export":
+        export_model(args.weights, args.format, args.imgsz, args.dynamic)
+    else:
+        det = create_detector(args.backend, args.weights, args.imgsz, args.threads)
+        frame = np.random.default_rng(0).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+        times = []
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            det.predict(frame)
+            times.append(time.perf_counter() - t0)
+        times_ms = np.array(times) * 1000
+        print(
+            f"predict: p50={np.percentile(times_ms, 50):.1f}ms "
+            f"p90={np.percentile(times_ms, 90):.1f}ms"
+        )
@@ -1,6 +1,8 @@
 import time
 from typing import Callable, Optional, Sequence
 
+from hp_filter import HpEstimate, HpFilter
+
 
 class HpActionController:
     STATE_NO_TARGET = "no_target"
@@ -21,10 +23,15 @@ class HpActionController:
         hp_stable_threshold_sec: float = 2.0,
         hp_change_epsilon: float = 0.01,
         far_transient: bool = True,
+        hp_filter: Optional[HpFilter] = None,
+        death_lead_sec: float = 0.0,
     ):
         """
         Контроллер действий по HP цели.
         Поддерживает последовательности команд для каждого состояния — список команд отправляется по очереди.
+        С hp_filter «далёкая» цель определяется по статистике урона (HpFilter), а при
+        death_lead_sec > 0 последовательность мёртвой цели (и sweep) отправляется заранее,
+        когда прогноз времени до смерти меньше death_lead_sec.
         """
         self.send_command_callback = send_command_callback
 
@@ -49,10 +56,18 @@ class HpActionController:
         self.hp_change_epsilon = float(hp_change_epsilon)
         self.far_transient = bool(far_transient)
 
+        # temporal filter: smoothed hp, dps, time to death
+        self.hp_filter = hp_filter
+        self.death_lead_sec = float(death_lead_sec)
+        self.last_estimate: Optional[HpEstimate] = None
+        self.dead_queued_time: Optional[float] = None
+
         # runtime
         self.current_state: Optional[str] = None
         self.last_command: Optional[str] = None
         self.last_command_time: float = 0.0
+        # capture timestamp of the frame the current decision is based on
+        self.last_update_time: float = 0.0
 
         self.spoil_active: Optional[bool] = None
         self.waiting_for_sweep: bool = False
@@ -140,6 +155,13 @@ class HpActionController:
         except Exception:
             pass
 
+    def set_death_lead(self, seconds: float):
+        print(f"[HpActionController] set_death_lead: {seconds}")
+        try:
+            self.death_lead_sec = max(0.0, float(seconds))
+        except Exception:
+            pass
+
     def set_far_transient(self, transient: bool):
         print(f"[HpActionController] set_far_transient: {transient}")
         self.far_transient = bool(transient)
@@ -187,6 +209,19 @@ class HpActionController:
     def _is_hp_stable(self, hp_percent: float, now: float) -> bool:
         if self.hp_last_value is None:
             return False
+        estimate = self.last_estimate
+        if estimate is not None:
+            # stall = no statistically significant damage according to the filter
+            if estimate.stall_since is None:
+                self.hp_last_value = hp_percent
+                self.hp_last_change_time = now
+                return False
+            self.hp_last_change_time = estimate.stall_since
+            print(
+                f"[HpActionController] no damage for {estimate.stalled_for:.2f}s "
+                f"(threshold {self.hp_stable_threshold_sec}s, {estimate})"
+            )
+            return estimate.stalled_for >= self.hp_stable_threshold_sec
         if abs(hp_percent - self.hp_last_value) > self.hp_change_epsilon:
             # hp changed -> reset baseline
             self.hp_last_value = hp_percent
@@ -215,6 +250,9 @@ class HpActionController:
         # Important: we set hp_last_value = None so next update will initialize tracking as for a new target.
         self.hp_last_value = None
         self.hp_last_change_time = 0.0
+        if self.hp_filter is not None:
+            self.hp_filter.reset()
+            self.last_estimate = None
         # mark that controller should not consider itself currently in alive/far, so next update triggers "new target" logic
         self.current_state = None
         print(
@@ -222,7 +260,11 @@ class HpActionController:
         )
 
     # --- Main update logic ---
-    def update(self, target_state: str, hp_percent: float):
+    def update(self, target_state: str, hp_percent: float, timestamp: Optional[float] = None):
+        """
+        timestamp — время захвата кадра, по которому получено состояние; все кулдауны и
+        пороги стабильности считаются по нему (без него — по time.time()).
+        """
         print(
             f"[HpActionController] update: {self.current_state} -> {target_state}, hp={hp_percent}"
         )
@@ -231,7 +273,11 @@ class HpActionController:
             print("[HpActionController] controller disabled, skipping update")
             return
 
-        now = time.time()
+        now = time.time() if timestamp is None else float(timestamp)
+        self.last_update_time = now
+
+        if self.hp_filter is not None:
+            self.last_estimate = self.hp_filter.update(target_state, hp_percent, now)
 
         # spoil reset on new live target
         if (
@@ -250,8 +296,13 @@ class HpActionController:
             self.hp_last_change_time = 0.0
             self.far_sent_time = None
 
+            dead_already_queued = self.dead_queued_time is not None
+            self.dead_queued_time = None
+
             if target_state == self.STATE_NO_TARGET:
                 self._send_next_in_sequence(self.STATE_NO_TARGET, now)
+            elif dead_already_queued:
+                print("[HpActionController] dead sequence already queued ahead -> skip")
             else:
                 self._send_next_in_sequence(self.STATE_DEAD_TARGET, now)
 
@@ -277,6 +328,10 @@ class HpActionController:
             self.far_sent_time = None
             print("[HpActionController] Init HP tracking for live target")
 
+        if self._queue_death_ahead(now):
+            self.current_state = self.STATE_ALIVE_TARGET
+            return
+
         # check HP stability
         if self._is_hp_stable(hp_percent, now):
             # send far command once and forget far (return to alive processing)
@@ -297,6 +352,28 @@ class HpActionController:
 
         self.current_state = self.STATE_ALIVE_TARGET
 
+    def _queue_death_ahead(self, now: float) -> bool:
+        """Send dead-target sequence (and sweep) before the target actually dies."""
+        estimate = self.last_estimate
+        if estimate is None or self.death_lead_sec <= 0:
+            return False
+        if self.dead_queued_time is not None:
+            if estimate.fresh or now - self.dead_queued_time > max(1.0, 4 * self.death_lead_sec):
+                # prediction was wrong (target still alive / new target) -> back to normal
+                print("[HpActionController] queued death did not happen -> resume")
+                self.dead_queued_time = None
+                return False
+            return True
+        if estimate.time_to_death is None or estimate.time_to_death > self.death_lead_sec:
+            return False
+        print(f"[HpActionController] death predicted in {estimate.time_to_death:.2f}s -> queue dead sequence")
+        self._send_next_in_sequence(self.STATE_DEAD_TARGET, now)
+        if self.spoil_active and self.waiting_for_sweep:
+            self.try_sweep()
+            self.waiting_for_sweep = False
+        self.dead_queued_time = now
+        return True
+
     # spoil / sweep
     def try_spoil(self):
         if self.spoil_key and not self.spoil_active:
@@ -323,6 +400,10 @@ class HpActionController:
         self.hp_last_value = None
         self.hp_last_change_time = 0.0
         self.far_sent_time = None
+        self.dead_queued_time = None
+        self.last_estimate = None
+        if self.hp_filter is not None:
+            self.hp_filter.reset()
         # reset indices
         for k in self._seq_indices:
             self._seq_indices[k] = 0
@@ -79,6 +79,14 @@ class EventsControllerWindow(tk.Toplevel):
         self.hp_epsilon_var.set(0.01)
         tk.Entry(self, textvariable=self.hp_epsilon_var).pack(fill=tk.X, padx=10)
 
+        tk.Label(
+            self,
+            text="Команды мёртвой цели заранее, за столько сек до прогноза смерти (0 — выкл): ",
+        ).pack(anchor="w", padx=10, pady=(10, 0))
+        self.death_lead_var = tk.DoubleVar()
+        self.death_lead_var.set(0.0)
+        tk.Entry(self, textvariable=self.death_lead_var).pack(fill=tk.X, padx=10)
+
         # far transient option
         self.far_transient_var = tk.BooleanVar()
         tk.Checkbutton(
@@ -163,6 +171,7 @@ class EventsControllerWindow(tk.Toplevel):
                 )
                 self.hp_stable_var.set(float(data.get("hp_stable_threshold_sec", 2.0)))
                 self.hp_epsilon_var.set(float(data.get("hp_change_epsilon", 0.01)))
+                self.death_lead_var.set(float(data.get("hp_death_lead_sec", 0.0)))
                 self.far_transient_var.set(data.get("far_transient", True))
 
                 # apply to controller
@@ -192,6 +201,7 @@ class EventsControllerWindow(tk.Toplevel):
                 self.hp_action_controller.set_hp_change_epsilon(
                     self.hp_epsilon_var.get()
                 )
+                self.hp_action_controller.set_death_lead(self.death_lead_var.get())
                 self.hp_action_controller.set_far_transient(
                     self.far_transient_var.get()
                 )
@@ -232,6 +242,9 @@ class EventsControllerWindow(tk.Toplevel):
         self.hp_epsilon_var.set(
             getattr(self.hp_action_controller, "hp_change_epsilon", 0.01)
         )
+        self.death_lead_var.set(
+            getattr(self.hp_action_controller, "death_lead_sec", 0.0)
+        )
         self.far_transient_var.set(
             getattr(self.hp_action_controller, "far_transient", True)
         )
@@ -258,10 +271,14 @@ class EventsControllerWindow(tk.Toplevel):
         )
         self.hp_action_controller.set_hp_stable_threshold(self.hp_stable_var.get())
         self.hp_action_controller.set_hp_change_epsilon(self.hp_epsilon_var.get())
+        self.hp_action_controller.set_death_lead(self.death_lead_var.get())
         self.hp_action_controller.set_far_transient(self.far_transient_var.get())
 
+        # в том же файле хранятся настройки захвата, детектора, OCR и поиска мобов
+        # (config.py) — обновляем только ключи этого окна, остальные не трогаем
+        data = self._read_settings_file()
         # Save to file: prefer storing lists for sequences (backwards compatible)
-        data = {
+        data.update({
             "no_target_command": self._to_list(self.no_target_var.get()),
             "dead_target_command": self._to_list(self.dead_target_var.get()),
             "alive_target_command": self._to_list(self.alive_target_var.get()),
@@ -272,8 +289,9 @@ class EventsControllerWindow(tk.Toplevel):
             "far_target_command": self._to_list(self.far_target_var.get()),
             "hp_stable_threshold_sec": self.hp_stable_var.get(),
             "hp_change_epsilon": self.hp_epsilon_var.get(),
+            "hp_death_lead_sec": self.death_lead_var.get(),
             "far_transient": self.far_transient_var.get(),
-        }
+        })
         try:
             print(
                 f"[EventsController] Saving settings to: {SETTINGS_FILE} (cwd: {os.getcwd()})"
@@ -286,6 +304,16 @@ class EventsControllerWindow(tk.Toplevel):
         except Exception as e:
             self.status_label.config(text=f"Ошибка сохранения: {e}")
 
+    @staticmethod
+    def _read_settings_file():
+        """Текущее содержимое файла настроек ({} — файла нет или он повреждён)."""
+        try:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return data if isinstance(data, dict) else {}
+
     def on_spoil_enabled_changed(self):
         self.hp_action_controller.set_spoil_enabled(self.spoil_enabled_var.get())
 
@@ -0,0 +1,342 @@
+"""
+Запись кадров захвата в файл и их воспроизведение без игры.
+
+Формат файла (append-only):
+    заголовок:  MAGIC (8 байт) + версия (uint32)
+    запись:     RECORD_HEADER (timestamp, width, height, left, top) + BGRA-пиксели width*height*4
+
+Запись делает ScreenCapture (set_recorder): каждый тик пишется объединённая область
+всех зарегистрированных регионов (HP, чат, поиск мобов). Чтение — через mmap без копий.
+ReplaySource — mss-совместимый источник для ScreenCapture(source_factory=...), поэтому
+HpAnalyzerThread, ChatOCR и MobSearcher.search работают на записи без изменений.
+"""
+
+import argparse
+import mmap
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+from screen_capture import CaptureSourceExhausted, ScreenCapture
+
+MAGIC = b"PXFRAMES"
+VERSION = 1
+FILE_HEADER = struct.Struct("<8sI")
+RECORD_HEADER = struct.Struct("<dIIii")  # timestamp, width, height, left, top
+
+
+class FrameRecorder:
+    """Дописывает BGRA-кадры с временными метками в конец файла."""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        new_file = not os.path.exists(path) or os.path.getsize(path) == 0
+        self._f = open(path, "ab")
+        if new_file:
+            self._f.write(FILE_HEADER.pack(MAGIC, VERSION))
+            self._f.flush()
+        self.frames_written = 0
+        print(f"[FrameRecorder] Запись в {path}")
+
+    def write(self, bgra, timestamp, left=0, top=0):
+        arr = np.ascontiguousarray(bgra, dtype=np.uint8)
+        if arr.ndim != 3 or arr.shape[2] != 4:
+            raise ValueError(f"Ожидается BGRA (h, w, 4), получено {arr.shape}")
+        h, w = arr.shape[:2]
+        with self._lock:
+            if self._f is None:
+                return
+            self._f.write(RECORD_HEADER.pack(float(timestamp), w, h, int(left), int(top)))
+            self._f.write(arr.data)
+            self._f.flush()
+            self.frames_written += 1
+
+    def close(self):
+        with self._lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+        print(f"[FrameRecorder] Записано кадров: {self.frames_written}")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameReader:
+    """Читает файл кадров через mmap; frame(i) — view без копирования."""
+
+    def __init__(self, path):
+        self.path = path
+        self._f = open(path, "rb")
+        size = os.path.getsize(path)
+        if size < FILE_HEADER.size:
+            raise ValueError(f"Пустой или повреждённый файл кадров: {path}")
+        self._mm = mmap.mmap(self._f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = FILE_HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Неизвестный формат файла кадров: {path}")
+
+        # индекс: (offset пикселей, timestamp, width, height, left, top)
+        self.index = []
+        offset = FILE_HEADER.size
+        while offset + RECORD_HEADER.size <= size:
+            ts, w, h, left, top = RECORD_HEADER.unpack_from(self._mm, offset)
+            data_offset = offset + RECORD_HEADER.size
+            end = data_offset + w * h * 4
+            if end > size:
+                # недописанная последняя запись (например, процесс упал) — игнорируем
+                break
+            self.index.append((data_offset, ts, w, h, left, top))
+            offset = end
+
+    def __len__(self):
+        return len(self.index)
+
+    def frame(self, i):
+        """(bgra view, timestamp, left, top) для кадра i."""
+        data_offset, ts, w, h, left, top = self.index[i]
+        arr = np.frombuffer(self._mm, dtype=np.uint8, count=w * h * 4, offset=data_offset)
+        return arr.reshape(h, w, 4), ts, left, top
+
+    def bounds(self):
+        """Объединяющий прямоугольник всех записанных кадров (left, top, width, height)."""
+        if not self.index:
+            return 0, 0, 0, 0
+        left = min(r[4] for r in self.index)
+        top = min(r[5] for r in self.index)
+        right = max(r[4] + r[2] for r in self.index)
+        bottom = max(r[5] + r[3] for r in self.index)
+        return left, top, right - left, bottom - top
+
+    def close(self):
+        try:
+            self._mm.close()
+        except BufferError:
+            # на mmap ещё ссылаются numpy-view — закроется вместе с ними
+            pass
+        self._f.close()
+
+
+class ReplayShot:
+    """Аналог mss ScreenShot: raw (BGRA), размеры, позиция и записанное время кадра."""
+
+    __slots__ = ("raw", "width", "height", "left", "top", "timestamp")
+
+    def __init__(self, raw, width, height, left, top, timestamp):
+        self.raw = raw
+        self.width = width
+        self.height = height
+        self.left = left
+        self.top = top
+        self.timestamp = timestamp
+
+
+class ReplaySource:
+    """
+    mss-совместимый источник кадров из записи.
+    Каждый grab() возвращает следующий записанный кадр (детерминированно, по порядку),
+    обрезанный/дополненный до запрошенной области.
+    """
+
+    def __init__(self, path, loop=False, speed=1.0):
+        self.reader = FrameReader(path)
+        self.loop = loop
+        self.speed = float(speed)
+        self.position = 0
+        left, top, width, height = self.reader.bounds()
+        monitor = {"left": left, "top": top, "width": width, "height": height}
+        self.monitors = [monitor, dict(monitor)]
+
+    def grab(self, monitor):
+        if self.position >= len(self.reader):
+            if not self.loop or not len(self.reader):
+                raise CaptureSourceExhausted()
+            self.position = 0
+        bgra, ts, left, top = self.reader.frame(self.position)
+        self.position += 1
+
+        mx, my = monitor["left"], monitor["top"]
+        mw, mh = monitor["width"], monitor["height"]
+        h, w = bgra.shape[:2]
+        if (mx, my, mw, mh) == (left, top, w, h):
+            # та же область, что и при записи — отдаём mmap view без копии
+            return ReplayShot(bgra, w, h, left, top, ts)
+
+        out = np.zeros((mh, mw, 4), dtype=np.uint8)
+        x1, y1 = max(mx, left), max(my, top)
+        x2, y2 = min(mx + mw, left + w), min(my + mh, top + h)
+        if x2 > x1 and y2 > y1:
+            out[y1 - my : y2 - my, x1 - mx : x2 - mx] = bgra[
+                y1 - top : y2 - top, x1 - left : x2 - left
+            ]
+        return ReplayShot(out, mw, mh, mx, my, ts)
+
+    def close(self):
+        self.reader.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _parse_region(text):
+    x, y, w, h = (int(v) for v in text.split(","))
+    return x, y, w, h
+
+
+def record_session(path, regions, seconds, interval=0.2):
+    """Пишет живой захват областей regions {name: (x, y, w, h)} в path в течение seconds."""
+    capture = ScreenCapture(interval=interval)
+    recorder = FrameRecorder(path)
+    capture.set_recorder(recorder)
+    for name, region in regions.items():
+        capture.register(name, region, interval)
+    try:
+        time.sleep(seconds)
+    finally:
+        capture.stop()
+        capture.set_recorder(None)
+        recorder.close()
+
+
+def replay_session(path, hp_region=None, chat_region=None, speed=1.0):
+    """
+    Прогоняет HpAnalyzerThread (+ ChatOCR) и HpActionController на записи без игры и GUI.
+    Команды контроллера печатаются вместо отправки на Arduino.
+    """
+    import config
+    from events import HpActionController
+    from hp_analyzer import HpAnalyzerThread
+    from hp_filter import create_hp_filter_from_config
+    from model_registry import get_model_registry
+    from pipeline import ControllerStage
+
+    cfg = config.load_config()
+    capture = ScreenCapture(
+        source_factory=lambda: ReplaySource(path, speed=speed), speed=speed
+    )
+    # контроллер считает время по меткам захвата кадров (записанным), поэтому его пороги
+    # не зависят от скорости воспроизведения
+    controller = HpActionController(
+        send_command_callback=lambda cmd: print(f"[Replay] command: {cmd}"),
+        spoil_key=cfg["spoil_key"],
+        no_target_command=cfg["no_target_command"],
+        dead_target_command=cfg["dead_target_command"],
+        alive_target_command=cfg["alive_target_command"],
+        far_target_command=cfg["far_target_command"],
+        spoil_enabled=cfg["spoil_enabled"],
+        cooldown_sec=cfg["cooldown_sec"],
+        hp_stable_threshold_sec=cfg["hp_stable_threshold_sec"],
+        hp_change_epsilon=cfg["hp_change_epsilon"],
+        far_transient=cfg["far_transient"],
+        hp_filter=create_hp_filter_from_config(cfg),
+        death_lead_sec=cfg["hp_death_lead_sec"],
+    )
+    controller_stage = ControllerStage(controller, live=False)
+
+    threads = []
+    if hp_region:
+        threads.append(
+            HpAnalyzerThread(
+                hp_region,
+                lambda status, hp: None,
+                interval=cfg["hp_min_interval_sec"],
+                max_interval=cfg["hp_max_interval_sec"],
+                capture=capture,
+                roi_refresh_sec=cfg["hp_roi_refresh_sec"],
+                crop_margin=cfg["hp_crop_margin"],
+                result_queue=controller_stage.inbox,
+                # модель грузится до старта воспроизведения, а не на первых кадрах записи
+                detector=get_model_registry().get(cfg),
+            )
+        )
+    if chat_region:
+        from chat_handler import ChatMessageHandler, ChatOCR
+        from ocr_engines import ocr_from_config
+
+        threads.append(
+            ChatOCR(
+                chat_region,
+                ChatMessageHandler(),
+                hp_action_controller=controller,
+                interval=cfg["chat_min_interval_sec"],
+                max_interval=cfg["chat_max_interval_sec"],
+                capture=capture,
+                ocr=ocr_from_config(cfg),
+                incremental=cfg["chat_incremental_ocr"],
+            )
+        )
+
+    t0 = time.time()
+    controller_stage.start()
+    for t in threads:
+        t.start()
+    seen_running = False
+    try:
+        while True:
+            running = capture.is_running()
+            seen_running = seen_running or running
+            if seen_running and not running:
+                break
+            time.sleep(0.05)
+    finally:
+        for t in threads:
+            t.stop()
+        for t in threads:
+            t.join(timeout=5.0)
+        controller_stage.stop()
+        controller_stage.join(timeout=5.0)
+        capture.stop()
+    print(f"[Replay] Готово за {time.time() - t0:.2f}s (скорость x{speed})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Запись и воспроизведение кадров захвата")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    rec = sub.add_parser("record", help="записать живой захват областей")
+    rec.add_argument("path")
+    rec.add_argument("--hp", type=_parse_region, help="x,y,w,h области HP")
+    rec.add_argument("--chat", type=_parse_region, help="x,y,w,h области чата")
+    rec.add_argument("--mob", type=_parse_region, help="x,y,w,h области поиска мобов")
+    rec.add_argument("--seconds", type=float, default=60.0)
+    rec.add_argument("--interval", type=float, default=0.2)
+
+    rep = sub.add_parser("replay", help="прогнать пайплайн на записи без игры")
+    rep.add_argument("path")
+    rep.add_argument("--hp", type=_parse_region, help="x,y,w,h области HP")
+    rep.add_argument("--chat", type=_parse_region, help="x,y,w,h области чата")
+    rep.add_argument("--speed", type=float, default=1.0)
+
+    info = sub.add_parser("info", help="сводка по файлу кадров")
+    info.add_argument("path")
+
+    args = parser.parse_args()
+    if args.cmd == "record":
+        regions = {
+            name: region
+            for name, region in (("hp", args.hp), ("chat", args.chat), ("mob", args.mob))
+            if region
+        }
+        if not regions:
+            parser.error("нужна хотя бы одна область: --hp/--chat/--mob")
+        record_session(args.path, regions, args.seconds, args.interval)
+    elif args.cmd == "replay":
+        replay_session(args.path, args.hp, args.chat, args.speed)
+    else:
+        reader = FrameReader(args.path)
+        if len(reader):
+            duration = reader.index[-1][1] - reader.index[0][1]
+        else:
+            duration = 0.0
+        print(f"кадров: {len(reader)}, длительность: {duration:.2f}s, область: {reader.bounds()}")
+        reader.close()
@@ -1,10 +1,6 @@
 import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import cv2
-import numpy as np
-import pyautogui
 import os
 import time
 
@@ -13,40 +9,129 @@ import config
 
 from arduino_controller import ArduinoController
 from arduino_auto import auto_detect_all_ports
-from hp_analyzer import HpAnalyzerThread
 from area_selector import AreaSelector
 from events import HpActionController
+from hp_filter import create_hp_filter_from_config
+from pipeline import CommandStage, ControllerStage
 from events_controller_window import EventsControllerWindow
-from chat_handler import ChatHandlerWindow
-from mob_searcher import MobSearcher
+
+# Тяжёлые подсистемы (cv2/numpy, YOLO, tesseract, pyautogui) импортируются при первом
+# использовании функции, чтобы окно появлялось сразу: hp_analyzer — в start_hp_analysis,
+# chat_handler — в open_chat_handler_window, mob_searcher — в launch_mob_search.
 
 
 class HpDebugWindow(tk.Toplevel):
     """
     Окно для отладки HP анализа — отображает текущий кадр с выделением области.
+
+    Анализатор только отдаёт ссылку на кадр через submit() (без копий и без Tk-вызовов
+    из своего потока). Окно само забирает последний кадр не чаще max_fps, уменьшает
+    его до размера холста и перерисовывает в один и тот же PhotoImage.
+    Пока окно свёрнуто или закрыто, кадры не принимаются и таймер не работает.
     """
 
-    def __init__(self, master):
+    def __init__(self, master, max_fps=10.0, width=640, height=480):
         super().__init__(master)
         self.title("Отладка HP Анализатора")
-        self.canvas = tk.Canvas(self, width=640, height=480, bg="black")
-        self.canvas.pack(padx=10, pady=10)
+        self.canvas = tk.Canvas(self, width=width, height=height, bg="black")
+        self.canvas.pack(padx=10, pady=10, fill=tk.BOTH, expand=True)
         self.photo_image = None
         self.img_on_canvas = None
-        # ... внутри __init__ после других self.*_btn.pack()
-
-    def update_image(self, cv_img):
-        # Конвертируем BGR OpenCV изображение в RGB и отображаем в Tkinter Canvas
-        cv_img_rgb = cv2.cvtColor(cv_img, cv2.COLOR_BGR2RGB)
-        pil_img = Image.fromarray(cv_img_rgb)
-        self.photo_image = ImageTk.PhotoImage(image=pil_img)
-        if self.img_on_canvas is None:
-            self.img_on_canvas = self.canvas.create_image(
-                0, 0, anchor=tk.NW, image=self.photo_image
-            )
+        self.period_ms = max(1, int(1000.0 / max(0.1, float(max_fps))))
+        self.visible = True
+        self.closed = False
+        self._pending = None  # (кадр, window_box, hp_box) — последний, старые заменяются
+        self._pending_lock = threading.Lock()
+        self._timer = None
+        self.submitted = 0
+        self.rendered = 0
+
+        self.bind("<Map>", self._on_map)
+        self.bind("<Unmap>", self._on_unmap)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self._schedule()
+
+    def submit(self, img, window_box=None, hp_box=None):
+        """
+        Из потока анализатора: запомнить кадр для предпросмотра. Кадр не копируется —
+        это неизменяемый view кадра захвата. False — окно свёрнуто/закрыто, кадр не нужен.
+        """
+        if self.closed or not self.visible:
+            return False
+        with self._pending_lock:
+            self._pending = (img, window_box, hp_box)
+        self.submitted += 1
+        return True
+
+    def close(self):
+        self.closed = True
+        with self._pending_lock:
+            self._pending = None
+        if self._timer is not None:
+            self.after_cancel(self._timer)
+            self._timer = None
+        self.destroy()
+
+    def _on_map(self, event):
+        if event.widget is self and not self.visible:
+            self.visible = True
+            self._schedule()
+
+    def _on_unmap(self, event):
+        if event.widget is self:
+            self.visible = False
+            with self._pending_lock:
+                self._pending = None
+
+    def _schedule(self):
+        if self._timer is None and not self.closed:
+            self._timer = self.after(self.period_ms, self._tick)
+
+    def _tick(self):
+        self._timer = None
+        if self.closed or not self.visible:
+            return  # снова запустится по <Map>
+        with self._pending_lock:
+            item, self._pending = self._pending, None
+        if item is not None:
+            self._render(*item)
+        self._schedule()
+
+    def _render(self, img, window_box, hp_box):
+        import cv2
+        from PIL import Image, ImageTk
+
+        h, w = img.shape[:2]
+        if h == 0 or w == 0:
+            return
+        cw, ch = self.canvas.winfo_width(), self.canvas.winfo_height()
+        if cw <= 1 or ch <= 1:  # холст ещё не размещён — заданный размер
+            cw, ch = int(self.canvas.cget("width")), int(self.canvas.cget("height"))
+        scale = min(cw / w, ch / h, 1.0)
+        size = (max(1, int(w * scale)), max(1, int(h * scale)))
+        if scale < 1.0:
+            img = cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+        code = cv2.COLOR_BGRA2RGB if img.ndim == 3 and img.shape[2] == 4 else cv2.COLOR_BGR2RGB
+        rgb = cv2.cvtColor(img, code)
+        for box, color in ((window_box, (0, 255, 0)), (hp_box, (255, 0, 0))):
+            if box is not None:
+                x1, y1, x2, y2 = (int(v * scale) for v in box)
+                cv2.rectangle(rgb, (x1, y1), (x2, y2), color, 2)
+        pil_img = Image.fromarray(rgb)
+        if self.photo_image is not None and (
+            self.photo_image.width(),
+            self.photo_image.height(),
+        ) == size:
+            self.photo_image.paste(pil_img)  # тот же буфер Tk, без нового PhotoImage
         else:
-            self.canvas.itemconfig(self.img_on_canvas, image=self.photo_image)
-        self.update_idletasks()
+            self.photo_image = ImageTk.PhotoImage(image=pil_img)
+            if self.img_on_canvas is None:
+                self.img_on_canvas = self.canvas.create_image(
+                    0, 0, anchor=tk.NW, image=self.photo_image
+                )
+            else:
+                self.canvas.itemconfig(self.img_on_canvas, image=self.photo_image)
+        self.rendered += 1
 
 
 class Interface(tk.Tk):
@@ -54,6 +139,9 @@ class Interface(tk.Tk):
     Основной класс GUI приложения.
     """
 
+    # повторное движение мыши к той же цели поиска мобов, если выделить её не удалось
+    MOB_MOVE_REPEAT_SEC = 1.0
+
     def __init__(self, arduino_ports, key_names, on_select_area, on_arduino_found):
         super().__init__()
         self.title("projectx")
@@ -66,15 +154,14 @@ class Interface(tk.Tk):
         )
         self.open_chat_handler_btn.pack(pady=10)
 
-        # Mob searcher init (path may need adjustment)
-        try:
-            self.mob_searcher = MobSearcher(template_path=r"E:/Projectx/src/cross.jpg")
-        except Exception as e:
-            # Fallback: instantiate without template if not found to avoid crash in UI
-            print(f"[GUI] MobSearcher init error: {e}")
-            self.mob_searcher = None
+        # MobSearcher создаётся при первом поиске (get_mob_searcher)
+        self.mob_searcher = None
+        self._mob_searcher_lock = threading.Lock()
+        self.mob_search_worker = None  # MobSearchThread непрерывного поиска
+        self._mob_target_count = None
+        self._mob_moved_to = None  # (track_id, время) последнего движения к цели поиска
 
-        # Кнопка запуска поиска мобов
+        # Кнопка запуска/остановки непрерывного поиска мобов
         self.mob_search_btn = tk.Button(
             self, text="Поиск мобов", command=self.start_mob_search
         )
@@ -89,12 +176,18 @@ class Interface(tk.Tk):
         self.key_names = key_names
         self.selected_area = None
         self.hp_analyzer_thread = None
+        self.controller_stage = None
         self.hp_debug_window = None
         self.arduino = None  # Экземпляр ArduinoController
+        # Отправка команд на Arduino — отдельная стадия, медленный порт не держит контроллер
+        self.command_stage = CommandStage(self.send_key_to_arduino)
+        self.command_stage.start()
 
         # Метка статуса
         self.status_label = tk.Label(self, text="Статус: Инициализация...")
         self.status_label.pack(pady=5)
+        self.model_label = tk.Label(self, text="Модель: не загружена")
+        self.model_label.pack()
 
         # Кнопка открытия окна контроллера событий
         self.events_window = None
@@ -161,9 +254,10 @@ class Interface(tk.Tk):
         except Exception as e:
             print(f"[GUI] Error loading config: {e}")
             cfg = {}
+        self.cfg = cfg
 
         self.hp_action_controller = HpActionController(
-            send_command_callback=self.send_key_to_arduino,
+            send_command_callback=self.queue_command,
             spoil_key=cfg.get("spoil_key", "F2"),
             no_target_command=cfg.get("no_target_command", []),
             dead_target_command=cfg.get("dead_target_command", []),
@@ -174,15 +268,51 @@ class Interface(tk.Tk):
             hp_stable_threshold_sec=cfg.get("hp_stable_threshold_sec", 2.0),
             hp_change_epsilon=cfg.get("hp_change_epsilon", 0.01),
             far_transient=cfg.get("far_transient", True),
+            hp_filter=create_hp_filter_from_config(cfg),
+            death_lead_sec=cfg.get("hp_death_lead_sec", 0.0),
         )
 
         # Запуск автоопределения Arduino портов
         self.start_auto_detect()
 
+        # Детектор грузится в фоне после показа окна, к запуску анализа он уже прогрет
+        self.after(200, self.preload_models)
+
         # Обработка закрытия окна
         self.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+    def preload_models(self):
+        """
+        Фоновая загрузка и прогрев детектора окна цели в общий реестр моделей.
+        Все запуски анализа HP берут этот же экземпляр.
+        """
+        if self.cfg.get("inference_mode", "local") != "local":
+            return
+        if not self.cfg.get("detector_preload", True):
+            return
+        from model_registry import get_model_registry
+
+        def on_ready(stats):
+            if stats["error"]:
+                text = f"Модель: ошибка загрузки ({stats['error']})"
+            else:
+                text = (
+                    f"Модель: {stats['backend']} готова, загрузка {stats['load_time']:.2f}s, "
+                    f"прогрев {stats['warmup_time']:.2f}s"
+                )
+            self.after(0, lambda: self.model_label.config(text=text))
+
+        self.model_label.config(text="Модель: загрузка...")
+        try:
+            get_model_registry().preload(self.cfg, on_ready=on_ready)
+        except Exception as e:
+            print(f"[GUI] Ошибка предзагрузки модели: {e}")
+
     def start_mob_search(self):
+        """Включает/выключает непрерывный поиск мобов по кадрам общего захвата."""
+        if self.mob_search_worker is not None and self.mob_search_worker.is_alive():
+            self.stop_mob_search()
+            return
         if self.selected_area is None:
             messagebox.showwarning("Ошибка", "Сначала выберите область экрана")
             return
@@ -194,13 +324,38 @@ class Interface(tk.Tk):
             (0, h // 2, w // 4, h // 2),  # левый нижний - чат
         ]
 
-        # Запуск поиска в отдельном потоке, чтобы не блокировать GUI
+        # Шаблон и cv2 грузятся в отдельном потоке, чтобы не блокировать GUI
+        self.mob_search_btn.config(state=tk.DISABLED)
         threading.Thread(
-            target=self.mob_search_thread, args=(x, y, w, h, exclude_rects), daemon=True
+            target=self.launch_mob_search, args=((x, y, w, h), exclude_rects), daemon=True
         ).start()
 
-    def mob_search_thread(self, x, y, w, h, exclude_rects):
-        if not self.mob_searcher:
+    def get_mob_searcher(self):
+        """Ленивая инициализация MobSearcher (pyautogui, cv2, шаблон) при первом поиске."""
+        with self._mob_searcher_lock:
+            if self.mob_searcher is None:
+                # Mob searcher init (path may need adjustment)
+                try:
+                    from mob_searcher import MobSearcher
+
+                    self.mob_searcher = MobSearcher(
+                        template_path=r"E:/Projectx/src/cross.jpg",
+                        scales=self.cfg.get("mob_template_scales", [1.0]),
+                        pyramid=self.cfg.get(
+                            "mob_pyramid_factor", config.DEFAULTS["mob_pyramid_factor"]
+                        ),
+                        workers=self.cfg.get(
+                            "mob_search_workers", config.DEFAULTS["mob_search_workers"]
+                        ),
+                    )
+                except Exception as e:
+                    # Fallback: keep None if template not found to avoid crash in UI
+                    print(f"[GUI] MobSearcher init error: {e}")
+            return self.mob_searcher
+
+    def launch_mob_search(self, region, exclude_rects):
+        if not self.get_mob_searcher():
+            self.after(0, lambda: self.mob_search_btn.config(state=tk.NORMAL))
             self.after(
                 0,
                 lambda: messagebox.showinfo(
@@ -208,21 +363,77 @@ class Interface(tk.Tk):
                 ),
             )
             return
-
-        monitor_region = {"top": y, "left": x, "width": w, "height": h}
-        targets = self.mob_searcher.search(
-            monitor_region, exclude_rects, arduino_controller=self.arduino
+        from mob_searcher import MobSearchThread
+        from target_tracker import TargetTracker
+
+        worker = MobSearchThread(
+            self.mob_searcher,
+            region,
+            exclude_rects,
+            on_targets=self.on_mob_targets,
+            interval=self.cfg.get(
+                "mob_search_interval_sec", config.DEFAULTS["mob_search_interval_sec"]
+            ),
+            debug=self.cfg.get("mob_search_debug", False),
+            debug_fps=self.cfg.get("mob_debug_fps", config.DEFAULTS["mob_debug_fps"]),
+            tracker=TargetTracker(
+                reverify_sec=self.cfg.get(
+                    "mob_track_reverify_sec", config.DEFAULTS["mob_track_reverify_sec"]
+                )
+            ),
         )
-
-        if targets:
+        worker.start()
+        self.after(0, lambda: self.on_mob_search_started(worker))
+
+    def on_mob_search_started(self, worker):
+        self.mob_search_worker = worker
+        self._mob_target_count = None
+        self._mob_moved_to = None
+        self.mob_search_btn.config(text="Остановить поиск мобов", state=tk.NORMAL)
+        self.status_label.config(text="Поиск мобов запущен")
+
+    def stop_mob_search(self):
+        if self.mob_search_worker is not None:
+            self.mob_search_worker.stop()
+            self.mob_search_worker.join(timeout=2.0)
+            self.mob_search_worker = None
+            self.status_label.config(text="Поиск мобов остановлен")
+        self.mob_search_btn.config(text="Поиск мобов", state=tk.NORMAL)
+
+    def on_mob_targets(self, result):
+        """
+        Из потока поиска мобов: пока у контроллера нет цели — одно движение мыши
+        к выбранной (ближайшей) цели. К той же цели мышь двигается повторно только
+        через MOB_MOVE_REPEAT_SEC, к новой — сразу. В GUI — только число целей при его изменении.
+        """
+        targets = result.targets
+        target = result.selected
+        controller = self.hp_action_controller
+        if (
+            target is not None
+            and controller.current_state in (None, controller.STATE_NO_TARGET)
+            and self.arduino
+            and self.arduino.ser
+            and self.arduino.ser.is_open
+        ):
+            last = self._mob_moved_to
+            if (
+                last is None
+                or last[0] != target.track_id
+                or result.timestamp - last[1] >= self.MOB_MOVE_REPEAT_SEC
+            ):
+                self.mob_searcher.move_to(
+                    self.arduino,
+                    target,
+                    verify=self.cfg.get("mob_move_verify", config.DEFAULTS["mob_move_verify"]),
+                )
+                self._mob_moved_to = (target.track_id, result.timestamp)
+        count = len(targets)
+        if count != self._mob_target_count:
+            self._mob_target_count = count
             self.after(
-                0,
-                lambda: messagebox.showinfo(
-                    "Результат", f"Найдено целей: {len(targets)}"
-                ),
+                0, lambda: self.status_label.config(text=f"Поиск мобов: целей {count}")
             )
-        else:
-            self.after(0, lambda: messagebox.showinfo("Результат", "Целей не найдено"))
 
     def open_events_controller_window(self):
         if self.events_window is None or not self.events_window.winfo_exists():
@@ -232,6 +443,8 @@ class Interface(tk.Tk):
             self.events_window.focus_set()
 
     def open_chat_handler_window(self):
+        from chat_handler import ChatHandlerWindow
+
         self.chat_handler_window = ChatHandlerWindow(
             self, hp_action_controller=self.hp_action_controller
         )
@@ -301,6 +514,16 @@ class Interface(tk.Tk):
         else:
             print("Arduino не подключен!")
 
+    def queue_command(self, key_name):
+        """
+        Команда контроллера -> стадия отправки. Из стадии контроллера команда несёт время
+        захвата кадра, по которому принято решение, из остальных потоков — текущее время.
+        """
+        timestamp = None
+        if self.controller_stage is not None and threading.current_thread() is self.controller_stage:
+            timestamp = self.hp_action_controller.last_update_time
+        self.command_stage.submit(key_name, timestamp)
+
     def send_command(self):
         """
         Отправка выбранной вручную команды на Arduino.
@@ -338,13 +561,33 @@ class Interface(tk.Tk):
         if self.hp_analyzer_thread and self.hp_analyzer_thread.is_alive():
             messagebox.showinfo("Информация", "Анализ уже запущен")
             return
+        from hp_analyzer import HpAnalyzerThread
+
         if self.hp_debug_window is None or not self.hp_debug_window.winfo_exists():
-            self.hp_debug_window = HpDebugWindow(self)
+            self.hp_debug_window = HpDebugWindow(
+                self,
+                max_fps=self.cfg.get("debug_preview_fps", config.DEFAULTS["debug_preview_fps"]),
+            )
+        # Решения контроллера — в своей стадии по самому свежему результату анализа
+        self.controller_stage = ControllerStage(self.hp_action_controller)
+        self.controller_stage.start()
+        # детектор (в т.ч. подключение к серверу инференса) поток анализа берёт сам
         self.hp_analyzer_thread = HpAnalyzerThread(
             self.selected_area,
             self.hp_analysis_callback,
             debug_window=self.hp_debug_window,
-            interval=0.2,
+            interval=self.cfg.get(
+                "hp_min_interval_sec", config.DEFAULTS["hp_min_interval_sec"]
+            ),
+            max_interval=self.cfg.get(
+                "hp_max_interval_sec", config.DEFAULTS["hp_max_interval_sec"]
+            ),
+            roi_refresh_sec=self.cfg.get(
+                "hp_roi_refresh_sec", config.DEFAULTS["hp_roi_refresh_sec"]
+            ),
+            crop_margin=self.cfg.get("hp_crop_margin", config.DEFAULTS["hp_crop_margin"]),
+            result_queue=self.controller_stage.inbox,
+            error_callback=self.hp_analysis_failed,
         )
         self.hp_analyzer_thread.start()
         self.status_label.config(text="Анализ HP запущен")
@@ -355,13 +598,37 @@ class Interface(tk.Tk):
         """
         Остановка анализа HP.
         """
+        if self.controller_stage:
+            self.controller_stage.stop()
         if self.hp_analyzer_thread:
             self.hp_analyzer_thread.stop()
-            self.hp_analyzer_thread.join()
+            # поток может ещё подключаться к серверу инференса — он завершится сам
+            # и закроет клиент, ждать его в потоке Tk незачем
+            self.hp_analyzer_thread.join(timeout=2.0)
             self.hp_analyzer_thread = None
             self.status_label.config(text="Анализ HP остановлен")
             self.hp_start_btn.config(state=tk.NORMAL)
             self.hp_stop_btn.config(state=tk.DISABLED)
+        if self.controller_stage:
+            self.controller_stage.join(timeout=2.0)
+            self.controller_stage = None
+
+    def hp_analysis_failed(self, message):
+        """Поток анализа завершился, не начав работу: сбросить статус и кнопки (из потока)."""
+        thread = threading.current_thread()
+
+        def update():
+            if self.hp_analyzer_thread is not thread:
+                return  # анализ уже остановлен или перезапущен
+            if self.controller_stage:
+                self.controller_stage.stop()
+                self.controller_stage = None
+            self.hp_analyzer_thread = None
+            self.status_label.config(text=f"Анализ HP не запущен: {message}")
+            self.hp_start_btn.config(state=tk.NORMAL)
+            self.hp_stop_btn.config(state=tk.DISABLED)
+
+        self.after(0, update)
 
     def hp_analysis_callback(self, status, hp_percent):
         def update():
@@ -380,16 +647,6 @@ class Interface(tk.Tk):
 
             self._previous_status = status
 
-            # Преобразуем статус для HpActionController
-            state_map = {
-                "Цели нет": "no_target",
-                "Цель мертва": "dead_target",
-                "Цель жива": "alive_target",
-            }
-            state = state_map.get(status, "no_target")
-
-            self.hp_action_controller.update(state, hp_percent)
-
             if new_target and getattr(self, "spoil_manager", None):
                 self.spoil_manager.on_new_target()
                 self.spoil_manager.try_spoil()
@@ -401,6 +658,10 @@ class Interface(tk.Tk):
         Обработка закрытия окна — корректное завершение потоков и закрытие порта.
         """
         self.stop_hp_analysis()
+        self.stop_mob_search()
+        if self.mob_searcher is not None:
+            self.mob_searcher.close()
+        self.command_stage.stop()
         if self.arduino:
             self.arduino.close()
         self.hp_action_controller.stop()
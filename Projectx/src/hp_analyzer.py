@@ -1,113 +1,330 @@
 import threading
-import time
-import mss
 import numpy as np
-import cv2
-from ultralytics import YOLO
+
+import config
+import hp_fill
+from change_detector import ChangeDetector
+from detectors import DetectorUnavailable
+from pipeline import HpResult
+from model_registry import get_model_registry
+from roi_lock import HpRoiLock
+from scheduler import AdaptiveScheduler
+from screen_capture import as_bgr, get_capture_service
 
 
 class HpAnalyzerThread(threading.Thread):
-    def __init__(self, region, update_callback, debug_window=None, interval=0.2):
+    CAPTURE_NAME = "hp"
+    # изменение HP (в %) между тиками, которое считается «боем» для планировщика
+    ACTIVITY_HP_EPSILON = 0.5
+    # минимальный запас вокруг последнего окна цели при детекции по кропу (px)
+    CROP_MIN_MARGIN = 32
+
+    def __init__(
+        self,
+        region,
+        update_callback,
+        debug_window=None,
+        interval=0.2,
+        capture=None,
+        change_gate=True,
+        max_interval=None,
+        detector=None,
+        roi_lock=True,
+        roi_refresh_sec=5.0,
+        crop_detect=True,
+        crop_margin=0.5,
+        result_queue=None,
+        error_callback=None,
+    ):
         """
         :param region: (x, y, width, height) — координаты области экрана для анализа
         :param update_callback: функция callback(status: str, hp_percent: float)
-        :param debug_window: окно для отладки (может быть None)
-        :param interval: интервал анализа (сек)
+        :param debug_window: окно предпросмотра с submit(img, window_box, hp_box) (может быть None)
+        :param interval: период анализа в бою (сек)
+        :param max_interval: максимальный период в простое (сек); None — фиксированный interval
+        :param detector: детектор из detectors.py (None — по config.py в потоке анализа:
+            клиент сервера инференса при inference_mode=server, иначе общий из реестра моделей)
+        :param capture: сервис захвата ScreenCapture (по умолчанию общий для процесса)
+        :param change_gate: пропускать YOLO, если область не изменилась с прошлого тика
+        :param roi_lock: после уверенной детекции сопровождать окно цели без YOLO
+        :param roi_refresh_sec: как часто всё равно перезапускать YOLO в режиме сопровождения
+        :param crop_detect: запускать детектор на кропе вокруг последнего окна цели
+        :param crop_margin: запас кропа в долях размера окна цели (растёт, если окно двигается)
+        :param result_queue: LatestQueue следующей стадии (ControllerStage) для HpResult
+        :param error_callback: функция callback(message: str) из потока анализа, если анализ
+            не запустился (детектор не загрузился) — чтобы GUI сбросил статус и кнопки
         """
         super().__init__()
         self.region = region
         self.update_callback = update_callback
+        self.error_callback = error_callback
         self.debug_window = debug_window
         self.interval = interval
+        self.capture = capture or get_capture_service()
+        self.capture_name = f"{self.CAPTURE_NAME}:{id(self)}"
+        self.change_detector = ChangeDetector("hp") if change_gate else None
+        self._last_result = None  # (status, hp_percent, window_box, hp_box)
+        # при воспроизведении записи время ускорено в capture.speed раз
+        speed = getattr(self.capture, "speed", 1.0) or 1.0
+        self.scheduler = AdaptiveScheduler(
+            interval / speed,
+            max_interval / speed if max_interval else None,
+            name="hp",
+        )
+        self._prev_status = None
+        self._prev_hp = None
+        self.roi_lock = HpRoiLock(refresh_sec=roi_refresh_sec) if roi_lock else None
+        self.inference_calls = 0
+        self.result_queue = result_queue
+        self.crop_detect = crop_detect
+        self.crop_margin = float(crop_margin)
+        self._last_window_box = None
+        self._window_motion = 0.0  # сглаженное смещение окна цели между детекциями (px)
+        self.crop_hits = 0
+        self.crop_misses = 0
+        self._owns_detector = False  # клиент сервера инференса, созданный потоком
         self.running = True
 
-        # Загружаем YOLO-модель
-        self.model = YOLO(r"E:\Projectx\src\FinalDodep\weights\best.pt")
+        # Детектор окна цели (ultralytics / onnx / openvino — см. detectors.py)
+        self.detector = detector
 
-    def analyze_hp_in_box(self, img, hp_box):
+    @staticmethod
+    def hp_fill_columns(img, hp_box):
         """
-        Анализирует процент заполнения HP bar по цвету внутри найденного бокса.
-        Работает для красного, зелёного, жёлтого HP bar.
+        Заполненные столбцы HP bar по цвету внутри бокса (bool-массив по ширине бокса).
+        Работает для красного, зелёного, жёлтого HP bar (классы цвета — LUT из hp_fill).
+        img — BGR или BGRA (в т.ч. strided view кадра), копируется только маленький ROI.
+        None — если бокс пустой.
         """
-        x1, y1, x2, y2 = map(int, hp_box)
-        if x1 >= x2 or y1 >= y2:
-            return 0.0
-        hp_roi = img[y1:y2, x1:x2]
-        if hp_roi.size == 0:
-            return 0.0
-
-        hsv = cv2.cvtColor(hp_roi, cv2.COLOR_BGR2HSV)
-
-        # Маски для красного, жёлтого, зелёного (можно добавить другие цвета)
-        mask_red1 = cv2.inRange(hsv, (0, 120, 120), (10, 255, 255))
-        mask_red2 = cv2.inRange(hsv, (160, 120, 120), (179, 255, 255))
-        mask_yellow = cv2.inRange(hsv, (15, 120, 120), (35, 255, 255))
-        mask_green = cv2.inRange(hsv, (36, 80, 80), (85, 255, 255))
-
-        mask = cv2.bitwise_or(mask_red1, mask_red2)
-        mask = cv2.bitwise_or(mask, mask_yellow)
-        mask = cv2.bitwise_or(mask, mask_green)
-
-        # Проекция по горизонтали (или вертикали — зависит от ориентации HP bar)
-        hp_line = np.max(mask, axis=0)
-        filled_cols = np.sum(hp_line > 100)
-        hp_percent = filled_cols / mask.shape[1] * 100
-        return min(max(hp_percent, 0.0), 100.0)
+        return hp_fill.fill_columns(img, hp_box)
 
-    def detect_and_analyze(self, img):
-        results = self.model(img, conf=0.25)
-        boxes = results[0].boxes.data.cpu().numpy()
-        window_box = None
-        hp_box = None
+    @staticmethod
+    def analyze_hp_in_box(img, hp_box):
+        """Процент заполнения HP bar внутри найденного бокса (край — с точностью до долей пикселя)."""
+        return hp_fill.hp_fill(img, hp_box)[1]
+
+    @staticmethod
+    def status_for(hp_percent):
+        return "Цель мертва" if hp_percent < 1.5 else "Цель жива"
+
+    def _crop_rect(self, img_shape, window_box):
+        """Кроп вокруг последнего окна цели с адаптивным запасом (x1, y1, x2, y2) или None."""
+        h, w = img_shape[:2]
+        x1, y1, x2, y2 = window_box
+        margin = max(
+            self.CROP_MIN_MARGIN,
+            self.crop_margin * max(x2 - x1, y2 - y1) + 2.0 * self._window_motion,
+        )
+        cx1, cy1 = max(0, int(x1 - margin)), max(0, int(y1 - margin))
+        cx2, cy2 = min(w, int(x2 + margin)), min(h, int(y2 + margin))
+        if cx2 <= cx1 or cy2 <= cy1:
+            return None
+        if (cx2 - cx1) * (cy2 - cy1) >= 0.6 * w * h:
+            return None  # кроп почти во весь кадр — выгоды нет
+        return cx1, cy1, cx2, cy2
+
+    def _remember_window(self, window_box):
+        if self._last_window_box is not None:
+            px1, py1, px2, py2 = self._last_window_box
+            x1, y1, x2, y2 = window_box
+            shift = abs((x1 + x2 - px1 - px2) / 2) + abs((y1 + y2 - py1 - py2) / 2)
+            self._window_motion = 0.7 * self._window_motion + 0.3 * shift
+        self._last_window_box = window_box
+
+    def _detect_in(self, img, crop=None):
+        """
+        Один вызов детектора на всём кадре или на кропе (x1, y1, x2, y2).
+        Для кропа размер входа сети уменьшается пропорционально, чтобы масштаб объектов
+        совпадал с детекцией по всему кадру; боксы возвращаются в координатах кадра.
+        """
+        self.inference_calls += 1
+        if crop is None:
+            boxes = self.detector.predict(as_bgr(img))
+        else:
+            x1, y1, x2, y2 = crop
+            full_h, full_w = img.shape[:2]
+            scale = self.detector.imgsz / max(full_h, full_w)
+            imgsz = max(64, int(np.ceil(max(x2 - x1, y2 - y1) * scale / 32.0)) * 32)
+            boxes = self.detector.predict(
+                as_bgr(img[y1:y2, x1:x2]), imgsz=min(imgsz, self.detector.imgsz)
+            )
+            if len(boxes):
+                boxes = np.array(boxes, dtype=np.float32, copy=True)
+                boxes[:, [0, 2]] += x1
+                boxes[:, [1, 3]] += y1
 
+        window_box = hp_box = None
+        window_score = hp_score = 0.0
         for box in boxes:
             x1, y1, x2, y2, score, cls = box
             cls = int(cls)
             if cls == 0 and score > 0.25:
-                window_box = (x1, y1, x2, y2)
+                window_box, window_score = (x1, y1, x2, y2), float(score)
             elif cls == 1 and score > 0.25:
-                hp_box = (x1, y1, x2, y2)
+                hp_box, hp_score = (x1, y1, x2, y2), float(score)
+        return window_box, hp_box, window_score, hp_score
+
+    def detect_boxes(self, img):
+        """
+        YOLO-детекция окна цели и HP bar.
+        Сначала — на кропе вокруг последнего окна цели, при промахе — по всему кадру.
+        :return: (window_box, hp_box, window_score, hp_score); отсутствующий бокс — None
+        """
+        if self.crop_detect and self._last_window_box is not None:
+            crop = self._crop_rect(img.shape, self._last_window_box)
+            if crop is not None:
+                result = self._detect_in(img, crop)
+                if result[0] is not None and result[1] is not None:
+                    self.crop_hits += 1
+                    self._remember_window(result[0])
+                    return result
+                self.crop_misses += 1
 
+        result = self._detect_in(img)
+        if result[0] is not None and result[1] is not None:
+            self._remember_window(result[0])
+        else:
+            self._last_window_box = None
+            self._window_motion = 0.0
+        return result
+
+    def detect_and_analyze(self, img):
+        """img — BGR или BGRA view; в YOLO уходит strided BGR view без полной конвертации."""
+        window_box, hp_box, _, _ = self.detect_boxes(img)
         if window_box is None or hp_box is None:
             return "Цели нет", 0.0, None, None
 
         hp_percent = self.analyze_hp_in_box(img, hp_box)
-        status = "Цель мертва" if hp_percent < 1.5 else "Цель жива"
-        return status, hp_percent, window_box, hp_box
+        return self.status_for(hp_percent), hp_percent, window_box, hp_box
+
+    def track_or_detect(self, img, now):
+        """
+        Режим захвата/сопровождения: пока зафиксированное окно цели проходит дешёвую
+        проверку (рамка + форма заливки), HP считается по пикселям без YOLO.
+        """
+        lock = self.roi_lock
+        if lock is None:
+            return self.detect_and_analyze(img)
+
+        if lock.is_valid(img, now):
+            filled, hp_percent = hp_fill.hp_fill(img, lock.hp_box)
+            if lock.bar_shape_ok(filled):
+                lock.tracked += 1
+                return self.status_for(hp_percent), hp_percent, lock.window_box, lock.hp_box
+
+        window_box, hp_box, window_score, hp_score = self.detect_boxes(img)
+        lock.try_lock(img, window_box, hp_box, window_score, hp_score, now)
+        if window_box is None or hp_box is None:
+            return "Цели нет", 0.0, None, None
+        hp_percent = self.analyze_hp_in_box(img, hp_box)
+        return self.status_for(hp_percent), hp_percent, window_box, hp_box
+
+    def _update_activity(self, status, hp_percent):
+        """Бой (смена статуса или HP живой цели меняется) — частые тики, иначе — реже."""
+        active = status != self._prev_status or (
+            status == "Цель жива"
+            and self._prev_hp is not None
+            and abs(hp_percent - self._prev_hp) > self.ACTIVITY_HP_EPSILON
+        )
+        self._prev_status = status
+        self._prev_hp = hp_percent
+        self.scheduler.update(active)
+        self.capture.set_interval(self.capture_name, self.scheduler.interval)
+
+    def _acquire_detector(self):
+        """
+        Общий прогретый детектор из реестра. Пока модель грузится (preload при старте GUI),
+        поток ждёт её, проверяя stop(). False — анализ остановлен или модель не загрузилась.
+        """
+        if self.detector is not None:
+            return True
+        cfg = config.load_config()
+        if cfg["inference_mode"] == "server":
+            from inference_server import RemoteDetector, client_from_config
+
+            try:
+                self.detector = RemoteDetector(client_from_config(cfg).connect())
+                self._owns_detector = True
+                return self.running
+            except Exception as e:
+                print(f"[HpAnalyzerThread] Сервер инференса недоступен, YOLO в процессе: {e}")
+        registry = get_model_registry()
+        registry.preload(cfg)
+        while self.running:
+            try:
+                self.detector = registry.get(cfg, timeout=0.2)
+                return True
+            except TimeoutError:
+                continue
+            except Exception as e:
+                print(f"[HpAnalyzerThread] Детектор недоступен: {e}")
+                if self.error_callback is not None:
+                    self.error_callback(f"Детектор недоступен: {e}")
+                return False
+        return False
+
+    def _close_detector(self):
+        if self._owns_detector:
+            self._owns_detector = False
+            self.detector.close()
 
     def run(self):
-        with mss.mss() as sct:
+        if not self._acquire_detector():
+            self._close_detector()
+            return
+        hp_fill.get_lut()  # таблицы цветов строятся один раз, до первого тика
+        hp_fill.get_chroma_lut()
+        self.capture.register(self.capture_name, self.region, self.scheduler.interval)
+        last_id = None
+        try:
             while self.running:
-                x, y, w, h = self.region
-                monitor = sct.monitors[0]
-                x = max(monitor["left"], x)
-                y = max(monitor["top"], y)
-                w = min(w, monitor["width"] - (x - monitor["left"]))
-                h = min(h, monitor["height"] - (y - monitor["top"]))
-
-                monitor_region = {"top": y, "left": x, "width": w, "height": h}
-                img = np.array(sct.grab(monitor_region))
-                img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-
-                status, hp_percent, window_box, hp_box = self.detect_and_analyze(
-                    img_bgr
-                )
-                self.update_callback(status, hp_percent)
+                frame = self.capture.get_frame(self.capture_name, after_id=last_id)
+                if frame is None or frame.image.size == 0:
+                    self.scheduler.wait()
+                    continue
+                last_id = frame.frame_id
+                img = frame.image  # BGRA view общего кадра, без копии
 
-                # Визуализация для debug_window
-                if self.debug_window and self.debug_window.winfo_exists():
-                    debug_img = img_bgr.copy()
-                    if window_box is not None:
-                        x1, y1, x2, y2 = map(int, window_box)
-                        cv2.rectangle(debug_img, (x1, y1), (x2, y2), (0, 255, 0), 2)
-                    if hp_box is not None:
-                        x1, y1, x2, y2 = map(int, hp_box)
-                        cv2.rectangle(debug_img, (x1, y1), (x2, y2), (0, 0, 255), 2)
-                    self.debug_window.after(
-                        0, lambda m=debug_img: self.debug_window.update_image(m)
+                # Пиксели не изменились — переиспользуем прошлый результат без YOLO
+                changed = self.change_detector is None or self.change_detector.changed(img)
+                if changed or self._last_result is None:
+                    try:
+                        self._last_result = self.track_or_detect(img, frame.timestamp)
+                    except DetectorUnavailable as e:
+                        # сервер инференса не ответил: статус не меняем, кадр проверим снова
+                        print(f"[HpAnalyzerThread] Тик пропущен: {e}")
+                        if self.change_detector is not None:
+                            self.change_detector.invalidate()
+                        self.scheduler.wait()
+                        continue
+                status, hp_percent, window_box, hp_box = self._last_result
+                if self.result_queue is not None:
+                    self.result_queue.put(
+                        HpResult(
+                            status, hp_percent, window_box, hp_box,
+                            frame.timestamp, frame.frame_id,
+                        )
                     )
+                self.update_callback(status, hp_percent)
+                self._update_activity(status, hp_percent)
+
+                # Предпросмотр: окно само решает, нужен ли кадр (свёрнуто, лимит FPS)
+                if self.debug_window is not None:
+                    self.debug_window.submit(img, window_box, hp_box)
 
-                time.sleep(self.interval)
+                self.scheduler.wait()
+        finally:
+            self.capture.unregister(self.capture_name)
+            if self.change_detector is not None:
+                print(f"[HpAnalyzerThread] change gate: {self.change_detector.stats()}")
+            print(f"[HpAnalyzerThread] scheduler: {self.scheduler.stats()}")
+            print(
+                f"[HpAnalyzerThread] inference calls: {self.inference_calls} "
+                f"(crop hits {self.crop_hits}, crop misses {self.crop_misses})"
+            )
+            if self.roi_lock is not None:
+                print(f"[HpAnalyzerThread] roi lock: {self.roi_lock.stats()}")
+            self._close_detector()
 
     def stop(self):
         self.running = False
@@ -0,0 +1,186 @@
+"""
+Заливка HP bar через таблицу классов цвета (LUT) вместо HSV + четырёх inRange на каждом тике.
+
+Таблица строится один раз на процесс из тех же HSV-диапазонов, что использовались раньше:
+все 2^24 BGR-цвета переводятся в HSV, и для каждого запоминается класс (0 — не заливка,
+1.. — номер диапазона). Индекс таблицы — (r << 16 | g << 8 | b), то есть младшие 24 бита
+BGRA-пикселя, прочитанного как little-endian uint32: для кадров захвата классификация ROI —
+одна маска и одна выборка, результат совпадает с прежними масками пиксель в пиксель.
+
+Процент считается по проекции столбцов, а край заливки уточняется до долей пикселя
+по насыщенности (max - min каналов) пограничных столбцов — на коротких полосах
+один столбец это 1-2% HP. Насыщенность берётся из второй таблицы по тому же индексу.
+"""
+
+import sys
+import threading
+
+import cv2
+import numpy as np
+
+from screen_capture import to_bgr
+
+# (нижняя, верхняя) граница HSV; порядок задаёт номер класса (индекс + 1)
+HP_HSV_RANGES = (
+    ((0, 120, 120), (10, 255, 255)),  # красный
+    ((160, 120, 120), (179, 255, 255)),  # красный (переход через 180)
+    ((15, 120, 120), (35, 255, 255)),  # жёлтый
+    ((36, 80, 80), (85, 255, 255)),  # зелёный
+)
+
+# минимальная разница насыщенности заливки и фона, при которой край уточняется
+MIN_EDGE_CONTRAST = 8.0
+# сколько столбцов по обе стороны края берётся для уровней «заливка» / «фон»
+EDGE_REFERENCE_COLUMNS = 4
+
+_LITTLE_ENDIAN = sys.byteorder == "little"
+
+_lut_cache = {}  # ключ (диапазоны или "chroma") -> таблица
+_lut_lock = threading.Lock()
+
+
+def _all_colors():
+    """Все 2^24 цвета картинкой 4096x4096 BGR; пиксель i — цвет с индексом таблицы i."""
+    codes = np.arange(1 << 24, dtype=np.uint32)
+    all_colors = np.empty((4096, 4096, 3), dtype=np.uint8)
+    flat = all_colors.reshape(-1, 3)
+    flat[:, 0] = codes & 0xFF
+    flat[:, 1] = (codes >> 8) & 0xFF
+    flat[:, 2] = codes >> 16
+    return all_colors
+
+
+def build_bgr_lut(ranges=HP_HSV_RANGES):
+    """Таблица 2^24 -> класс цвета (uint8) для всех BGR-цветов."""
+    hsv = cv2.cvtColor(_all_colors(), cv2.COLOR_BGR2HSV)
+    lut = np.zeros(1 << 24, dtype=np.uint8)
+    # обратный порядок: при пересечении диапазонов побеждает первый, как раньше в OR масок
+    for cls in range(len(ranges), 0, -1):
+        lo, hi = ranges[cls - 1]
+        mask = cv2.inRange(hsv, lo, hi).reshape(-1)
+        lut[mask != 0] = cls
+    return lut
+
+
+def build_chroma_lut():
+    """Таблица 2^24 -> насыщенность max(b, g, r) - min(b, g, r)."""
+    colors = _all_colors().reshape(-1, 3)
+    b, g, r = colors[:, 0], colors[:, 1], colors[:, 2]
+    return np.maximum(np.maximum(b, g), r) - np.minimum(np.minimum(b, g), r)
+
+
+def _cached(key, build):
+    lut = _lut_cache.get(key)
+    if lut is None:
+        with _lut_lock:
+            lut = _lut_cache.get(key)
+            if lut is None:
+                lut = build()
+                _lut_cache[key] = lut
+    return lut
+
+
+def get_lut(ranges=HP_HSV_RANGES):
+    """Таблица для ranges; строится при первом обращении и переиспользуется всеми потоками."""
+    key = tuple((tuple(lo), tuple(hi)) for lo, hi in ranges)
+    return _cached(key, lambda: build_bgr_lut(key))
+
+
+def get_chroma_lut():
+    return _cached("chroma", build_chroma_lut)
+
+
+def color_index(roi):
+    """Индекс таблицы (r << 16 | g << 8 | b) для каждого пикселя ROI (BGR или BGRA view)."""
+    if _LITTLE_ENDIAN and roi.shape[-1] == 4 and roi.strides[-1] == 1 and roi.strides[-2] == 4:
+        # BGRA-пиксель как uint32: 0xAARRGGBB, без альфы — готовый индекс
+        return roi.view(np.uint32)[..., 0] & 0xFFFFFF
+    idx = roi[..., 2].astype(np.uint32) << 16
+    idx |= roi[..., 1].astype(np.uint32) << 8
+    idx |= roi[..., 0]
+    return idx
+
+
+def classify(roi, lut=None):
+    """Класс цвета каждого пикселя ROI (BGR или BGRA, можно strided view) — (h, w) uint8."""
+    if lut is None:
+        lut = get_lut()
+    return lut.take(color_index(roi))
+
+
+def _roi(img, hp_box):
+    x1, y1, x2, y2 = map(int, hp_box)
+    if x1 >= x2 or y1 >= y2:
+        return None
+    roi = img[max(0, y1) : y2, max(0, x1) : x2]
+    if roi.size == 0:
+        return None
+    return roi
+
+
+def fill_columns(img, hp_box, lut=None):
+    """Заполненные столбцы HP bar (bool по ширине бокса) или None для пустого бокса."""
+    roi = _roi(img, hp_box)
+    if roi is None:
+        return None
+    return classify(roi, lut).any(axis=0)
+
+
+def fill_percent(idx, filled):
+    """
+    Процент заливки с уточнением края до долей пикселя.
+    idx — индексы цветов ROI (color_index), filled — заполненные столбцы.
+    Целые столбцы — по проекции; пограничные — по доле насыщенности между уровнями
+    фона и заливки, измеренными в нескольких столбцах по обе стороны края.
+    """
+    n = filled.size
+    k = int(np.count_nonzero(filled))
+    if k == 0 or k == n:
+        return k / n * 100.0
+
+    edge = n - 1 - int(np.argmax(filled[::-1]))
+    lo_col = max(0, edge - EDGE_REFERENCE_COLUMNS)
+    hi_col = min(n, edge + 2 + EDGE_REFERENCE_COLUMNS)
+    chroma = (get_chroma_lut().take(idx[:, lo_col:hi_col]).sum(axis=0) / idx.shape[0]).tolist()
+    near = filled[lo_col:hi_col].tolist()
+    e = edge - lo_col
+    inside = [c for c, f in zip(chroma[:e], near[:e]) if f]
+    outside = [c for c, f in zip(chroma[e + 2 :], near[e + 2 :]) if not f]
+    if not inside or not outside:
+        return k / n * 100.0
+    fg, bg = sum(inside) / len(inside), sum(outside) / len(outside)
+    if fg - bg < MIN_EDGE_CONTRAST:
+        return k / n * 100.0
+
+    length = k - 1 + min(max((chroma[e] - bg) / (fg - bg), 0.0), 1.0)
+    if e + 1 < len(chroma):
+        length += min(max((chroma[e + 1] - bg) / (fg - bg), 0.0), 1.0)
+    return min(max(length / n * 100.0, 0.0), 100.0)
+
+
+def hp_fill(img, hp_box, lut=None):
+    """(заполненные столбцы, процент HP) за один проход; (None, 0.0) для пустого бокса."""
+    roi = _roi(img, hp_box)
+    if roi is None:
+        return None, 0.0
+    if lut is None:
+        lut = get_lut()
+    idx = color_index(roi)
+    filled = lut.take(idx).any(axis=0)
+    return filled, fill_percent(idx, filled)
+
+
+def hsv_fill_columns(img, hp_box, ranges=HP_HSV_RANGES):
+    """
+    Прежняя реализация (HSV + inRange по каждому диапазону) — эталон для сверки
+    и бенчмарка hp_fill_bench.
+    """
+    roi = _roi(img, hp_box)
+    if roi is None:
+        return None
+    hsv = cv2.cvtColor(to_bgr(roi), cv2.COLOR_BGR2HSV)
+    mask = None
+    for lo, hi in ranges:
+        m = cv2.inRange(hsv, lo, hi)
+        mask = m if mask is None else cv2.bitwise_or(mask, m)
+    return np.max(mask, axis=0) > 100
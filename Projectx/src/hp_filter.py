@@ -0,0 +1,185 @@
+import math
+from collections import deque
+from typing import Optional
+
+
+class HpEstimate:
+    """Сглаженное состояние HP цели на момент timestamp."""
+
+    __slots__ = (
+        "timestamp",
+        "raw_hp",
+        "hp",
+        "dps",
+        "dps_sigma",
+        "time_to_death",
+        "stall_since",
+        "stalled_for",
+        "fresh",
+    )
+
+    def __init__(
+        self, timestamp, raw_hp, hp, dps, dps_sigma, time_to_death, stall_since, fresh
+    ):
+        self.timestamp = timestamp
+        self.raw_hp = raw_hp
+        self.hp = hp
+        self.dps = dps  # урон в секунду, % HP/с (> 0 — HP убывает)
+        self.dps_sigma = dps_sigma
+        self.time_to_death = time_to_death  # сек или None, если урон статистически не доказан
+        self.stall_since = stall_since  # с какого момента урона нет (None — урон идёт)
+        self.stalled_for = 0.0 if stall_since is None else timestamp - stall_since
+        self.fresh = fresh  # первое измерение новой цели
+
+    def __repr__(self):
+        ttd = "-" if self.time_to_death is None else f"{self.time_to_death:.2f}s"
+        return (
+            f"HpEstimate(hp={self.hp:.2f}, dps={self.dps:.2f}±{self.dps_sigma:.2f}, "
+            f"ttd={ttd}, stalled={self.stalled_for:.2f}s)"
+        )
+
+
+class HpFilter:
+    """
+    Фильтр Калмана (HP, скорость изменения HP) между анализатором и HpActionController.
+
+    Сырые проценты HP с анализатора шумят на 1-2 столбца HP bar и приходят с неровным
+    шагом. Фильтр даёт сглаженный HP, урон в секунду с оценкой неопределённости
+    и прогноз времени до смерти цели.
+
+    «Урона нет» (stall) — когда наклон прямой по сырым измерениям за последние window_sec
+    не отличается от нуля больше чем на stall_z своих СКО (СКО наклона — из шума
+    измерения и числа точек окна). Скорость из самого фильтра для этого не годится:
+    её СКО при заданном шуме процесса держится около 2 %/с, и медленный урон
+    (0.5-2 %/с) с ней неотличим от нуля. Ступенчатый урон даёт тот же значимый наклон,
+    пока ступенька в окне.
+    """
+
+    def __init__(
+        self,
+        process_noise: float = 20.0,
+        measurement_noise: float = 0.5,
+        stall_z: float = 3.0,
+        min_dps: float = 0.2,
+        new_target_jump: float = 30.0,
+        max_gap_sec: float = 3.0,
+        window_sec: float = 3.0,
+    ):
+        """
+        :param process_noise: спектральная плотность изменения скорости урона ((%/с)^2/с)
+        :param measurement_noise: СКО измерения HP (%), порядка ширины одного столбца
+        :param stall_z: во сколько СКО изменение HP должно превышать шум, чтобы считаться реальным
+        :param min_dps: наклон по окну ниже этого (%/с) не считается уроном даже при малой СКО
+        :param new_target_jump: рост HP больше этого (%) — новая цель, фильтр сбрасывается
+        :param max_gap_sec: после паузы в измерениях дольше этого фильтр начинает заново
+        :param window_sec: окно сырых измерений для наклона HP (урон или его отсутствие)
+        """
+        self.process_noise = float(process_noise)
+        self.measurement_noise = float(measurement_noise)
+        self.stall_z = float(stall_z)
+        self.min_dps = float(min_dps)
+        self.new_target_jump = float(new_target_jump)
+        self.max_gap_sec = float(max_gap_sec)
+        self.window_sec = float(window_sec)
+        self.last_estimate: Optional[HpEstimate] = None
+        self.reset()
+
+    def reset(self):
+        self._x = None  # [hp, скорость HP %/с]
+        self._p = None  # ковариация 2x2 как [p00, p01, p11]
+        self._last_time = None
+        self._stall_since = None
+        self._window = deque()  # (время, сырой HP) за последние window_sec
+        self.last_estimate = None
+
+    def _init(self, hp, now):
+        r = self.measurement_noise ** 2
+        self._x = [hp, 0.0]
+        self._p = [r, 0.0, 100.0]
+        self._last_time = now
+        self._stall_since = now
+        self._window.clear()
+
+    def update(self, target_state: str, hp_percent: float, now: float) -> Optional[HpEstimate]:
+        """Новое измерение; для не живой цели фильтр сбрасывается и возвращается None."""
+        if target_state not in ("alive_target", "far_target"):
+            self.reset()
+            return None
+
+        fresh = (
+            self._x is None
+            or now - self._last_time > self.max_gap_sec
+            or hp_percent - self._x[0] > self.new_target_jump
+        )
+        if fresh:
+            self._init(hp_percent, now)
+        else:
+            dt = max(now - self._last_time, 1e-3)
+            self._last_time = now
+            hp, rate = self._x
+            p00, p01, p11 = self._p
+            q = self.process_noise
+            # прогноз: постоянная скорость, белый шум ускорения
+            hp += rate * dt
+            p00 += 2 * dt * p01 + dt * dt * p11 + q * dt ** 3 / 3
+            p01 += dt * p11 + q * dt ** 2 / 2
+            p11 += q * dt
+            # коррекция по измерению HP
+            s = p00 + self.measurement_noise ** 2
+            k0, k1 = p00 / s, p01 / s
+            residual = hp_percent - hp
+            hp += k0 * residual
+            rate += k1 * residual
+            self._x = [hp, rate]
+            self._p = [(1 - k0) * p00, (1 - k0) * p01, p11 - k1 * p01]
+
+        self._window.append((now, hp_percent))
+        while now - self._window[0][0] > self.window_sec:
+            self._window.popleft()
+
+        hp = min(max(self._x[0], 0.0), 100.0)
+        dps = -self._x[1]
+        dps_sigma = math.sqrt(max(self._p[2], 0.0))
+        damaging = self._hp_changed()
+        if damaging:
+            self._stall_since = None
+        elif self._stall_since is None:
+            self._stall_since = now
+        time_to_death = hp / dps if damaging and dps > 0 else None
+
+        self.last_estimate = HpEstimate(
+            now, hp_percent, hp, dps, dps_sigma, time_to_death, self._stall_since, fresh
+        )
+        return self.last_estimate
+
+    def _window_slope(self):
+        """Наклон HP по окну (%/с, МНК) и его СКО; None — окно слишком короткое."""
+        n = len(self._window)
+        if n < 5:
+            return None
+        t0 = self._window[0][0]
+        if self._window[-1][0] - t0 < self.window_sec / 3:
+            return None
+        mean_t = sum(t - t0 for t, _ in self._window) / n
+        mean_hp = sum(v for _, v in self._window) / n
+        stt = sum((t - t0 - mean_t) ** 2 for t, _ in self._window)
+        sth = sum((t - t0 - mean_t) * (v - mean_hp) for t, v in self._window)
+        return sth / stt, self.measurement_noise / math.sqrt(stt)
+
+    def _hp_changed(self):
+        """Есть ли свидетельство, что HP убывает: наклон по окну значимо меньше нуля."""
+        fit = self._window_slope()
+        if fit is None:
+            return False
+        slope, slope_sigma = fit
+        return -slope > max(self.stall_z * slope_sigma, self.min_dps)
+
+
+def create_hp_filter_from_config(cfg):
+    """HpFilter по настройкам или None, если фильтр выключен."""
+    if not cfg.get("hp_filter_enabled", True):
+        return None
+    return HpFilter(
+        process_noise=cfg.get("hp_filter_process_noise", 20.0),
+        measurement_noise=cfg.get("hp_filter_measurement_noise", 0.5),
+    )
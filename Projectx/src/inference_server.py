@@ -0,0 +1,661 @@
+"""
+Сервер инференса в отдельном процессе: YOLO-детектор и Tesseract вне Tk-процесса.
+
+Кадры передаются через multiprocessing.shared_memory: каждый клиент держит своё кольцо
+слотов (ring) и пишет кадр в свободный слот, а в очередь запросов уходит только
+маленькое сообщение (имя памяти, смещение, форма, задача). Воркер читает кадр прямо
+из общей памяти, результат (боксы, текст) возвращается через очередь ответов клиента.
+Очереди живут в процессе сервера (multiprocessing.managers), поэтому к одному серверу
+могут подключаться несколько экземпляров бота на одной машине — модель загружается
+один раз.
+
+Сервер следит за воркерами и перезапускает упавшие; клиент при обрыве соединения
+переподключается и при необходимости сам запускает сервер.
+
+Менеджер распаковывает (pickle) сообщения, поэтому доступ к нему — только по ключу:
+сервер при каждом запуске создаёт случайный ключ и пишет его в AUTHKEY_PATH
+(~/.projectx/inference.key, права только у владельца), клиенты читают ключ оттуда.
+
+    python src/inference_server.py serve --port 50555 --workers 1
+    python src/inference_server.py check --port 50555
+"""
+
+import argparse
+import itertools
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from multiprocessing import AuthenticationError, get_context, shared_memory
+from multiprocessing.managers import BaseManager
+
+import numpy as np
+
+from detectors import DetectorUnavailable
+
+DEFAULT_ADDRESS = ("127.0.0.1", 50555)
+AUTHKEY_PATH = os.path.join(os.path.expanduser("~"), ".projectx", "inference.key")
+
+# обрыв соединения с процессом сервера (manager-прокси); ключ не подошёл — сервер
+# перезапущен с новым ключом, а файл ключа ещё старый (или уже новый, а сервер старый)
+CONNECTION_ERRORS = (ConnectionError, OSError, EOFError, AuthenticationError)
+
+
+def new_authkey(path=AUTHKEY_PATH):
+    """Новый случайный ключ сервера; файл создаётся с правами только для владельца."""
+    key = secrets.token_hex(32)
+    os.makedirs(os.path.dirname(path), mode=0o700, exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with os.fdopen(fd, "w", encoding="ascii") as f:
+        f.write(key)
+    os.replace(tmp, path)
+    return key.encode("ascii")
+
+
+def read_authkey(path=AUTHKEY_PATH):
+    """Ключ последнего запущенного сервера или None, если сервер ещё не запускался."""
+    try:
+        with open(path, "r", encoding="ascii") as f:
+            key = f.read().strip()
+    except OSError:
+        return None
+    return key.encode("ascii") or None
+
+
+def parse_address(text):
+    host, _, port = str(text).rpartition(":")
+    return host or DEFAULT_ADDRESS[0], int(port)
+
+
+# --- процесс сервера: очереди запросов/ответов --------------------------------------------
+
+_requests = queue.Queue()
+_responses = {}
+_responses_lock = threading.Lock()
+
+
+def _get_requests():
+    return _requests
+
+
+def _get_responses(client_id):
+    with _responses_lock:
+        q = _responses.get(client_id)
+        if q is None:
+            q = _responses[client_id] = queue.Queue()
+        return q
+
+
+def _release(client_id):
+    with _responses_lock:
+        _responses.pop(client_id, None)
+
+
+class _ServerManager(BaseManager):
+    pass
+
+
+_ServerManager.register("get_requests", callable=_get_requests)
+_ServerManager.register("get_responses", callable=_get_responses)
+_ServerManager.register("release", callable=_release)
+
+
+class _ClientManager(BaseManager):
+    pass
+
+
+_ClientManager.register("get_requests")
+_ClientManager.register("get_responses")
+_ClientManager.register("release")
+
+
+# --- воркер ------------------------------------------------------------------------------
+
+
+# сколько колец клиентов воркер держит открытыми; старые закрываются (клиент перезапустился
+# или сменил кольцо — иначе отображения копились бы всё время жизни сервера)
+ATTACH_CACHE_SIZE = 8
+
+
+def _attach(name, cache):
+    """Общая память кольца клиента; cache — OrderedDict имя -> SharedMemory (LRU)."""
+    shm = cache.get(name)
+    if shm is not None:
+        cache.move_to_end(name)
+        return shm
+    shm = shared_memory.SharedMemory(name=name)
+    if os.name != "nt":
+        # память принадлежит клиенту: resource_tracker воркера не должен её удалять
+        try:
+            from multiprocessing import resource_tracker
+
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+    cache[name] = shm
+    while len(cache) > ATTACH_CACHE_SIZE:
+        _, old = cache.popitem(last=False)
+        try:
+            old.close()
+        except BufferError:
+            pass
+    return shm
+
+
+class _Tasks:
+    """Обработчики задач воркера; модели загружаются лениво, один раз на процесс."""
+
+    def __init__(self, detector_cfg):
+        self.detector_cfg = detector_cfg
+        self._detector = None
+        self._ocr_engines = {}
+
+    @property
+    def detector(self):
+        if self._detector is None:
+            from detectors import create_detector
+
+            self._detector = create_detector(**self.detector_cfg)
+        return self._detector
+
+    def info(self, img, params):
+        det = self.detector
+        return {"backend": det.backend, "imgsz": det.imgsz, "pid": os.getpid()}
+
+    def detect(self, img, params):
+        from screen_capture import as_bgr
+
+        boxes = self.detector.predict(as_bgr(img), imgsz=params.get("imgsz"))
+        return np.asarray(boxes, dtype=np.float32).reshape(-1, 6).tolist()
+
+    def ocr(self, img, params):
+        # движок на каждый набор настроек живёт всё время воркера — модели грузятся один раз
+        key = (
+            params.get("backend", "auto"),
+            params.get("lang", "rus+eng"),
+            int(params.get("psm", 3)),
+            params.get("whitelist", ""),
+        )
+        engine = self._ocr_engines.get(key)
+        if engine is None:
+            from ocr_engines import create_ocr
+
+            engine = self._ocr_engines[key] = create_ocr(*key)
+        if params.get("single_line"):
+            return engine.line(img)
+        return engine(img)
+
+
+def _worker_main(address, authkey, detector_cfg):
+    src_dir = os.path.dirname(os.path.abspath(__file__))
+    if src_dir not in sys.path:
+        sys.path.append(src_dir)
+    manager = _ClientManager(address=address, authkey=authkey)
+    manager.connect()
+    requests = manager.get_requests()
+    tasks = _Tasks(detector_cfg)
+    attached = OrderedDict()
+    responses = {}
+    print(f"[InferenceWorker:{os.getpid()}] готов")
+    while True:
+        req = requests.get()
+        t0 = time.perf_counter()
+        response = {"id": req["id"]}
+        try:
+            handler = getattr(tasks, req["task"])
+            img = None
+            if req.get("shm"):
+                shm = _attach(req["shm"], attached)
+                h, w, c = req["shape"]
+                img = np.ndarray((h, w, c), dtype=np.uint8, buffer=shm.buf, offset=req["offset"])
+            response["result"] = handler(img, req.get("params") or {})
+            response["ok"] = True
+        except Exception as e:
+            response["ok"] = False
+            response["error"] = f"{type(e).__name__}: {e}"
+        finally:
+            img = None
+        response["worker_ms"] = (time.perf_counter() - t0) * 1000.0
+        out = responses.get(req["client"])
+        if out is None:
+            out = responses[req["client"]] = manager.get_responses(req["client"])
+        out.put(response)
+
+
+def serve(address=DEFAULT_ADDRESS, authkey=None, workers=1, detector_cfg=None):
+    """
+    Запускает сервер очередей и воркеры; упавшие воркеры перезапускаются.
+    authkey=None — новый случайный ключ в AUTHKEY_PATH (для клиентов этого пользователя).
+    """
+    if authkey is None:
+        authkey = new_authkey()
+    manager = _ServerManager(address=address, authkey=authkey)
+    server = manager.get_server()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"[InferenceServer] слушает {address[0]}:{address[1]}, воркеров: {workers}")
+
+    ctx = get_context("spawn")
+    args = (address, authkey, detector_cfg or {})
+    procs = [None] * max(1, int(workers))
+    restarts = 0
+    try:
+        while True:
+            for i, p in enumerate(procs):
+                if p is not None and p.is_alive():
+                    continue
+                if p is not None:
+                    restarts += 1
+                    print(
+                        f"[InferenceServer] воркер {p.pid} завершился (код {p.exitcode}), "
+                        f"перезапуск #{restarts}"
+                    )
+                procs[i] = ctx.Process(target=_worker_main, args=args, daemon=True)
+                procs[i].start()
+            time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for p in procs:
+            if p is not None and p.is_alive():
+                p.terminate()
+        print(f"[InferenceServer] остановлен, перезапусков воркеров: {restarts}")
+
+
+def spawn_server(address=DEFAULT_ADDRESS, workers=1, detector_cfg=None):
+    """Запускает сервер отдельным процессом (не дочерним для Tk) и возвращает Popen."""
+    cmd = [
+        sys.executable,
+        os.path.abspath(__file__),
+        "serve",
+        "--host", address[0],
+        "--port", str(address[1]),
+        "--workers", str(workers),
+    ]
+    cfg = detector_cfg or {}
+    for key in ("backend", "weights", "imgsz", "threads"):
+        if cfg.get(key) not in (None, ""):
+            cmd += [f"--{key}", str(cfg[key])]
+    flags = getattr(subprocess, "CREATE_NEW_PROCESS_GROUP", 0)
+    print(f"[InferenceServer] запуск: {' '.join(cmd)}")
+    return subprocess.Popen(cmd, creationflags=flags)
+
+
+# --- клиент ------------------------------------------------------------------------------
+
+
+class InferenceTimeout(Exception):
+    pass
+
+
+class InferenceClient:
+    """
+    Клиент сервера инференса. Один клиент — один поток-потребитель (HpAnalyzerThread или
+    ChatOCR): у каждого своё кольцо слотов общей памяти и своя очередь ответов.
+    """
+
+    def __init__(
+        self,
+        address=DEFAULT_ADDRESS,
+        authkey=None,
+        slots=2,
+        timeout=2.0,
+        autostart=True,
+        workers=1,
+        detector_cfg=None,
+        reconnect_wait=0.5,
+    ):
+        """
+        :param authkey: ключ сервера; None — читается из AUTHKEY_PATH при каждом подключении
+        :param slots: размер кольца. Слот запроса без ответа (таймаут) остаётся занятым,
+                      пока ответ не придёт: воркер может всё ещё читать кадр. Если заняты
+                      все слоты, кольцо целиком остаётся воркерам (их отображение памяти
+                      живёт, пока они его не закроют), а клиент создаёт новое
+        :param timeout: ожидание ответа на запрос (сек)
+        :param autostart: запустить сервер, если к нему не удалось подключиться
+        :param reconnect_wait: сколько ждать сервер при переподключении посреди работы (сек):
+            тик захвата не должен стоять, пока сервер запускается, — следующий запрос
+            попробует снова
+        """
+        self.address = tuple(address)
+        self.authkey = authkey
+        self.slots = max(1, int(slots))
+        self.timeout = float(timeout)
+        self.autostart = autostart
+        self.reconnect_wait = float(reconnect_wait)
+        self.workers = workers
+        self.detector_cfg = detector_cfg
+        self.client_id = uuid.uuid4().hex
+        self._ids = itertools.count(1)
+        self._shm = None
+        self._slot_bytes = 0
+        self._slot = 0
+        self._busy = {}  # слот -> id запроса в работе
+        self._manager = None
+        self._requests = None
+        self._responses = None
+        self._lost = False  # соединение оборвалось и ещё не восстановлено
+        self._server_proc = None  # сервер, запущенный этим клиентом
+        self.requests_sent = 0
+        self.timeouts = 0
+        self.reconnects = 0
+        self.rings_abandoned = 0
+
+    # соединение
+
+    def connect(self, wait=10.0):
+        deadline = time.time() + wait
+        while True:
+            try:
+                authkey = self.authkey or read_authkey()
+                if authkey is None:
+                    raise ConnectionRefusedError(f"нет ключа сервера ({AUTHKEY_PATH})")
+                manager = _ClientManager(address=self.address, authkey=authkey)
+                manager.connect()
+                self._manager = manager
+                self._requests = manager.get_requests()
+                self._responses = manager.get_responses(self.client_id)
+                self._lost = False
+                return self
+            except CONNECTION_ERRORS:
+                if self.autostart:
+                    self._spawn()
+                if time.time() >= deadline:
+                    raise
+                time.sleep(0.3)
+
+    def _spawn(self):
+        """Запускает сервер, если запущенный этим клиентом ещё не работает."""
+        if self._server_proc is None or self._server_proc.poll() is not None:
+            self._server_proc = spawn_server(self.address, self.workers, self.detector_cfg)
+
+    def _reconnect(self):
+        """Короткая попытка переподключиться; при неудаче — ConnectionError/OSError."""
+        self.reconnects += 1
+        print(f"[InferenceClient] переподключение к {self.address[0]}:{self.address[1]}")
+        self._manager = None
+        self._lost = True
+        self._forget_connection()
+        # запросы старого соединения могут ещё выполняться — их слоты не переиспользуем
+        self._abandon_ring()
+        self.connect(wait=self.reconnect_wait)
+
+    def _forget_connection(self):
+        """
+        Прокси multiprocessing кешируют соединение по адресу сервера (на поток): прокси
+        нового соединения взяли бы сокет упавшего сервера и снова получили EOFError.
+        """
+        tls = getattr(self._requests, "_tls", None)
+        conn = getattr(tls, "connection", None)
+        if conn is None:
+            return
+        try:
+            conn.close()
+        except OSError:
+            pass
+        del tls.connection
+
+    # кольцо общей памяти
+
+    def _ensure_ring(self, nbytes):
+        if self._shm is not None and nbytes <= self._slot_bytes:
+            return
+        self._release_ring()
+        self._slot_bytes = nbytes
+        self._shm = shared_memory.SharedMemory(create=True, size=nbytes * self.slots)
+        self._busy.clear()
+
+    def _release_ring(self):
+        if self._shm is not None:
+            self._shm.close()
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
+            self._shm = None
+
+    def _abandon_ring(self):
+        """Новое кольцо вместо того, в котором остались слоты запросов без ответа."""
+        if self._busy:
+            self.rings_abandoned += 1
+        self._release_ring()
+        self._busy.clear()
+
+    def _settle(self, request_id):
+        """Ответ на request_id пришёл — его слот свободен."""
+        for slot in [s for s, rid in self._busy.items() if rid == request_id]:
+            del self._busy[slot]
+
+    def _drain(self):
+        """Забирает без ожидания ответы на просроченные запросы, освобождая их слоты."""
+        while True:
+            try:
+                response = self._responses.get_nowait()
+            except queue.Empty:
+                return
+            except CONNECTION_ERRORS:
+                return
+            self._settle(response["id"])
+
+    def _free_slot(self):
+        for _ in range(self.slots):
+            slot = self._slot
+            self._slot = (self._slot + 1) % self.slots
+            if slot not in self._busy:
+                return slot
+        return None
+
+    # запросы
+
+    def submit(self, task, img=None, **params):
+        """Отправляет запрос, возвращает (id, слот). img — uint8 (h, w, c), копируется в слот."""
+        if self._manager is None:
+            if self._lost:
+                self._reconnect()
+            else:
+                self.connect()
+        req = {"client": self.client_id, "id": next(self._ids), "task": task, "params": params}
+        slot = None
+        if img is not None:
+            img = np.asarray(img)
+            if img.ndim == 2:
+                img = img[:, :, None]
+            self._ensure_ring(img.nbytes)
+            slot = self._free_slot()
+            if slot is None:
+                self._drain()
+                slot = self._free_slot()
+            if slot is None:
+                # ответов нет ни на один слот (воркер завис или перезапущен)
+                self._abandon_ring()
+                self._ensure_ring(img.nbytes)
+                slot = self._free_slot()
+            offset = slot * self._slot_bytes
+            dst = np.ndarray(img.shape, dtype=np.uint8, buffer=self._shm.buf, offset=offset)
+            dst[...] = img
+            req.update(shm=self._shm.name, offset=offset, shape=img.shape)
+            self._busy[slot] = req["id"]
+        try:
+            self._requests.put(req)
+        except CONNECTION_ERRORS:
+            # переподключение меняет кольцо — кадр копируется заново
+            self._reconnect()
+            return self.submit(task, img, **params)
+        self.requests_sent += 1
+        return req["id"], slot
+
+    def wait(self, request_id, slot=None, timeout=None):
+        """Ответ на запрос request_id; ответы на старые (просроченные) запросы пропускаются."""
+        deadline = time.time() + (self.timeout if timeout is None else timeout)
+        while True:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                # слот остаётся занятым: воркер может ещё читать кадр из него
+                self.timeouts += 1
+                raise InferenceTimeout(f"нет ответа на запрос {request_id}")
+            try:
+                response = self._responses.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            except CONNECTION_ERRORS:
+                try:
+                    self._reconnect()
+                except CONNECTION_ERRORS:
+                    pass  # сервер ещё не поднялся — переподключится следующий submit
+                raise InferenceTimeout("соединение с сервером потеряно")
+            self._settle(response["id"])
+            if response["id"] != request_id:
+                continue
+            if not response.get("ok"):
+                raise RuntimeError(response.get("error", "ошибка инференса"))
+            return response["result"]
+
+    def call(self, task, img=None, timeout=None, **params):
+        request_id, slot = self.submit(task, img, **params)
+        return self.wait(request_id, slot, timeout)
+
+    def close(self):
+        if self._manager is not None:
+            try:
+                self._manager.release(self.client_id)
+            except Exception:
+                pass
+            self._manager = None
+        self._release_ring()
+        print(
+            f"[InferenceClient] запросов: {self.requests_sent}, таймаутов: {self.timeouts}, "
+            f"переподключений: {self.reconnects}, брошенных колец: {self.rings_abandoned}"
+        )
+
+
+class RemoteDetector:
+    """Детектор с интерфейсом detectors.Detector поверх сервера инференса."""
+
+    backend = "remote"
+
+    def __init__(self, client):
+        self.client = client
+        info = client.call("info", timeout=max(client.timeout, 120.0))
+        self.imgsz = int(info["imgsz"])
+        self.remote_backend = info["backend"]
+        self.load_time = 0.0
+        self.warmup_time = 0.0
+        self.failures = 0
+        print(
+            f"[RemoteDetector] сервер {client.address[0]}:{client.address[1]}, "
+            f"бэкенд {self.remote_backend}, imgsz={self.imgsz}, pid воркера {info['pid']}"
+        )
+
+    def predict(self, img, imgsz=None):
+        try:
+            boxes = self.client.call("detect", img, imgsz=imgsz)
+        except (InferenceTimeout, RuntimeError) + CONNECTION_ERRORS as e:
+            # кадр без ответа — не «цели нет»: анализатор пропустит тик, следующий попробует снова;
+            # если сервер упал, клиент переподключится (и запустит его) на следующем тике
+            self.failures += 1
+            raise DetectorUnavailable(str(e)) from e
+        return np.asarray(boxes, dtype=np.float32).reshape(-1, 6)
+
+    def __call__(self, img, imgsz=None):
+        return self.predict(img, imgsz=imgsz)
+
+    def close(self):
+        self.client.close()
+
+
+class RemoteOcr:
+    """
+    OCR области чата на сервере инференса: вызов с BGRA-кадром -> текст.
+    Движок (ocr_engines) создаётся в воркере один раз на набор настроек.
+    """
+
+    def __init__(self, client, lang="rus+eng", psm=3, whitelist="", backend="auto"):
+        self.client = client
+        self.lang = lang
+        self.params = {"lang": lang, "psm": int(psm), "whitelist": whitelist, "backend": backend}
+
+    def _call(self, bgra, **params):
+        try:
+            return self.client.call("ocr", bgra, **params, **self.params)
+        except (InferenceTimeout,) + CONNECTION_ERRORS as e:
+            raise DetectorUnavailable(f"сервер инференса недоступен: {e}") from e
+
+    def __call__(self, bgra):
+        return self._call(bgra)
+
+    def line(self, bgra):
+        return self._call(bgra, single_line=True)
+
+    def close(self):
+        self.client.close()
+
+
+def client_from_config(cfg, **kwargs):
+    """InferenceClient по настройкам inference_* и detector_* (сервер запускается при необходимости)."""
+    return InferenceClient(
+        address=parse_address(cfg["inference_address"]),
+        workers=cfg["inference_workers"],
+        detector_cfg={
+            "backend": cfg["detector_backend"],
+            "weights": cfg["detector_weights"],
+            "imgsz": cfg["detector_imgsz"],
+            "threads": cfg["detector_threads"],
+        },
+        **kwargs,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Сервер инференса (YOLO, Tesseract)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    srv = sub.add_parser("serve", help="запустить сервер")
+    srv.add_argument("--host", default=DEFAULT_ADDRESS[0])
+    srv.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1])
+    srv.add_argument("--workers", type=int, default=1)
+    srv.add_argument("--backend", default="ultralytics")
+    srv.add_argument("--weights")
+    srv.add_argument("--imgsz", type=int, default=640)
+    srv.add_argument("--threads", type=int, default=0)
+
+    chk = sub.add_parser("check", help="подключиться и замерить detect")
+    chk.add_argument("--host", default=DEFAULT_ADDRESS[0])
+    chk.add_argument("--port", type=int, default=DEFAULT_ADDRESS[1])
+    chk.add_argument("--runs", type=int, default=20)
+
+    args = parser.parse_args()
+    if args.cmd == "serve":
+        if args.weights is None:
+            import config
+
+            args.weights = config.load_config()["detector_weights"]
+        serve(
+            (args.host, args.port),
+            workers=args.workers,
+            detector_cfg={
+                "backend": args.backend,
+                "weights": args.weights,
+                "imgsz": args.imgsz,
+                "threads": args.threads,
+            },
+        )
+    else:
+        client = InferenceClient((args.host, args.port), autostart=False).connect()
+        det = RemoteDetector(client)
+        frame = np.random.default_rng(0).integers(0, 255, (480, 640, 4), dtype=np.uint8)
+        times = []
+        for _ in range(args.runs):
+            t0 = time.perf_counter()
+            det.predict(frame[:, :, :3])
+            times.append(time.perf_counter() - t0)
+        times_ms = np.array(times) * 1000
+        print(
+            f"detect (с передачей кадра): p50={np.percentile(times_ms, 50):.1f}ms "
+            f"p90={np.percentile(times_ms, 90):.1f}ms"
+        )
+        det.close()
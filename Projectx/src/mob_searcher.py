@@ -1,11 +1,114 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import cv2
 import numpy as np
-import mss
 import pyautogui
 
+from change_detector import ChangeDetector
+from pipeline import MobSearchResult
+from scheduler import AdaptiveScheduler
+from screen_capture import get_capture_service, to_gray
+from target_tracker import TargetTracker
+
+
+class MobTarget:
+    """Найденная цель: центр таблички имени в координатах экрана."""
+
+    __slots__ = ("x", "y", "rect", "circle", "track_id")
+
+    def __init__(self, x, y, rect, circle, track_id=None):
+        self.x = x
+        self.y = y
+        self.rect = rect  # (x, y, w, h) таблички в координатах кадра
+        self.circle = circle  # позиция найденного шаблона в координатах кадра
+        self.track_id = track_id  # постоянный id цели в TargetTracker (None — без трекинга)
+
+    def distance_to(self, point):
+        return ((self.x - point[0]) ** 2 + (self.y - point[1]) ** 2) ** 0.5
+
+    def __repr__(self):
+        tid = "" if self.track_id is None else f"#{self.track_id} "
+        return f"MobTarget({tid}{self.x}, {self.y})"
+
+
+class DebugView:
+    """
+    Отладочные окна OpenCV без блокировки: показ не чаще max_fps, waitKey(1).
+    Все вызовы — из одного потока (того, что ищет).
+    """
+
+    WINDOWS = ("Targets", "Morphology")
+
+    def __init__(self, max_fps=2.0):
+        self.period = 1.0 / max(0.1, float(max_fps))
+        self._last = 0.0
+        self.shown = False
+
+    def due(self):
+        return time.monotonic() - self._last >= self.period
+
+    def show(self, image, morph, candidates, targets):
+        if not self.due():
+            return
+        self._last = time.monotonic()
+        if image.ndim == 2:
+            debug_img = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+        elif image.shape[2] == 4:
+            debug_img = cv2.cvtColor(image, cv2.COLOR_BGRA2BGR)
+        else:
+            debug_img = image.copy()
+        found = {t.rect for t in targets}
+        for x, y, w, h in candidates:
+            color = (0, 255, 0) if (x, y, w, h) in found else (0, 0, 255)
+            cv2.rectangle(debug_img, (x, y), (x + w, y + h), color, 2)
+        for t in targets:
+            cv2.circle(debug_img, t.circle, 10, (255, 0, 0), 2)
+        cv2.imshow(self.WINDOWS[0], debug_img)
+        if morph is not None:
+            cv2.imshow(self.WINDOWS[1], morph)
+        cv2.waitKey(1)
+        self.shown = True
+
+    def close(self):
+        if self.shown:
+            for name in self.WINDOWS:
+                try:
+                    cv2.destroyWindow(name)
+                except cv2.error:
+                    pass
+            cv2.waitKey(1)
+            self.shown = False
+
 
 class MobSearcher:
-    def __init__(self, template_path):
+    CAPTURE_NAME = "mob_search"
+    # ширина полосы справа от таблички имени, где ищется шаблон (px)
+    STRIP_WIDTH = 20
+    MATCH_THRESHOLD = 0.8
+    # ширина горизонтального ядра морфологии, склеивающего буквы имени в табличку
+    NAME_KERNEL_W = 10
+    # поиск по полосам: перекрытие соседних полос (выше таблички, h < 30) и минимальная высота
+    TILE_OVERLAP = 32
+    MIN_TILE_ROWS = 128
+    MAX_AUTO_WORKERS = 4
+    # prefilter: полоса с перепадом яркости меньше этой доли перепада шаблона не проверяется
+    MIN_CONTRAST_RATIO = 0.5
+
+    def __init__(self, template_path, scales=(1.0,), prefilter=False, pyramid=1, workers=1):
+        """
+        :param template_path: шаблон иконки рядом с именем моба
+        :param scales: масштабы шаблона (пирамида для другого масштаба интерфейса)
+        :param prefilter: пропускать полосы без контраста, не вызывая matchTemplate.
+            По умолчанию выключен: TM_CCOEFF_NORMED не зависит от яркости и контраста,
+            поэтому тусклую иконку check_circle_near_name находит, а фильтр её отбросил бы
+        :param pyramid: 1 — поиск табличек по всему кадру; 2 или 4 — грубый поиск
+            на уменьшенной в столько раз бинарной маске и уточнение только вокруг находок
+        :param workers: потоков для поиска по горизонтальным полосам кадра
+            (1 — без пула, 0 — по числу ядер, не больше MAX_AUTO_WORKERS)
+        """
         img = cv2.imread(template_path, cv2.IMREAD_UNCHANGED)
         if img is None:
             raise FileNotFoundError(f"Template not found: {template_path}")
@@ -15,31 +118,145 @@ class MobSearcher:
             self.template = img
         self.template_w, self.template_h = self.template.shape[::-1]
 
+        # шаблоны всех масштабов готовятся один раз
+        self.templates = []
+        for scale in sorted(set(float(v) for v in scales)):
+            if scale == 1.0:
+                tmpl = self.template
+            else:
+                size = (
+                    max(1, int(round(self.template_w * scale))),
+                    max(1, int(round(self.template_h * scale))),
+                )
+                interp = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+                tmpl = cv2.resize(self.template, size, interpolation=interp)
+            self.templates.append(np.ascontiguousarray(tmpl))
+        self.strip_width = max([self.STRIP_WIDTH] + [t.shape[1] for t in self.templates])
+        self.min_template_w = min(t.shape[1] for t in self.templates)
+        self.min_template_h = min(t.shape[0] for t in self.templates)
+        self.prefilter = prefilter
+        self.pyramid = int(pyramid) if pyramid in (2, 4) else 1
+        self.name_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (self.NAME_KERNEL_W, 1))
+        # строки маски обрабатываются независимо (ядро 1 px по высоте): пиксель итоговой
+        # маски зависит только от соседей по строке в пределах трёх проходов ядра
+        self.refine_margin = 3 * self.NAME_KERNEL_W + self.pyramid
+        if not workers:
+            workers = min(self.MAX_AUTO_WORKERS, os.cpu_count() or 1)
+        self.workers = max(1, int(workers))
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self.min_contrast = self.MIN_CONTRAST_RATIO * (
+            int(self.template.max()) - int(self.template.min())
+        )
+        self.prefiltered = 0
+
     def exclude_areas(self, img, exclude_rects):
         h, w = img.shape[:2]
         for x, y, width, height in exclude_rects:
             cv2.rectangle(img, (x, y), (x + width, y + height), (0, 0, 0), thickness=-1)
         return img
 
+    @staticmethod
+    def is_name_size(w, h):
+        return 30 < w < 200 and h < 30
+
+    def _name_mask(self, thresh):
+        """Буквы имени склеиваются в сплошную табличку, короткие блики убираются."""
+        morph = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, self.name_kernel)
+        morph = cv2.erode(morph, self.name_kernel)
+        return cv2.dilate(morph, self.name_kernel)
+
     def find_possible_targets(self, img):
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        """
+        img — BGR, BGRA или уже серое изображение (в т.ч. strided view).
+        :return: (прямоугольники табличек по нижней кромке, маска для отладки)
+        """
+        gray = to_gray(img)
         _, thresh = cv2.threshold(gray, 252, 255, cv2.THRESH_BINARY)
-        kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (10, 1))
-        morph = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, kernel)
-        morph = cv2.erode(morph, kernel)
-        morph = cv2.dilate(morph, kernel)
+        if self.pyramid > 1:
+            return self._find_targets_pyramid(thresh)
+        morph = self._name_mask(thresh)
         contours, _ = cv2.findContours(morph, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
 
         filtered = []
         for cnt in contours:
             x, y, w, h = cv2.boundingRect(cnt)
-            if 30 < w < 200 and h < 30:
+            if self.is_name_size(w, h):
                 filtered.append((x, y, w, h))
 
         filtered.sort(key=lambda r: r[1] + r[3])  # сортировка по нижней координате y+h
         return filtered, morph
 
+    def _find_targets_pyramid(self, thresh):
+        """
+        Грубо-точный поиск: маска уменьшается в pyramid раз (белый блок — если в нём есть
+        хоть один белый пиксель), на ней внешние контуры находят группы, похожие
+        на табличку по ширине. Точная маска и внешние контуры считаются только
+        в окрестности каждой группы; контур, упёршийся в край окрестности, отбрасывается —
+        он целиком попадёт в окрестность своей группы. По высоте группы не отсеиваются:
+        на уменьшенной маске с табличкой сливаются соседние белые полосы и таблички
+        в стопке (зазор меньше pyramid px), такую группу уточняет полная маска.
+        :return: (прямоугольники, уменьшенная маска для отладки)
+        """
+        f = self.pyramid
+        full_h, full_w = thresh.shape[:2]
+        coarse_w, coarse_h = max(1, full_w // f), max(1, full_h // f)
+        # целое число блоков, иначе INTER_AREA сдвигает границы блоков;
+        # уменьшение по 2 раза — у OpenCV быстрый путь для x2, а x4 одним вызовом в разы дольше
+        coarse = thresh[: coarse_h * f, : coarse_w * f]
+        step = 1
+        while step < f:
+            step *= 2
+            coarse = cv2.resize(
+                coarse, (coarse_w * f // step, coarse_h * f // step), interpolation=cv2.INTER_AREA
+            )
+        # INTER_AREA с целым шагом — среднее по блоку: любой белый пиксель даёт ненулевое
+        _, coarse = cv2.threshold(coarse, 0, 255, cv2.THRESH_BINARY)
+        coarse_kernel = cv2.getStructuringElement(
+            cv2.MORPH_RECT, (-(-self.NAME_KERNEL_W // f) + 1, 1)
+        )
+        coarse = cv2.morphologyEx(coarse, cv2.MORPH_CLOSE, coarse_kernel)
+        # внешние контуры дают те же рамки, что connectedComponentsWithStats (8-связность),
+        # но без полной карты меток — на уменьшенной маске это в разы быстрее
+        groups, _ = cv2.findContours(coarse, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        margin = self.refine_margin
+        found = set()
+        for group in groups:
+            bx, by, bw, bh = cv2.boundingRect(group)
+            # группа уже табличек — табличек не содержит
+            if (bw + 1) * f <= 30:
+                continue
+            x1, x2 = max(0, bx * f - margin), min(full_w, (bx + bw) * f + margin)
+            y1, y2 = max(0, by * f - 1), min(full_h, (by + bh) * f + 1)
+            # строки и столбцы за последним целым блоком в уменьшенную маску не попали
+            if by + bh == coarse_h:
+                y2 = full_h
+            if bx + bw == coarse_w:
+                x2 = full_w
+            morph = self._name_mask(thresh[y1:y2, x1:x2])
+            contours, _ = cv2.findContours(morph, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+            for cnt in contours:
+                x, y, w, h = cv2.boundingRect(cnt)
+                if not self.is_name_size(w, h):
+                    continue
+                if (
+                    (x == 0 and x1 > 0)
+                    or (y == 0 and y1 > 0)
+                    or (x + w == x2 - x1 and x2 < full_w)
+                    or (y + h == y2 - y1 and y2 < full_h)
+                ):
+                    continue
+                found.add((x1 + x, y1 + y, w, h))
+
+        filtered = sorted(found, key=lambda r: (r[1] + r[3], r[0]))
+        return filtered, coarse
+
     def check_circle_near_name(self, gray_img, rect):
+        """
+        Проверка одного кандидата (полоса 20 px справа от таблички, один масштаб).
+        Поиск идёт через check_circles_near_names; эта версия — эталон для сверки и бенчмарка.
+        """
         x, y, w, h = rect
         region_x = x + w
         region_y = y
@@ -58,40 +275,270 @@ class MobSearcher:
             return True, (region_x + max_loc[0], region_y + max_loc[1])
         return False, None
 
-    def search(self, monitor_region, exclude_rects, arduino_controller=None):
-        with mss.mss() as sct:
-            img = np.array(sct.grab(monitor_region))
-            img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-            img = self.exclude_areas(img, exclude_rects)
-            targets, morph_img = self.find_possible_targets(img)
-            gray_img = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-
-            debug_img = img.copy()
-            found_targets = []
-
-            for rect in targets:
-                x, y, w, h = rect
-                found_circle, circle_pos = self.check_circle_near_name(gray_img, rect)
-                color = (0, 255, 0) if found_circle else (0, 0, 255)
-                cv2.rectangle(debug_img, (x, y), (x + w, y + h), color, 2)
+    def check_circles_near_names(self, gray_img, rects):
+        """
+        Пакетная проверка всех кандидатов: полосы справа от табличек складываются
+        столбиком в одну мозаику, и шаблон каждого масштаба ищется одним matchTemplate.
+        Позиции шаблона на стыке двух полос при разборе результата не учитываются,
+        поэтому ответ тот же, что при проверке каждой полосы отдельно.
+        Полосы меньше шаблона и (prefilter) без контраста в мозаику не попадают.
+        :return: список (found, (x, y)) в порядке rects
+        """
+        img_h, img_w = gray_img.shape[:2]
+        results = [(False, None)] * len(rects)
+        strips = []  # (индекс кандидата, x, y, w, h) полосы
+        for i, (x, y, w, h) in enumerate(rects):
+            rx, ry = x + w, y
+            rw = min(self.strip_width, img_w - rx)
+            rh = min(h, img_h - ry)
+            if rw >= self.min_template_w and rh >= self.min_template_h:
+                strips.append((i, rx, ry, rw, rh))
+        if not strips:
+            return results
+
+        heights = np.array([s[4] for s in strips])
+        offsets = np.concatenate(([0], np.cumsum(heights)[:-1]))
+        mosaic = np.zeros((int(heights.sum()), self.strip_width), dtype=np.uint8)
+        for (_, rx, ry, rw, rh), oy in zip(strips, offsets.tolist()):
+            mosaic[oy : oy + rh, :rw] = gray_img[ry : ry + rh, rx : rx + rw]
+
+        if self.prefilter:
+            # перепад яркости каждой полосы — по строкам мозаики, без цикла
+            contrast = np.maximum.reduceat(mosaic.max(axis=1), offsets).astype(np.int16)
+            contrast -= np.minimum.reduceat(mosaic.min(axis=1), offsets)
+            keep = contrast >= self.min_contrast
+            if not keep.all():
+                self.prefiltered += int(np.count_nonzero(~keep))
+                if not keep.any():
+                    return results
+                mosaic = mosaic[np.repeat(keep, heights)]
+                strips = [s for s, k in zip(strips, keep.tolist()) if k]
+                heights = heights[keep]
+                offsets = np.concatenate(([0], np.cumsum(heights)[:-1]))
+
+        best_score = [self.MATCH_THRESHOLD] * len(strips)
+        best_pos = [None] * len(strips)
+        for tmpl in self.templates:
+            th, tw = tmpl.shape
+            if mosaic.shape[0] < th:
+                continue
+            res = cv2.matchTemplate(mosaic, tmpl, cv2.TM_CCOEFF_NORMED)
+            # максимум каждой полосы по её допустимым строкам (без стыков) одним reduceat;
+            # полосы ниже шаблона этого масштаба в разбор не входят — их строки
+            # могут выходить за конец res (полоса последняя в мозаике)
+            fits = heights >= th
+            if not fits.any():
+                continue
+            starts = offsets[fits]
+            bounds = np.stack((starts, starts + heights[fits] - th + 1), axis=1)
+            row_max = np.append(res.max(axis=1), -1.0)
+            scores = np.full(len(strips), -1.0)
+            scores[fits] = np.maximum.reduceat(row_max, bounds.ravel())[::2]
+            # полосы у правого края кадра дополнены нулями — для них только свои столбцы
+            for k, (_, rx, ry, rw, rh) in enumerate(strips):
+                if rh < th or rw < tw:
+                    continue
+                if scores[k] <= best_score[k] and rw == self.strip_width:
+                    continue
+                oy = int(offsets[k])
+                _, score, _, loc = cv2.minMaxLoc(res[oy : oy + rh - th + 1, : rw - tw + 1])
+                if score > best_score[k]:
+                    best_score[k] = score
+                    best_pos[k] = (rx + loc[0], ry + loc[1])
+
+        for (i, *_), pos in zip(strips, best_pos):
+            if pos is not None:
+                results[i] = (True, pos)
+        return results
+
+    def tile_bounds(self, height):
+        """
+        Горизонтальные полосы кадра (y0, y1) для пула потоков. Ядро морфологии
+        высотой 1 px, поэтому строки обрабатываются независимо и полосы во всю ширину
+        дают ту же маску, что и весь кадр; перекрытие TILE_OVERLAP выше любой таблички,
+        так что каждая табличка целиком лежит хотя бы в одной полосе.
+        """
+        n = min(self.workers, height // self.MIN_TILE_ROWS)
+        if n <= 1:
+            return [(0, height)]
+        step = -(-height // n)
+        return [(i * step, min(height, (i + 1) * step + self.TILE_OVERLAP)) for i in range(n)]
+
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="mob_tile"
+                )
+            return self._pool
+
+    def close(self):
+        """Останавливает пул потоков поиска по полосам (если он создавался)."""
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False)
+                self._pool = None
+
+    def _find_in_tile(self, image, exclude_rects, y0, y1):
+        """
+        Порог, морфология и контуры на одной полосе: (y0, серая полоса, маска, кандидаты
+        в координатах полосы). OpenCV отпускает GIL, поэтому полосы считаются параллельно.
+        """
+        tile = image[y0:y1]
+        gray = to_gray(tile)
+        if exclude_rects:
+            if gray is tile:
+                gray = gray.copy()
+            # исключаем области на собственном сером изображении (одна конвертация
+            # BGRA->GRAY), общий кадр не копируется и не меняется
+            self.exclude_areas(gray, [(x, y - y0, w, h) for x, y, w, h in exclude_rects])
+        candidates, morph = self.find_possible_targets(gray)
+        return y0, gray, morph, candidates
+
+    @staticmethod
+    def _merge_tiles(found, height):
+        """
+        Кандидаты всех полос в координатах кадра, без дублей из перекрытий.
+        Табличка, упёршаяся во внутренний край полосы, обрезана — она целиком есть
+        в соседней полосе. :return: (кандидаты по нижней кромке, номер полосы каждого)
+        """
+        if len(found) == 1:
+            candidates = found[0][3]
+            return candidates, [0] * len(candidates)
+        owner = {}
+        for k, (y0, gray, _, rects) in enumerate(found):
+            tile_h = gray.shape[0]
+            for x, y, w, h in rects:
+                if (y == 0 and y0 > 0) or (y + h == tile_h and y0 + tile_h < height):
+                    continue
+                owner.setdefault((x, y0 + y, w, h), k)
+        candidates = sorted(owner, key=lambda r: (r[1] + r[3], r[0]))
+        return candidates, [owner[r] for r in candidates]
+
+    def _check_in_tiles(self, grays, rects, owners):
+        """
+        check_circles_near_names по полосам: полоса справа от таблички лежит в тех же
+        строках, поэтому каждый кандидат проверяется на сером изображении своей полосы.
+        """
+        results = [(False, None)] * len(rects)
+        groups = {}
+        for i, k in enumerate(owners):
+            groups.setdefault(k, []).append(i)
+        if not groups:
+            return results
+
+        def check(k):
+            y0, gray = grays[k]
+            local = [(x, y - y0, w, h) for x, y, w, h in (rects[i] for i in groups[k])]
+            return k, self.check_circles_near_names(gray, local)
+
+        if len(groups) == 1:
+            done = [check(next(iter(groups)))]
+        else:
+            done = list(self._get_pool().map(check, list(groups)))
+        for k, checks in done:
+            y0 = grays[k][0]
+            for i, (found_circle, pos) in zip(groups[k], checks):
+                if found_circle:
+                    results[i] = (True, (pos[0], pos[1] + y0))
+        return results
+
+    def analyze(self, image, exclude_rects=(), origin=(0, 0), tracker=None, now=None):
+        """
+        Поиск на одном кадре (BGRA/BGR/серый view, кадр не меняется).
+        При workers > 1 кадр делится на полосы (tile_bounds): и поиск табличек,
+        и проверка шаблоном идут по полосам в пуле потоков.
+        :param origin: левый верхний угол кадра на экране
+        :param tracker: TargetTracker — кандидаты сопоставляются с целями прошлых кадров,
+            шаблоном проверяются только новые и устаревшие (now — время кадра)
+        :return: (targets, candidates, morph) — targets: MobTarget в порядке кандидатов
+            (по нижней кромке таблички, как сортирует find_possible_targets);
+            morph — маска для отладки (None при поиске по полосам)
+        """
+        tiles = self.tile_bounds(image.shape[0])
+        if len(tiles) == 1:
+            found = [self._find_in_tile(image, exclude_rects, 0, image.shape[0])]
+        else:
+            pool = self._get_pool()
+            found = list(
+                pool.map(lambda t: self._find_in_tile(image, exclude_rects, *t), tiles)
+            )
+        candidates, owners = self._merge_tiles(found, image.shape[0])
+        morph_img = found[0][2] if len(found) == 1 else None
+        grays = [(y0, gray) for y0, gray, _, _ in found]
+
+        targets = []
+        if tracker is None:
+            checks = self._check_in_tiles(grays, candidates, owners)
+            for rect, (found_circle, circle_pos) in zip(candidates, checks):
                 if found_circle:
-                    cv2.circle(debug_img, circle_pos, 10, (255, 0, 0), 2)
-                    abs_x = monitor_region["left"] + x + w // 2
-                    abs_y = monitor_region["top"] + y + h // 2
-                    found_targets.append((abs_x, abs_y))
-                    if (
-                        arduino_controller
-                        and arduino_controller.ser
-                        and arduino_controller.ser.is_open
-                    ):
-                        dx, dy = self.calculate_relative_move(abs_x, abs_y)
-                        arduino_controller.move_mouse(dx, dy)
-
-            cv2.imshow("Targets", debug_img)
-            cv2.imshow("Morphology", morph_img)
-            cv2.waitKey(10000)
-
-            return found_targets
+                    x, y, w, h = rect
+                    targets.append(
+                        MobTarget(origin[0] + x + w // 2, origin[1] + y + h // 2, rect, circle_pos)
+                    )
+            return targets, candidates, morph_img
+
+        seen = tracker.update(candidates, now)
+        stale = [i for i, t in enumerate(seen) if tracker.needs_check(t, now)]
+        checks = self._check_in_tiles(
+            grays, [candidates[i] for i in stale], [owners[i] for i in stale]
+        )
+        stale = [seen[i] for i in stale]
+        for track, (found_circle, circle_pos) in zip(stale, checks):
+            tracker.set_checked(track, found_circle, circle_pos, now)
+        for track in seen:
+            if track.verified:
+                x, y, w, h = track.rect
+                targets.append(
+                    MobTarget(
+                        origin[0] + x + w // 2,
+                        origin[1] + y + h // 2,
+                        track.rect,
+                        track.circle,
+                        track.track_id,
+                    )
+                )
+        return targets, candidates, morph_img
+
+    def search(
+        self, monitor_region, exclude_rects, arduino_controller=None, capture=None, debug=None
+    ):
+        """
+        Разовый поиск: один кадр, одно движение мыши к цели, ближайшей к центру области.
+        debug — DebugView для отладочных окон (без ожидания) или None.
+        Для непрерывного поиска — MobSearchThread.
+        :return: центры целей (x, y) на экране, ближайшие к центру — первыми
+        """
+        capture = capture or get_capture_service()
+        region = (
+            monitor_region["left"],
+            monitor_region["top"],
+            monitor_region["width"],
+            monitor_region["height"],
+        )
+        # разовый поиск: область живёт в сервисе только на время одного кадра
+        name = f"{self.CAPTURE_NAME}:{threading.get_ident()}"
+        capture.register(name, region)
+        try:
+            frame = capture.get_frame(name, timeout=2.0)
+        finally:
+            capture.unregister(name)
+        if frame is None or frame.image.size == 0:
+            print("[MobSearcher] Нет кадра для поиска")
+            return []
+
+        targets, candidates, morph_img = self.analyze(
+            frame.image, exclude_rects, frame.region[:2]
+        )
+        if debug is not None:
+            debug.show(frame.image, morph_img, candidates, targets)
+
+        x, y, w, h = frame.region
+        targets.sort(key=lambda t: t.distance_to((x + w / 2.0, y + h / 2.0)))
+        if targets and arduino_controller and arduino_controller.ser and arduino_controller.ser.is_open:
+            self.move_to(arduino_controller, targets[0])
+
+        return [(t.x, t.y) for t in targets]
 
     def calculate_relative_move(self, target_x, target_y):
         current_x, current_y = pyautogui.position()
@@ -99,6 +546,131 @@ class MobSearcher:
         dy = max(-127, min(127, target_y - current_y))
         return dx, dy
 
+    def move_to(self, arduino_controller, target, verify=True):
+        """
+        Курсор — на цель за один тик: всё движение одним пакетом шагов по ±127
+        (ArduinoController.move_mouse_to), с одной проверкой позиции в конце.
+        """
+        return arduino_controller.move_mouse_to(
+            target.x, target.y, pyautogui.position, verify=verify
+        )
+
+
+class MobSearchThread(threading.Thread):
+    """
+    Непрерывный поиск мобов на кадрах общего сервиса захвата — без окон и ожиданий.
+
+    Каждый тик (не чаще interval) публикует MobSearchResult в result_queue (LatestQueue)
+    и/или on_targets(result): подтверждённые цели с постоянными track_id (TargetTracker),
+    ближайшие к точке прицела — первыми, и одну выбранную цель (selected).
+    Мышью поток не двигает — это решает потребитель результатов. Если область
+    не изменилась с прошлого тика, публикуется прошлый результат с временем нового кадра.
+    """
+
+    CAPTURE_NAME = "mob_search"
+
+    def __init__(
+        self,
+        searcher,
+        region,
+        exclude_rects=(),
+        on_targets=None,
+        result_queue=None,
+        interval=0.5,
+        capture=None,
+        change_gate=True,
+        debug=False,
+        debug_fps=2.0,
+        tracker=None,
+        aim=None,
+    ):
+        """
+        :param searcher: MobSearcher (шаблон загружен)
+        :param region: (x, y, w, h) области поиска на экране
+        :param exclude_rects: области (x, y, w, h) внутри region, где не искать
+        :param on_targets: callback(MobSearchResult) — вызывается из потока поиска
+        :param result_queue: LatestQueue для MobSearchResult
+        :param interval: период поиска (сек)
+        :param debug: показывать отладочные окна OpenCV (не чаще debug_fps)
+        :param tracker: TargetTracker (по умолчанию — новый с настройками по умолчанию)
+        :param aim: точка прицела (x, y) на экране; None — центр области
+        """
+        super().__init__(daemon=True, name="MobSearchThread")
+        self.searcher = searcher
+        self.region = tuple(map(int, region))
+        self.exclude_rects = list(exclude_rects)
+        self.on_targets = on_targets
+        self.result_queue = result_queue
+        self.capture = capture or get_capture_service()
+        self.capture_name = f"{self.CAPTURE_NAME}:{id(self)}"
+        self.change_detector = ChangeDetector("mob") if change_gate else None
+        speed = getattr(self.capture, "speed", 1.0) or 1.0
+        self.scheduler = AdaptiveScheduler(interval / speed, name="mob")
+        self.debug = DebugView(debug_fps) if debug else None
+        self.tracker = tracker or TargetTracker()
+        x, y, w, h = self.region
+        self.aim = tuple(aim) if aim is not None else (x + w / 2.0, y + h / 2.0)
+        self.last_result = None
+        self.searches = 0
+        self.published = 0
+        self.running = True
+
+    def run(self):
+        self.capture.register(self.capture_name, self.region, self.scheduler.interval)
+        last_id = None
+        targets = None
+        selected = None
+        try:
+            while self.running:
+                frame = self.capture.get_frame(self.capture_name, after_id=last_id)
+                if frame is None or frame.image.size == 0:
+                    self.scheduler.wait()
+                    continue
+                last_id = frame.frame_id
+                try:
+                    changed = (
+                        self.change_detector is None
+                        or self.change_detector.changed(frame.image)
+                    )
+                    if changed or targets is None:
+                        fx, fy = frame.region[:2]
+                        targets, candidates, morph = self.searcher.analyze(
+                            frame.image,
+                            self.exclude_rects,
+                            (fx, fy),
+                            tracker=self.tracker,
+                            now=frame.timestamp,
+                        )
+                        targets.sort(key=lambda t: t.distance_to(self.aim))
+                        track = self.tracker.select((self.aim[0] - fx, self.aim[1] - fy))
+                        selected = None
+                        if track is not None:
+                            selected = next(t for t in targets if t.track_id == track.track_id)
+                        self.searches += 1
+                        if self.debug is not None:
+                            self.debug.show(frame.image, morph, candidates, targets)
+                    result = MobSearchResult(targets, frame.timestamp, frame.frame_id, selected)
+                    self.last_result = result
+                    if self.result_queue is not None:
+                        self.result_queue.put(result)
+                    if self.on_targets is not None:
+                        self.on_targets(result)
+                    self.published += 1
+                except Exception as e:
+                    print(f"[MobSearchThread] Ошибка поиска: {e}")
+                self.scheduler.wait()
+        finally:
+            self.capture.unregister(self.capture_name)
+            if self.debug is not None:
+                self.debug.close()
+            print(
+                f"[MobSearchThread] searches: {self.searches}, published: {self.published}, "
+                f"tracker: {self.tracker.stats()}, scheduler: {self.scheduler.stats()}"
+            )
+
+    def stop(self):
+        self.running = False
+
 
 # Функция для задания исключаемых областей (например, чат и центр)
 def get_exclude_rects(monitor_region):
@@ -118,6 +690,18 @@ if __name__ == "__main__":
     mob_searcher = MobSearcher(template_path="E:/Projectx/src/cross.png")
     arduino_controller = None  # инициализируйте при необходимости
 
-    while True:
-        targets = mob_searcher.search(monitor_region, exclude_rects, arduino_controller)
-        print("Found targets:", targets)
+    region = tuple(monitor_region[k] for k in ("left", "top", "width", "height"))
+    worker = MobSearchThread(
+        mob_searcher,
+        region,
+        exclude_rects,
+        on_targets=lambda r: print("Found targets:", r.targets),
+        debug=True,
+    )
+    worker.start()
+    try:
+        while worker.is_alive():
+            worker.join(0.5)
+    except KeyboardInterrupt:
+        worker.stop()
+        worker.join()
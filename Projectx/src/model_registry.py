@@ -0,0 +1,163 @@
+"""
+Реестр моделей процесса: детектор загружается и прогревается один раз и
+переиспользуется всеми HpAnalyzerThread (перезапуск анализа, смена области).
+
+GUI запускает preload в фоне сразу после появления окна; к нажатию «Запустить анализ HP»
+модель обычно уже готова. Если нет — поток анализа ждёт её сам, Tk-поток не блокируется.
+"""
+
+import threading
+import time
+
+from detectors import create_detector
+
+
+class SharedDetector:
+    """
+    Детектор реестра для нескольких потоков: вызовы predict идут строго по одному.
+    Остановленный HpAnalyzerThread может ещё быть внутри predict, когда новый уже получил
+    ту же модель, а сессии ultralytics и ONNX Runtime не обещают потокобезопасности.
+    Остальные атрибуты (backend, imgsz, ...) — как у самого детектора.
+    """
+
+    def __init__(self, detector):
+        self.detector = detector
+        self._lock = threading.Lock()
+
+    def predict(self, img, imgsz=None):
+        with self._lock:
+            return self.detector.predict(img, imgsz=imgsz)
+
+    def __call__(self, img, imgsz=None):
+        return self.predict(img, imgsz=imgsz)
+
+    def __getattr__(self, name):
+        return getattr(self.detector, name)
+
+
+class _Entry:
+    """Одна модель в реестре: загрузка (в фоне или синхронно) и её тайминги."""
+
+    def __init__(self, key):
+        self.key = key
+        self.ready = threading.Event()
+        self.detector = None
+        self.shared = None  # SharedDetector, который получают потребители
+        self.error = None
+        self.requested_at = time.perf_counter()
+        self.load_sec = None  # от запроса до готовности (загрузка + прогрев)
+        self.users = 0
+        self.wait_sec = 0.0  # сколько потребители суммарно ждали готовности
+
+    def load(self):
+        backend, weights, imgsz, threads = self.key
+        try:
+            self.detector = create_detector(backend, weights, imgsz, threads)
+            self.shared = SharedDetector(self.detector)
+        except Exception as e:
+            self.error = e
+            print(f"[ModelRegistry] Ошибка загрузки {backend}:{weights}: {e}")
+        finally:
+            self.load_sec = time.perf_counter() - self.requested_at
+            self.ready.set()
+
+    def stats(self):
+        det = self.detector
+        return {
+            "backend": self.key[0],
+            "weights": self.key[1],
+            "ready": self.ready.is_set(),
+            "error": None if self.error is None else str(self.error),
+            "load_time": None if det is None else round(det.load_time, 3),
+            "warmup_time": None if det is None else round(det.warmup_time, 3),
+            "ready_after": None if self.load_sec is None else round(self.load_sec, 3),
+            "users": self.users,
+            "wait_sec": round(self.wait_sec, 3),
+        }
+
+
+class ModelRegistry:
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key_for(cfg):
+        return (
+            cfg["detector_backend"],
+            cfg["detector_weights"],
+            int(cfg["detector_imgsz"]),
+            int(cfg["detector_threads"]),
+        )
+
+    def _entry(self, key, background):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                return entry, False
+            entry = self._entries[key] = _Entry(key)
+        if background:
+            threading.Thread(
+                target=entry.load, daemon=True, name=f"preload:{key[0]}"
+            ).start()
+        return entry, True
+
+    def preload(self, cfg, on_ready=None):
+        """
+        Загрузка детектора по настройкам в фоновом потоке (повторный вызов ничего не делает).
+        on_ready(stats) вызывается из фонового потока, когда модель готова или не загрузилась.
+        """
+        entry, started = self._entry(self.key_for(cfg), background=True)
+        if started:
+            print(f"[ModelRegistry] Фоновая загрузка {entry.key[0]}:{entry.key[1]}")
+        if on_ready is not None:
+
+            def notify():
+                entry.ready.wait()
+                on_ready(entry.stats())
+
+            threading.Thread(target=notify, daemon=True).start()
+        return entry
+
+    def get(self, cfg, timeout=None):
+        """
+        Общий прогретый детектор по настройкам (SharedDetector: predict из разных потоков
+        выполняются по очереди). Если загрузка идёт — ждёт её, если не начиналась —
+        загружает в вызывающем потоке.
+        """
+        entry, started = self._entry(self.key_for(cfg), background=False)
+        if started:
+            entry.load()
+        t0 = time.perf_counter()
+        if not entry.ready.wait(timeout):
+            raise TimeoutError(f"Модель {entry.key[1]} не загрузилась за {timeout}s")
+        waited = time.perf_counter() - t0
+        with self._lock:
+            entry.users += 1
+            entry.wait_sec += waited
+        if entry.error is not None:
+            # неудачную загрузку не кэшируем: следующий get попробует снова
+            with self._lock:
+                if self._entries.get(entry.key) is entry:
+                    del self._entries[entry.key]
+            raise entry.error
+        if waited > 0.01:
+            print(f"[ModelRegistry] Ожидание готовности модели: {waited:.2f}s")
+        return entry.shared
+
+    def stats(self):
+        with self._lock:
+            return [entry.stats() for entry in self._entries.values()]
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """Общий для процесса реестр моделей."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,171 @@
+"""
+OCR-движки для чата с общим интерфейсом: engine(bgra) -> текст.
+
+Бэкенды:
+    tesserocr   — Tesseract в этом же процессе (пакет tesserocr): модели языков
+                  загружаются один раз при создании движка, вызов — только распознавание
+    pytesseract — как раньше: на каждый вызов запускается процесс tesseract,
+                  который заново читает модели rus+eng
+    auto        — tesserocr, если установлен, иначе pytesseract
+
+Настройки движка: язык, режим сегментации страницы (psm) и белый список символов.
+engine.line(bgra) распознаёт одну строку текста (PSM 7) — так IncrementalChatOcr
+распознаёт строки чата по одной, когда вызов дешёвый (persistent = True).
+
+Сравнение бэкендов:
+    python benchmarks/ocr_bench.py
+"""
+
+import threading
+import time
+
+import cv2
+
+BACKENDS = ("tesserocr", "pytesseract")
+
+# режимы сегментации Tesseract, которые имеют смысл для чата
+PSM_AUTO = 3  # по умолчанию у tesseract и pytesseract
+PSM_BLOCK = 6  # один блок текста одинаковыми строками
+PSM_SINGLE_LINE = 7  # ровно одна строка
+
+
+class OcrEngine:
+    """Базовый движок: загрузка, recognize(bgra, psm) -> текст."""
+
+    backend = None
+    # True — вызов не запускает процесс и не грузит модели, строки можно распознавать по одной
+    persistent = False
+
+    def __init__(self, lang="rus+eng", psm=PSM_AUTO, whitelist=""):
+        """
+        :param lang: языки Tesseract через «+»
+        :param psm: режим сегментации страницы для __call__ (line() всегда PSM 7)
+        :param whitelist: допустимые символы (пусто — без ограничения); пробелы
+            в списке не нужны — разделитель слов Tesseract ставит всегда
+        """
+        self.lang = lang
+        self.psm = int(psm)
+        self.whitelist = "".join(str(whitelist or "").split())
+        self.calls = 0
+        self.total_time = 0.0
+        t0 = time.perf_counter()
+        self._load()
+        self.load_time = time.perf_counter() - t0
+        print(
+            f"[OcrEngine:{self.backend}] lang={lang} psm={self.psm} "
+            f"whitelist={len(self.whitelist) or 'нет'}, загрузка {self.load_time:.2f}s"
+        )
+
+    def _load(self):
+        raise NotImplementedError
+
+    def recognize(self, bgra, psm):
+        raise NotImplementedError
+
+    def _timed(self, bgra, psm):
+        t0 = time.perf_counter()
+        text = self.recognize(bgra, psm)
+        self.total_time += time.perf_counter() - t0
+        self.calls += 1
+        return text
+
+    def __call__(self, bgra):
+        return self._timed(bgra, self.psm)
+
+    def line(self, bgra):
+        """Одна строка текста (PSM 7) без переводов строк."""
+        return " ".join(self._timed(bgra, PSM_SINGLE_LINE).split())
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "calls": self.calls,
+            "mean_ms": round(self.total_time * 1000.0 / self.calls, 2) if self.calls else 0.0,
+        }
+
+    def close(self):
+        pass
+
+
+def _to_rgb(bgra):
+    if bgra.ndim == 2:
+        return cv2.cvtColor(bgra, cv2.COLOR_GRAY2RGB)
+    code = cv2.COLOR_BGRA2RGB if bgra.shape[2] == 4 else cv2.COLOR_BGR2RGB
+    return cv2.cvtColor(bgra, code)
+
+
+class TesserocrEngine(OcrEngine):
+    backend = "tesserocr"
+    persistent = True
+
+    def _load(self):
+        from tesserocr import PyTessBaseAPI
+
+        self.api = PyTessBaseAPI(lang=self.lang, psm=self.psm)
+        if self.whitelist:
+            self.api.SetVariable("tessedit_char_whitelist", self.whitelist)
+        # API Tesseract не потокобезопасно: один движок — один вызов за раз
+        self._lock = threading.Lock()
+
+    def recognize(self, bgra, psm):
+        rgb = _to_rgb(bgra)
+        h, w = rgb.shape[:2]
+        with self._lock:
+            self.api.SetPageSegMode(psm)
+            self.api.SetImageBytes(rgb.tobytes(), w, h, 3, 3 * w)
+            return self.api.GetUTF8Text()
+
+    def close(self):
+        api, self.api = getattr(self, "api", None), None
+        if api is not None:
+            with self._lock:
+                api.End()
+
+
+class PytesseractEngine(OcrEngine):
+    backend = "pytesseract"
+
+    def _load(self):
+        import pytesseract
+
+        self._pytesseract = pytesseract
+        self._whitelist_config = (
+            f" -c tessedit_char_whitelist={self.whitelist}" if self.whitelist else ""
+        )
+
+    def recognize(self, bgra, psm):
+        from PIL import Image
+
+        img = Image.fromarray(_to_rgb(bgra))
+        return self._pytesseract.image_to_string(
+            img, lang=self.lang, config=f"--psm {psm}{self._whitelist_config}"
+        )
+
+
+ENGINES = {cls.backend: cls for cls in (TesserocrEngine, PytesseractEngine)}
+
+
+def create_ocr(backend="auto", lang="rus+eng", psm=PSM_AUTO, whitelist=""):
+    """
+    OCR-движок по имени бэкенда. auto — tesserocr, а если пакет не установлен
+    или не нашёл tessdata, то pytesseract.
+    """
+    if backend == "auto":
+        try:
+            return TesserocrEngine(lang=lang, psm=psm, whitelist=whitelist)
+        except Exception as e:
+            print(f"[OcrEngine] tesserocr недоступен, OCR через pytesseract: {e}")
+            backend = "pytesseract"
+    if backend not in ENGINES:
+        raise ValueError(f"Неизвестный OCR-бэкенд {backend!r}, доступны: auto, {', '.join(BACKENDS)}")
+    return ENGINES[backend](lang=lang, psm=psm, whitelist=whitelist)
+
+
+def ocr_from_config(cfg):
+    """Движок по настройкам ocr_*."""
+    return create_ocr(
+        backend=cfg["ocr_backend"],
+        lang=cfg["ocr_lang"],
+        psm=cfg["ocr_psm"],
+        whitelist=cfg["ocr_whitelist"],
+    )
@@ -0,0 +1,231 @@
+"""
+Стадии пайплайна capture -> inference -> controller -> serial.
+
+Кадры и результаты анализа идут через ограниченные очереди «последний побеждает»
+(LatestQueue): если следующая стадия не успевает, старые сообщения выбрасываются, и она
+всегда берёт самые свежие данные, а медленный инференс не задерживает решения и отправку
+команд. Команды на Arduino идут через очередь без потерь (FifoQueue): последовательность
+клавиш, ушедшая частично, хуже, чем ушедшая с опозданием.
+Каждое сообщение несёт время захвата кадра, из которого оно получено; контроллер
+считает кулдауны и стабильность HP по этому времени, а не по time.time() в момент
+обработки.
+
+    ScreenCapture ──(последний кадр)──> HpAnalyzerThread ──LatestQueue(1)──> ControllerStage
+        ──FifoQueue──> CommandStage ──> ArduinoController
+"""
+
+import collections
+import queue
+import threading
+import time
+
+# статус анализатора -> состояние HpActionController
+STATUS_TO_STATE = {
+    "Цели нет": "no_target",
+    "Цель мертва": "dead_target",
+    "Цель жива": "alive_target",
+}
+
+
+class HpResult:
+    """Результат анализа одного кадра."""
+
+    __slots__ = ("status", "hp_percent", "window_box", "hp_box", "timestamp", "frame_id")
+
+    def __init__(self, status, hp_percent, window_box, hp_box, timestamp, frame_id):
+        self.status = status
+        self.hp_percent = hp_percent
+        self.window_box = window_box
+        self.hp_box = hp_box
+        self.timestamp = timestamp  # время захвата кадра
+        self.frame_id = frame_id
+
+
+class MobSearchResult:
+    """Цели поиска мобов на одном кадре: список MobTarget в порядке приоритета."""
+
+    __slots__ = ("targets", "timestamp", "frame_id", "selected")
+
+    def __init__(self, targets, timestamp, frame_id, selected=None):
+        self.targets = targets
+        self.timestamp = timestamp  # время захвата кадра
+        self.frame_id = frame_id
+        self.selected = selected  # одна цель, к которой стоит двигаться (или None)
+
+
+class Command:
+    """Команда для Arduino с временем захвата кадра, по которому она принята."""
+
+    __slots__ = ("name", "timestamp")
+
+    def __init__(self, name, timestamp):
+        self.name = name
+        self.timestamp = timestamp
+
+
+class LatestQueue:
+    """
+    Ограниченная очередь между стадиями: при переполнении выбрасывается самый старый
+    элемент. maxsize=1 — одно место, всегда только последнее сообщение.
+    """
+
+    def __init__(self, maxsize=1, name="queue"):
+        self.name = name
+        self._items = collections.deque(maxlen=max(1, int(maxsize)))
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def put(self, item):
+        with self._cond:
+            if len(self._items) == self._items.maxlen:
+                self.dropped += 1
+            self._items.append(item)
+            self.put_count += 1
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        """Самый старый из оставшихся элементов или None по таймауту/закрытию."""
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            return self._items.popleft()
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {"put": self.put_count, "dropped": self.dropped}
+
+
+class FifoQueue:
+    """
+    Очередь без потерь с интерфейсом LatestQueue: ни один элемент не выбрасывается,
+    get() отдаёт их в порядке put().
+    """
+
+    def __init__(self, name="queue"):
+        self.name = name
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.put_count = 0
+
+    def put(self, item):
+        with self._lock:
+            self.put_count += 1
+        self._queue.put(item)
+
+    def get(self, timeout=None):
+        """Самый старый элемент или None по таймауту/закрытию."""
+        if self._closed and self._queue.empty():
+            return None
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self._closed = True
+        self._queue.put(None)  # будит ожидающий get()
+
+    def stats(self):
+        with self._lock:
+            return {"put": self.put_count, "pending": self._queue.qsize()}
+
+
+class StageThread(threading.Thread):
+    """Поток стадии: берёт сообщения из inbox и обрабатывает handle()."""
+
+    def __init__(self, inbox, name, live=True):
+        """
+        :param live: метки времени — живой захват; на записи задержка от захвата не считается
+        """
+        super().__init__(daemon=True, name=name)
+        self.inbox = inbox
+        self.live = live
+        self.running = True
+        self.processed = 0
+        self.errors = 0
+        # задержка от захвата кадра до обработки (для живого захвата)
+        self.max_latency = 0.0
+        self._latency_sum = 0.0
+
+    def handle(self, item):
+        raise NotImplementedError
+
+    def run(self):
+        try:
+            while self.running:
+                item = self.inbox.get(timeout=0.2)
+                if item is None:
+                    continue
+                try:
+                    self.handle(item)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"[{self.name}] Ошибка обработки: {e}")
+                    continue
+                self.processed += 1
+                if not self.live:
+                    continue
+                latency = time.time() - item.timestamp
+                self._latency_sum += latency
+                self.max_latency = max(self.max_latency, latency)
+        finally:
+            print(f"[{self.name}] stats: {self.stats()}")
+
+    def stop(self):
+        self.running = False
+        self.inbox.close()
+
+    def stats(self):
+        mean = self._latency_sum / self.processed if self.processed else 0.0
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "inbox": self.inbox.stats(),
+            "mean_latency_ms": round(mean * 1000, 1),
+            "max_latency_ms": round(self.max_latency * 1000, 1),
+        }
+
+
+class ControllerStage(StageThread):
+    """Решения HpActionController по самому свежему результату анализа."""
+
+    def __init__(self, controller, inbox=None, live=True):
+        super().__init__(
+            inbox or LatestQueue(1, "hp_results"), name="ControllerStage", live=live
+        )
+        self.controller = controller
+
+    def handle(self, result):
+        self.controller.update(
+            STATUS_TO_STATE.get(result.status, "no_target"),
+            result.hp_percent,
+            timestamp=result.timestamp,
+        )
+
+
+class CommandStage(StageThread):
+    """
+    Отправка команд на Arduino в отдельном потоке: медленный serial не держит контроллер.
+    Команды не выбрасываются и уходят по порядку: клавиши последовательности
+    (цель мертва + sweep и т. п.) нельзя отправить частично.
+    """
+
+    def __init__(self, send):
+        super().__init__(FifoQueue("commands"), name="CommandStage")
+        self.send = send
+
+    def submit(self, name, timestamp=None):
+        self.inbox.put(Command(name, time.time() if timestamp is None else timestamp))
+
+    def handle(self, command):
+        self.send(command.name)
@@ -0,0 +1,128 @@
+import numpy as np
+
+from screen_capture import to_gray
+
+
+class HpRoiLock:
+    """
+    Захват окна цели и HP bar для режима «acquisition / tracking».
+
+    После уверенной детекции YOLO боксы фиксируются, а на следующих тиках достаточно
+    дешёвой проверки: рамка окна цели (несколько пикселей по краям) совпадает с
+    запомненной, а заливка HP bar выглядит как полоса (сплошная слева). YOLO снова
+    нужен, только если проверка не прошла или истёк refresh_sec.
+    """
+
+    def __init__(
+        self,
+        refresh_sec=5.0,
+        min_score=0.5,
+        border_px=2,
+        border_tolerance=20.0,
+        max_gap_ratio=0.2,
+    ):
+        """
+        :param refresh_sec: принудительная повторная детекция не реже, чем раз в refresh_sec
+        :param min_score: минимальная уверенность YOLO для обоих боксов, чтобы зафиксировать их
+        :param border_px: толщина полос рамки окна для сигнатуры
+        :param border_tolerance: допустимая средняя разница яркости рамки (0..255)
+        :param max_gap_ratio: допустимая доля «дыр» в заливке HP bar левее её края
+        """
+        self.refresh_sec = float(refresh_sec)
+        self.min_score = float(min_score)
+        self.border_px = int(border_px)
+        self.border_tolerance = float(border_tolerance)
+        self.max_gap_ratio = float(max_gap_ratio)
+
+        self.window_box = None
+        self.hp_box = None
+        self._signature = None
+        self._locked_at = 0.0
+
+        self.acquisitions = 0
+        self.tracked = 0
+        self.failures = 0
+
+    @property
+    def locked(self):
+        return self.window_box is not None
+
+    def _border_signature(self, img, box):
+        h, w = img.shape[:2]
+        x1, y1, x2, y2 = map(int, box)
+        x1, y1 = max(0, x1), max(0, y1)
+        x2, y2 = min(w, x2), min(h, y2)
+        b = self.border_px
+        if x2 - x1 <= 2 * b or y2 - y1 <= 2 * b:
+            return None
+        roi = to_gray(img[y1:y2, x1:x2])
+        return np.concatenate(
+            [
+                roi[:b, :].ravel(),
+                roi[-b:, :].ravel(),
+                roi[b:-b, :b].ravel(),
+                roi[b:-b, -b:].ravel(),
+            ]
+        ).astype(np.int16)
+
+    def try_lock(self, img, window_box, hp_box, window_score, hp_score, now):
+        """Фиксирует боксы после детекции, если она достаточно уверенная."""
+        if (
+            window_box is None
+            or hp_box is None
+            or min(window_score, hp_score) < self.min_score
+        ):
+            self.unlock()
+            return False
+        signature = self._border_signature(img, window_box)
+        if signature is None:
+            self.unlock()
+            return False
+        self.window_box = window_box
+        self.hp_box = hp_box
+        self._signature = signature
+        self._locked_at = now
+        self.acquisitions += 1
+        return True
+
+    def unlock(self):
+        self.window_box = None
+        self.hp_box = None
+        self._signature = None
+
+    def is_valid(self, img, now):
+        """Дешёвая проверка, что окно цели на месте и рефреш ещё не нужен."""
+        if not self.locked:
+            return False
+        if now - self._locked_at >= self.refresh_sec:
+            return False
+        signature = self._border_signature(img, self.window_box)
+        if signature is None or signature.shape != self._signature.shape:
+            self.failures += 1
+            return False
+        diff = np.abs(signature - self._signature).mean()
+        if diff > self.border_tolerance:
+            self.failures += 1
+            return False
+        return True
+
+    def bar_shape_ok(self, filled_columns):
+        """Заливка HP bar должна быть сплошной полосой от левого края."""
+        if filled_columns is None or filled_columns.size == 0:
+            return False
+        filled_idx = np.flatnonzero(filled_columns)
+        if filled_idx.size == 0:
+            return True  # пустая полоса (цель мертва) — форма корректна
+        head = filled_columns[: filled_idx[-1] + 1]
+        gaps = head.size - np.count_nonzero(head)
+        if gaps > self.max_gap_ratio * filled_columns.size:
+            self.failures += 1
+            return False
+        return True
+
+    def stats(self):
+        return {
+            "acquisitions": self.acquisitions,
+            "tracked": self.tracked,
+            "failures": self.failures,
+        }
@@ -0,0 +1,70 @@
+import time
+
+
+class AdaptiveScheduler:
+    """
+    Планировщик тиков по дедлайнам для потоков анализа.
+
+    Вместо `work(); time.sleep(interval)` (реальный период = работа + interval и плывёт
+    с нагрузкой) поток вызывает wait() — сон до следующего дедлайна с учётом времени
+    работы. Период адаптивный: mark_active() сразу возвращает min_interval (бой),
+    mark_idle() плавно увеличивает его до max_interval (нет цели, HP не меняется).
+    """
+
+    def __init__(self, min_interval, max_interval=None, backoff=1.5, name="stage"):
+        """
+        :param min_interval: период тика при активности (сек)
+        :param max_interval: максимальный период в простое (сек); None — фиксированный период
+        :param backoff: множитель увеличения периода на каждый тик простоя
+        :param name: имя для логов
+        """
+        self.name = name
+        self.min_interval = float(min_interval)
+        self.max_interval = max(
+            self.min_interval, float(max_interval) if max_interval else self.min_interval
+        )
+        self.backoff = max(1.0, float(backoff))
+
+        self.interval = self.min_interval
+        self._deadline = None
+        self.ticks = 0
+        self.overruns = 0
+
+    def mark_active(self):
+        if self.interval != self.min_interval:
+            print(f"[Scheduler:{self.name}] активность -> {self.min_interval:.2f}s")
+        self.interval = self.min_interval
+
+    def mark_idle(self):
+        self.interval = min(self.max_interval, self.interval * self.backoff)
+
+    def update(self, active):
+        if active:
+            self.mark_active()
+        else:
+            self.mark_idle()
+
+    def reset(self):
+        self.interval = self.min_interval
+        self._deadline = None
+
+    def wait(self):
+        """Спит до следующего дедлайна. При перегрузке не копит долг, а начинает отсчёт заново."""
+        now = time.monotonic()
+        if self._deadline is None:
+            self._deadline = now
+        self._deadline += self.interval
+        self.ticks += 1
+        delay = self._deadline - now
+        if delay <= 0:
+            self.overruns += 1
+            self._deadline = now
+            return
+        time.sleep(delay)
+
+    def stats(self):
+        return {
+            "interval": self.interval,
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+        }
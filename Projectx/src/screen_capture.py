@@ -1,15 +1,295 @@
+import threading
+import time
+
 import mss
 import numpy as np
 import cv2
 
+
+def as_bgr(img):
+    """BGR-представление без копирования: для BGRA — strided view на первые 3 канала."""
+    if img.ndim == 3 and img.shape[2] == 4:
+        return img[:, :, :3]
+    return img
+
+
+def to_bgr(img):
+    """Непрерывный BGR (копия только если вход BGRA)."""
+    if img.ndim == 3 and img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
+    return img
+
+
+def to_gray(img):
+    """Серое изображение из BGRA/BGR/серого (одна конвертация, без промежуточного BGR)."""
+    if img.ndim == 2:
+        return img
+    if img.shape[2] == 4:
+        return cv2.cvtColor(img, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+class CaptureSourceExhausted(Exception):
+    """Источник кадров закончился (например, конец записи при воспроизведении)."""
+
+
+class BgraFrame:
+    """
+    Кадр mss без копирования: np.frombuffer поверх сырого буфера ScreenShot.raw.
+    array — (height, width, 4) BGRA, живёт пока жив raw.
+    """
+
+    __slots__ = ("raw", "array", "left", "top")
+
+    def __init__(self, raw, width, height, left=0, top=0):
+        self.raw = raw
+        self.array = np.frombuffer(raw, dtype=np.uint8).reshape(height, width, 4)
+        self.left = left
+        self.top = top
+
+    @classmethod
+    def from_shot(cls, shot):
+        return cls(shot.raw, shot.width, shot.height, shot.left, shot.top)
+
+    @property
+    def width(self):
+        return self.array.shape[1]
+
+    @property
+    def height(self):
+        return self.array.shape[0]
+
+    def view(self, x, y, w, h):
+        """View на под-область в координатах кадра (без копирования)."""
+        return self.array[y : y + h, x : x + w]
+
+
+class CaptureFrame:
+    """
+    Кадр одного зарегистрированного региона.
+
+    image — BGRA numpy-view на общий кадр тика (НЕ копия, менять на месте нельзя),
+    region — фактически захваченная область (x, y, w, h) в координатах экрана.
+    frame_id и timestamp общие для всех регионов одного тика.
+    """
+
+    __slots__ = ("name", "image", "region", "frame_id", "timestamp")
+
+    def __init__(self, name, image, region, frame_id, timestamp):
+        self.name = name
+        self.image = image
+        self.region = region
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+
+    def bgr(self):
+        """Strided BGR view (без копирования) — для функций, принимающих 3 канала."""
+        return as_bgr(self.image)
+
+
 class ScreenCapture:
-    def __init__(self, region):
+    """
+    Общий сервис захвата экрана.
+
+    Потребители (HP анализ, чат, поиск мобов) регистрируют свои области через register().
+    Отдельный поток раз в тик делает ОДИН grab объединяющего прямоугольника всех областей
+    и раздаёт каждому потребителю BGRA view на его под-область — без копий и cvtColor.
+    """
+
+    def __init__(self, region=None, interval=0.2, source_factory=None, speed=1.0):
+        """
+        :param region: (x, y, w, h) — для совместимости: область для capture()
+        :param interval: период тика по умолчанию (сек), если регионы не задали свой
+        :param source_factory: фабрика mss-совместимого источника (grab/monitors/контекст).
+            По умолчанию mss.mss; для офлайн-прогона — frame_recorder.ReplaySource
+        :param speed: во сколько раз быстрее реального времени идут потребители (для replay)
+        """
         self.region = region
-        self.sct = mss.mss()
+        self.interval = interval
+        self.source_factory = source_factory or mss.mss
+        self.speed = float(speed)
+        self.sct = None  # mss для capture(), создаётся лениво
+        self._recorder = None
 
+        self._regions = {}  # name -> ((x, y, w, h), interval)
+        self._frames = {}  # name -> CaptureFrame
+        self._frame_id = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+    # --- Совместимость: разовый захват одной области ---
     def capture(self):
+        if self.sct is None:
+            self.sct = self.source_factory()
         x, y, w, h = self.region
         monitor = {"top": y, "left": x, "width": w, "height": h}
-        img = np.array(self.sct.grab(monitor))
-        img = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-        return img
+        frame = BgraFrame.from_shot(self.sct.grab(monitor))
+        return cv2.cvtColor(frame.array, cv2.COLOR_BGRA2BGR)
+
+    # --- Регистрация потребителей ---
+    def register(self, name, region, interval=None):
+        """Регистрирует (или обновляет) область name. Запускает поток захвата при необходимости."""
+        x, y, w, h = map(int, region)
+        with self._cond:
+            self._regions[name] = ((x, y, w, h), interval)
+            self._frames.pop(name, None)
+            self._cond.notify_all()
+        self._ensure_running()
+        print(f"[ScreenCapture] register '{name}': {(x, y, w, h)}")
+
+    def unregister(self, name):
+        with self._cond:
+            self._regions.pop(name, None)
+            self._frames.pop(name, None)
+            self._cond.notify_all()
+        print(f"[ScreenCapture] unregister '{name}'")
+
+    def set_interval(self, name, interval):
+        """Меняет желаемый период тика области name (без сброса последнего кадра)."""
+        with self._cond:
+            entry = self._regions.get(name)
+            if entry is not None and entry[1] != interval:
+                self._regions[name] = (entry[0], interval)
+                self._cond.notify_all()
+
+    def set_recorder(self, recorder):
+        """Писать каждый grab (объединённую область) в recorder (FrameRecorder) или None — выключить."""
+        with self._cond:
+            self._recorder = recorder
+
+    def is_running(self):
+        with self._cond:
+            return self._running
+
+    def is_registered(self, name):
+        with self._cond:
+            return name in self._regions
+
+    def get_frame(self, name, after_id=None, timeout=1.0):
+        """
+        Возвращает последний кадр области name.
+        Если задан after_id — ждёт кадр новее него (не дольше timeout).
+        None — если кадра нет (область не зарегистрирована, таймаут, сервис остановлен).
+        """
+        deadline = time.time() + timeout if timeout is not None else None
+        with self._cond:
+            while True:
+                if name not in self._regions:
+                    return None
+                frame = self._frames.get(name)
+                if frame is not None and (after_id is None or frame.frame_id > after_id):
+                    return frame
+                if not self._running:
+                    return None
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        return None
+                    self._cond.wait(remaining)
+
+    # --- Поток захвата ---
+    def _ensure_running(self):
+        with self._cond:
+            if self._running and self._thread is not None and self._thread.is_alive():
+                return
+            self._running = True
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2.0)
+        self._thread = None
+
+    def _tick_interval(self):
+        intervals = [i for _, i in self._regions.values() if i]
+        return min(intervals) if intervals else self.interval
+
+    @staticmethod
+    def _union(regions, monitor):
+        """Объединяющий прямоугольник всех областей, обрезанный по виртуальному экрану."""
+        left = max(min(r[0] for r in regions), monitor["left"])
+        top = max(min(r[1] for r in regions), monitor["top"])
+        right = min(max(r[0] + r[2] for r in regions), monitor["left"] + monitor["width"])
+        bottom = min(max(r[1] + r[3] for r in regions), monitor["top"] + monitor["height"])
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right - left, bottom - top
+
+    def _run(self):
+        # mss-объект (или replay-источник) создаётся и используется только в потоке захвата
+        with self.source_factory() as sct:
+            while True:
+                with self._cond:
+                    while self._running and not self._regions:
+                        self._cond.wait()
+                    if not self._running:
+                        break
+                    regions = dict(self._regions)
+                    interval = self._tick_interval()
+
+                t0 = time.time()
+                try:
+                    self._grab_tick(sct, regions, t0)
+                except CaptureSourceExhausted:
+                    print("[ScreenCapture] Источник кадров закончился — остановка")
+                    break
+                except Exception as e:
+                    print(f"[ScreenCapture] Ошибка захвата: {e}")
+
+                elapsed = time.time() - t0
+                with self._cond:
+                    if self._running:
+                        self._cond.wait(max(0.0, interval - elapsed))
+
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+
+    def _grab_tick(self, sct, regions, timestamp):
+        union = self._union([r for r, _ in regions.values()], sct.monitors[0])
+        if union is None:
+            return
+        ux, uy, uw, uh = union
+        shot = sct.grab({"top": uy, "left": ux, "width": uw, "height": uh})
+        frame = BgraFrame.from_shot(shot)
+        # у replay-источника время кадра — записанное, у mss — момент grab
+        timestamp = getattr(shot, "timestamp", timestamp)
+        recorder = self._recorder
+        if recorder is not None:
+            recorder.write(frame.array, timestamp, frame.left, frame.top)
+
+        with self._cond:
+            self._frame_id += 1
+            for name, entry in regions.items():
+                if self._regions.get(name) != entry:
+                    # область перерегистрировали во время grab — ждём следующий тик
+                    continue
+                x, y, w, h = entry[0]
+                x1, y1 = max(x, ux), max(y, uy)
+                x2, y2 = min(x + w, ux + uw), min(y + h, uy + uh)
+                x2, y2 = max(x1, x2), max(y1, y2)
+                view = frame.view(x1 - ux, y1 - uy, x2 - x1, y2 - y1)
+                self._frames[name] = CaptureFrame(
+                    name, view, (x1, y1, x2 - x1, y2 - y1), self._frame_id, timestamp
+                )
+            self._cond.notify_all()
+
+
+_shared_capture = None
+_shared_lock = threading.Lock()
+
+
+def get_capture_service():
+    """Возвращает общий для процесса экземпляр ScreenCapture."""
+    global _shared_capture
+    with _shared_lock:
+        if _shared_capture is None:
+            _shared_capture = ScreenCapture()
+        return _shared_capture
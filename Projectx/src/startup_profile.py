@@ -0,0 +1,119 @@
+"""
+Профиль запуска GUI: время импорта модулей и время до появления первого окна.
+
+Запускает `main.py --startup-check` в отдельном процессе с `python -X importtime`:
+дочерний процесс строит Interface, ждёт, пока окно будет показано (<Map>), печатает
+время до первого окна и список уже загруженных тяжёлых модулей и закрывается.
+Скрипт не зависит от CI — нужен только дисплей (на Linux без X подойдёт xvfb-run).
+
+    python src/startup_profile.py                 # отчёт + проверка бюджета 2.0 с
+    python src/startup_profile.py --budget 1.0 --top 20
+
+Код возврата 1, если окно появилось позже бюджета или при старте уже загружен
+какой-то из тяжёлых модулей (их импорт должен происходить при первом использовании).
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+# модули, которых не должно быть в процессе до первого использования соответствующей функции
+HEAVY_MODULES = (
+    "cv2",
+    "numpy",
+    "PIL",
+    "mss",
+    "torch",
+    "ultralytics",
+    "onnxruntime",
+    "openvino",
+    "pytesseract",
+    "pyautogui",
+    "hp_analyzer",
+    "chat_handler",
+    "mob_searcher",
+)
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def report_startup(first_window_sec):
+    """Вызывается из main.py --startup-check, когда окно показано: печать для родителя."""
+    loaded = [name for name in HEAVY_MODULES if name in sys.modules]
+    print(f"STARTUP first_window_ms={first_window_sec * 1000:.1f}")
+    print(f"STARTUP heavy_loaded={','.join(loaded)}")
+    sys.stdout.flush()
+
+
+def parse_importtime(stderr):
+    """Строки `-X importtime` -> список (модуль, self_us, cumulative_us, глубина)."""
+    rows = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_RE.match(line)
+        if m:
+            depth = len(m.group(3)) // 2
+            rows.append((m.group(4), int(m.group(1)), int(m.group(2)), depth))
+    return rows
+
+
+def profile(budget_sec=2.0, top=15, timeout=60.0):
+    t0 = time.perf_counter()
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", MAIN_PATH, "--startup-check"],
+        capture_output=True,
+        text=True,
+        encoding="utf-8",
+        errors="replace",
+        timeout=timeout,
+        cwd=os.path.dirname(MAIN_PATH),
+    )
+    wall = time.perf_counter() - t0
+
+    first_window_ms = None
+    heavy_loaded = []
+    for line in proc.stdout.splitlines():
+        if line.startswith("STARTUP first_window_ms="):
+            first_window_ms = float(line.split("=", 1)[1])
+        elif line.startswith("STARTUP heavy_loaded="):
+            heavy_loaded = [m for m in line.split("=", 1)[1].split(",") if m]
+
+    rows = parse_importtime(proc.stderr)
+    # верхний уровень (глубина 1 — импорты из main/gui) по суммарному времени
+    top_level = sorted(
+        (r for r in rows if r[3] <= 1), key=lambda r: r[2], reverse=True
+    )[:top]
+    total_import_ms = sum(r[1] for r in rows) / 1000.0
+
+    print(f"{'модуль':<40} {'self, ms':>10} {'всего, ms':>10}")
+    for name, self_us, cum_us, _ in top_level:
+        print(f"{name:<40} {self_us / 1000:10.1f} {cum_us / 1000:10.1f}")
+    print(f"импорт всех модулей: {total_import_ms:.1f}ms ({len(rows)} модулей)")
+    print(f"процесс целиком (запуск + окно + выход): {wall * 1000:.0f}ms")
+
+    ok = True
+    if first_window_ms is None:
+        errors = [l for l in proc.stderr.splitlines() if not l.startswith("import time:")]
+        print(f"окно не появилось (код {proc.returncode}):")
+        print("\n".join((proc.stdout.splitlines() + errors)[-20:]))
+        ok = False
+    else:
+        verdict = "OK" if first_window_ms <= budget_sec * 1000 else "ПРЕВЫШЕН"
+        print(f"до первого окна: {first_window_ms:.1f}ms (бюджет {budget_sec * 1000:.0f}ms) {verdict}")
+        ok = ok and verdict == "OK"
+    if heavy_loaded:
+        print(f"при старте загружены тяжёлые модули: {', '.join(heavy_loaded)}")
+        ok = False
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Профиль запуска GUI и проверка бюджета")
+    parser.add_argument("--budget", type=float, default=2.0, help="секунд до первого окна")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    sys.exit(0 if profile(args.budget, args.top) else 1)
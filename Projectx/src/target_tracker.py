@@ -0,0 +1,192 @@
+"""
+Сопровождение кандидатов поиска мобов между кадрами.
+
+Таблички имён с соседних кадров сопоставляются по IoU (а если табличка сместилась
+сильнее своего размера — по расстоянию между центрами), и каждая цель получает
+постоянный track_id. Проверка шаблоном нужна только новым трекам и раз в reverify_sec —
+подтверждённая цель остаётся подтверждённой, пока её табличку видно.
+Из подтверждённых выбирается одна цель — ближайшая к точке прицела (центр области /
+перекрестие), с гистерезисом, чтобы выбор не прыгал между почти равными целями.
+"""
+
+import numpy as np
+
+
+class Track:
+    """Одна сопровождаемая табличка имени (координаты кадра)."""
+
+    __slots__ = (
+        "track_id",
+        "rect",
+        "verified",
+        "circle",
+        "checked_at",
+        "first_seen",
+        "last_seen",
+        "hits",
+        "missed",
+    )
+
+    def __init__(self, track_id, rect, now):
+        self.track_id = track_id
+        self.rect = rect  # (x, y, w, h)
+        self.verified = False
+        self.circle = None
+        self.checked_at = None
+        self.first_seen = now
+        self.last_seen = now
+        self.hits = 1
+        self.missed = 0
+
+    @property
+    def center(self):
+        x, y, w, h = self.rect
+        return x + w / 2.0, y + h / 2.0
+
+    def __repr__(self):
+        state = "verified" if self.verified else "candidate"
+        return f"Track(#{self.track_id} {self.rect} {state})"
+
+
+def _centers(rects):
+    return rects[:, :2] + rects[:, 2:] / 2.0
+
+
+def iou_matrix(a, b):
+    """IoU всех пар прямоугольников (x, y, w, h): a — (N, 4), b — (M, 4) -> (N, M)."""
+    ax1, ay1 = a[:, 0:1], a[:, 1:2]
+    ax2, ay2 = ax1 + a[:, 2:3], ay1 + a[:, 3:4]
+    bx1, by1 = b[:, 0], b[:, 1]
+    bx2, by2 = bx1 + b[:, 2], by1 + b[:, 3]
+    iw = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    ih = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = iw * ih
+    union = a[:, 2:3] * a[:, 3:4] + b[:, 2] * b[:, 3] - inter
+    return np.where(union > 0, inter / np.maximum(union, 1e-9), 0.0)
+
+
+class TargetTracker:
+    def __init__(
+        self,
+        iou_threshold=0.3,
+        max_distance=40.0,
+        max_missed=3,
+        reverify_sec=2.0,
+        switch_margin=0.2,
+    ):
+        """
+        :param iou_threshold: минимальный IoU, чтобы табличка считалась той же целью
+        :param max_distance: при малом IoU — максимальный сдвиг центра (px) за кадр
+        :param max_missed: сколько кадров подряд цель может не находиться до удаления трека
+        :param reverify_sec: как часто перепроверять подтверждённую цель шаблоном
+        :param switch_margin: новая цель выбирается, только если она ближе текущей
+            больше чем на эту долю расстояния
+        """
+        self.iou_threshold = float(iou_threshold)
+        self.max_distance = float(max_distance)
+        self.max_missed = int(max_missed)
+        self.reverify_sec = float(reverify_sec)
+        self.switch_margin = float(switch_margin)
+        self.tracks = []
+        self.selected_id = None
+        self._next_id = 1
+        self.created = 0
+        self.checks = 0
+        self.checks_skipped = 0
+
+    def reset(self):
+        self.tracks = []
+        self.selected_id = None
+
+    def update(self, rects, now):
+        """
+        Сопоставляет прямоугольники кадра с треками.
+        :return: треки, видимые на этом кадре, в порядке rects
+        """
+        rects = [tuple(int(v) for v in r) for r in rects]
+        seen = [None] * len(rects)
+        matched_tracks = set()
+        if rects and self.tracks:
+            a = np.array([t.rect for t in self.tracks], dtype=np.float64)
+            b = np.array(rects, dtype=np.float64)
+            iou = iou_matrix(a, b)
+            dist = np.linalg.norm(_centers(a)[:, None, :] - _centers(b)[None, :, :], axis=2)
+            ok = (iou >= self.iou_threshold) | (dist <= self.max_distance)
+            ti, ri = np.nonzero(ok)
+            # жадно: сначала пары с большим IoU, при равном — ближайшие
+            order = np.lexsort((dist[ti, ri], -iou[ti, ri]))
+            for k in order.tolist():
+                t, r = int(ti[k]), int(ri[k])
+                if t in matched_tracks or seen[r] is not None:
+                    continue
+                track = self.tracks[t]
+                track.rect = rects[r]
+                track.last_seen = now
+                track.hits += 1
+                track.missed = 0
+                matched_tracks.add(t)
+                seen[r] = track
+
+        survivors = []
+        for t, track in enumerate(self.tracks):
+            if t not in matched_tracks:
+                track.missed += 1
+                if track.missed > self.max_missed:
+                    continue
+            survivors.append(track)
+        for r, rect in enumerate(rects):
+            if seen[r] is None:
+                track = Track(self._next_id, rect, now)
+                self._next_id += 1
+                self.created += 1
+                survivors.append(track)
+                seen[r] = track
+        self.tracks = survivors
+        if self.selected_id is not None and not any(
+            t.track_id == self.selected_id for t in self.tracks
+        ):
+            self.selected_id = None
+        return seen
+
+    def needs_check(self, track, now):
+        """Нужна ли проверка шаблоном: новый трек или подтверждение устарело."""
+        if track.checked_at is None or now - track.checked_at >= self.reverify_sec:
+            return True
+        self.checks_skipped += 1
+        return False
+
+    def set_checked(self, track, found, circle, now):
+        self.checks += 1
+        track.verified = bool(found)
+        track.circle = circle if found else None
+        track.checked_at = now
+
+    def select(self, aim):
+        """
+        Одна цель из подтверждённых треков, видимых на последнем кадре, — ближайшая к aim
+        (x, y в координатах кадра). Текущий выбор сохраняется, пока новая цель
+        не ближе на switch_margin.
+        """
+        candidates = [t for t in self.tracks if t.verified and t.missed == 0]
+        if not candidates:
+            self.selected_id = None
+            return None
+
+        def distance(track):
+            cx, cy = track.center
+            return ((cx - aim[0]) ** 2 + (cy - aim[1]) ** 2) ** 0.5
+
+        best = min(candidates, key=distance)
+        current = next((t for t in candidates if t.track_id == self.selected_id), None)
+        if current is not None and distance(best) >= distance(current) * (1.0 - self.switch_margin):
+            best = current
+        self.selected_id = best.track_id
+        return best
+
+    def stats(self):
+        return {
+            "tracks": len(self.tracks),
+            "created": self.created,
+            "checks": self.checks,
+            "checks_skipped": self.checks_skipped,
+        }
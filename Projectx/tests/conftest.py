@@ -0,0 +1,11 @@
+"""
+Тесты чистой логики модулей src (без захвата экрана, GUI и Arduino).
+Запуск из папки Projectx: `python -m pytest tests`.
+"""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
@@ -0,0 +1,50 @@
+import math
+
+import numpy as np
+import pytest
+
+from arduino_controller import ArduinoController
+
+plan = ArduinoController.plan_mouse_path
+
+
+@pytest.mark.parametrize(
+    "dx, dy",
+    [(0, 1), (127, 0), (128, 0), (-128, 0), (254, -1), (1000, 3), (-517, 389), (5, -2000)],
+)
+def test_steps_within_limit_and_sum_exactly(dx, dy):
+    steps = plan(dx, dy)
+    assert all(abs(sx) <= 127 and abs(sy) <= 127 for sx, sy in steps)
+    assert sum(s[0] for s in steps) == dx
+    assert sum(s[1] for s in steps) == dy
+    # минимальное число шагов, шаги по оси отличаются не больше чем на 1 px
+    assert len(steps) == math.ceil(max(abs(dx), abs(dy)) / 127)
+    for axis in (0, 1):
+        sizes = [s[axis] for s in steps]
+        assert max(sizes) - min(sizes) <= 1
+
+
+def test_random_moves_sum_exactly():
+    rng = np.random.default_rng(0)
+    for dx, dy in rng.integers(-3000, 3000, size=(500, 2)).tolist():
+        steps = plan(dx, dy)
+        assert (sum(s[0] for s in steps), sum(s[1] for s in steps)) == (dx, dy)
+        assert all(abs(sx) <= 127 and abs(sy) <= 127 for sx, sy in steps)
+
+
+def test_zero_move_has_no_steps():
+    assert plan(0, 0) == []
+    assert plan(0.4, -0.4) == []
+
+
+def test_custom_max_step():
+    assert plan(10, -7, max_step=4) == [(3, -3), (3, -2), (4, -2)]
+
+
+def test_path_sent_as_one_write():
+    sent = []
+    controller = ArduinoController.__new__(ArduinoController)
+    controller.send_command = sent.append
+    steps = controller.move_mouse_by(300, -10)
+    assert len(sent) == 1
+    assert sent[0] == "".join(f"MOUSE_MOVE {sx} {sy}\n" for sx, sy in steps)
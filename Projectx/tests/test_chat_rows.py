@@ -0,0 +1,44 @@
+from chat_rows import find_new_rows
+
+
+def eq(a, b):
+    return a == b
+
+
+def new_rows(prev, current):
+    return len(current) - find_new_rows(prev, current, same=eq)
+
+
+def test_first_frame_all_new():
+    assert new_rows([], ["A", "B"]) == 2
+
+
+def test_unchanged_frame_has_no_new_rows():
+    assert new_rows(["A", "B", "C"], ["A", "B", "C"]) == 0
+
+
+def test_appended_rows_without_scroll():
+    assert new_rows(["A", "B"], ["A", "B", "C", "D"]) == 2
+
+
+def test_scroll_by_one_row():
+    assert new_rows(["A", "B", "C"], ["B", "C", "D"]) == 1
+
+
+def test_last_row_not_found_uses_previous():
+    # последняя строка прошлого кадра не нашлась — ищется предыдущая
+    assert new_rows(["A", "B", "C"], ["B", "X", "Y"]) == 2
+
+
+def test_no_match_all_new():
+    assert new_rows(["A", "B", "C"], ["X", "Y", "Z"]) == 3
+
+
+def test_repeated_line_in_unfilled_chat_is_new():
+    assert new_rows(["S"], ["S", "S"]) == 1
+    assert new_rows(["S", "S"], ["S", "S", "S"]) == 1
+
+
+def test_repeats_resolved_by_longest_chain():
+    # «B» есть дважды; совпадает цепочка A, B над второй — новая только C
+    assert new_rows(["A", "B"], ["B", "A", "B", "C"]) == 1
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from hp_filter import HpFilter
+
+DT = 0.1
+
+
+def feed(f, profile, duration, start=0.0, noise=0.0, seed=0):
+    rng = np.random.default_rng(seed)
+    estimates = []
+    for i in range(int(round(duration / DT))):
+        t = start + i * DT
+        estimates.append(f.update("alive_target", profile(t) + rng.normal(0.0, noise), t))
+    return estimates
+
+
+def test_linear_damage_rate_and_time_to_death():
+    f = HpFilter()
+    last = feed(f, lambda t: 90.0 - 2.0 * t, 10.0)[-1]
+    assert last.stall_since is None
+    assert last.dps == pytest.approx(2.0, abs=0.1)
+    # HP 90 - 2 * 9.9 = 70.2 при 2 %/с — до смерти ~35 с
+    assert last.time_to_death == pytest.approx(last.hp / 2.0, rel=0.05)
+
+
+def test_slow_damage_never_stalls_once_proven():
+    f = HpFilter()
+    estimates = feed(f, lambda t: 90.0 - 0.5 * t, 30.0, noise=0.5)
+    proven = next(i for i, e in enumerate(estimates) if e.stall_since is None)
+    assert max(e.stalled_for for e in estimates[proven:]) < 2.0
+
+
+def test_flat_target_stalls_without_time_to_death():
+    f = HpFilter()
+    estimates = feed(f, lambda t: 80.0, 10.0, noise=0.5)
+    assert estimates[-1].stalled_for >= 2.0
+    assert estimates[-1].time_to_death is None
+
+
+def test_stall_after_damage_stops():
+    f = HpFilter()
+    feed(f, lambda t: 90.0 - 2.0 * t, 5.0)
+    assert f.last_estimate.stall_since is None
+    estimates = feed(f, lambda t: 80.0, 10.0, start=5.0)
+    assert estimates[-1].stall_since is not None
+    assert estimates[-1].stalled_for >= 2.0
+
+
+def test_dead_target_resets_and_new_target_is_fresh():
+    f = HpFilter()
+    feed(f, lambda t: 40.0 - 2.0 * t, 5.0)
+    assert f.update("dead_target", 0.0, 5.0) is None
+    assert f.last_estimate is None
+    assert f.update("alive_target", 100.0, 5.1).fresh
+    # рост HP больше new_target_jump — тоже новая цель
+    f.update("alive_target", 20.0, 5.2)
+    assert f.update("alive_target", 100.0, 5.3).fresh
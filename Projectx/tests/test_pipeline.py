@@ -0,0 +1,67 @@
+import threading
+
+from pipeline import FifoQueue, LatestQueue
+
+
+def drain(q):
+    items = []
+    while True:
+        item = q.get(timeout=0)
+        if item is None:
+            return items
+        items.append(item)
+
+
+def test_latest_queue_keeps_newest_in_order():
+    q = LatestQueue(3)
+    for i in range(5):
+        q.put(i)
+    assert drain(q) == [2, 3, 4]
+    assert q.stats() == {"put": 5, "dropped": 2}
+
+
+def test_latest_queue_single_slot_holds_last():
+    q = LatestQueue(1)
+    q.put("old")
+    q.put("new")
+    assert q.get(timeout=0) == "new"
+    assert q.get(timeout=0) is None
+
+
+def test_latest_queue_get_times_out_and_wakes_on_close():
+    q = LatestQueue(1)
+    assert q.get(timeout=0.01) is None
+    result = []
+    t = threading.Thread(target=lambda: result.append(q.get(timeout=5)))
+    t.start()
+    q.close()
+    t.join(1)
+    assert not t.is_alive() and result == [None]
+
+
+def test_latest_queue_wakes_waiting_get_on_put():
+    q = LatestQueue(1)
+    result = []
+    t = threading.Thread(target=lambda: result.append(q.get(timeout=5)))
+    t.start()
+    q.put("item")
+    t.join(1)
+    assert result == ["item"]
+
+
+def test_fifo_queue_never_drops():
+    q = FifoQueue()
+    for i in range(100):
+        q.put(i)
+    assert drain(q) == list(range(100))
+    assert q.stats() == {"put": 100, "pending": 0}
+
+
+def test_fifo_queue_close_wakes_waiting_get():
+    q = FifoQueue()
+    result = []
+    t = threading.Thread(target=lambda: result.append(q.get(timeout=5)))
+    t.start()
+    q.close()
+    t.join(1)
+    assert not t.is_alive() and result == [None]
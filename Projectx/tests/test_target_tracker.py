@@ -0,0 +1,74 @@
+from target_tracker import TargetTracker
+
+
+def verified(tracker, rects, now):
+    tracks = tracker.update(rects, now)
+    for t in tracks:
+        tracker.set_checked(t, True, (t.rect[0], t.rect[1]), now)
+    return tracks
+
+
+def test_ids_stable_while_plates_move():
+    tracker = TargetTracker()
+    first = tracker.update([(100, 100, 80, 14), (400, 300, 60, 14)], 0.0)
+    ids = [t.track_id for t in first]
+    # сдвиг на несколько px (IoU) и на большой шаг в пределах max_distance
+    second = tracker.update([(405, 330, 60, 14), (104, 102, 80, 14)], 0.1)
+    assert [t.track_id for t in second] == [ids[1], ids[0]]
+    assert tracker.created == 2
+
+
+def test_new_plate_far_away_gets_new_id():
+    tracker = TargetTracker()
+    (a,) = tracker.update([(100, 100, 80, 14)], 0.0)
+    (b,) = tracker.update([(600, 500, 80, 14)], 0.1)
+    assert b.track_id != a.track_id
+
+
+def test_track_survives_max_missed_frames():
+    tracker = TargetTracker(max_missed=2)
+    (a,) = tracker.update([(100, 100, 80, 14)], 0.0)
+    tracker.update([], 0.1)
+    tracker.update([], 0.2)
+    (again,) = tracker.update([(100, 100, 80, 14)], 0.3)
+    assert again.track_id == a.track_id
+    for i in range(3):
+        tracker.update([], 0.4 + i * 0.1)
+    assert tracker.tracks == []
+
+
+def test_verified_track_rechecked_after_reverify_sec():
+    tracker = TargetTracker(reverify_sec=2.0)
+    (t,) = tracker.update([(100, 100, 80, 14)], 0.0)
+    assert tracker.needs_check(t, 0.0)
+    tracker.set_checked(t, True, (180, 100), 0.0)
+    assert not tracker.needs_check(t, 1.9)
+    assert tracker.needs_check(t, 2.0)
+
+
+def test_select_nearest_verified_only():
+    tracker = TargetTracker()
+    near, far = tracker.update([(90, 90, 20, 20), (300, 300, 20, 20)], 0.0)
+    tracker.set_checked(near, False, None, 0.0)
+    tracker.set_checked(far, True, (320, 300), 0.0)
+    assert tracker.select((100, 100)) is far
+
+
+def test_select_hysteresis_keeps_current_target():
+    tracker = TargetTracker(switch_margin=0.2)
+    a, b = verified(tracker, [(90, 90, 20, 20), (190, 90, 20, 20)], 0.0)
+    # a на расстоянии 0, b на 100
+    assert tracker.select((100, 100)) is a
+    # прицел сдвинулся: b чуть ближе (45 против 55) — меньше 20 % разницы, выбор остаётся
+    assert tracker.select((155, 100)) is a
+    # b ближе больше чем на 20 % (30 против 70) — переключение
+    assert tracker.select((170, 100)) is b
+
+
+def test_selection_cleared_when_target_lost():
+    tracker = TargetTracker(max_missed=0)
+    (a,) = verified(tracker, [(90, 90, 20, 20)], 0.0)
+    assert tracker.select((100, 100)) is a
+    tracker.update([], 0.1)
+    assert tracker.selected_id is None
+    assert tracker.select((100, 100)) is None